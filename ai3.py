@@ -1,5 +1,9 @@
 import os
 import re
+import asyncio
+import atexit
+import weakref
+import threading
 from dotenv import load_dotenv
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
@@ -7,31 +11,125 @@ from langchain_groq import ChatGroq
 from langchain.prompts import PromptTemplate
 from langchain.agents import initialize_agent, AgentType, Tool
 from langchain_tavily import TavilySearch
-from raghugging import get_answer
+import raghugging
+from raghugging import get_answer, aget_answer
 import re
 from categorization import categorize_ticket
-from langchain.memory import ConversationBufferMemory
+from ticket_store import TicketRepository, SheetBackend, TIMESTAMP_FORMAT
+from cache import TTLCache
+from streaming import stream_agent
+from langchain.memory import ConversationSummaryBufferMemory
+from session_memory import SessionMemoryManager
+from dedup import DuplicateDetector, cluster_id
+from router import route_message, TICKET_ID
+from tool_runner import ToolRunner
+from tracing import span, start_span, finish, context_for, stage_stats, start_metrics_server, TraceCallbackHandler
 
 
 load_dotenv()
+start_metrics_server()  # no-op unless TRACE_METRICS_PORT is set
 
 # -----------------------------
-# Google Sheets setup
+# Google Sheets setup (connected on first use)
 # -----------------------------
 SHEET_NAME = "MyDatabaseSheet"
+TICKET_DB_PATH = ":memory:"  # 🔹 Local SQLite copy of the sheet; use a file path to keep it across restarts
+TICKET_SYNC_SECONDS = 300     # 🔹 How often the local copy re-reads the whole sheet
+TICKET_BATCH_SIZE = 50        # 🔹 Sheet writes are queued and flushed every N tickets...
+TICKET_FLUSH_SECONDS = 2.0    # 🔹 ...or after this many seconds, whichever comes first
 scope = [
     "https://spreadsheets.google.com/feeds",
     "https://www.googleapis.com/auth/drive"
 ]
-creds = ServiceAccountCredentials.from_json_keyfile_name("credentials.json", scope)
-gspread_client = gspread.authorize(creds)
-sheet = gspread_client.open(SHEET_NAME)
-ticket_sheet = sheet.sheet1
+_lock = threading.RLock()
+_gspread_client = None
+_ticket_sheet = None
+
+
+def get_gspread_client():
+    global _gspread_client
+    if _gspread_client is None:
+        with _lock:
+            if _gspread_client is None:
+                creds = ServiceAccountCredentials.from_json_keyfile_name("credentials.json", scope)
+                _gspread_client = gspread.authorize(creds)
+    return _gspread_client
+
+
+def get_ticket_sheet():
+    global _ticket_sheet
+    if _ticket_sheet is None:
+        with _lock:
+            if _ticket_sheet is None:
+                _ticket_sheet = get_gspread_client().open(SHEET_NAME).sheet1
+    return _ticket_sheet
+
+
+_ticket_repo = None
+
+
+def get_ticket_repository() -> TicketRepository:
+    global _ticket_repo
+    if _ticket_repo is None:
+        with _lock:
+            if _ticket_repo is None:
+                _ticket_repo = TicketRepository(
+                    SheetBackend(get_ticket_sheet()),
+                    db_path=TICKET_DB_PATH,
+                    sync_interval=TICKET_SYNC_SECONDS,
+                    batch_writes=True,
+                    batch_size=TICKET_BATCH_SIZE,
+                    flush_interval=TICKET_FLUSH_SECONDS
+                )
+                atexit.register(_ticket_repo.close)  # don't lose queued writes on shutdown
+    return _ticket_repo
+
+
+# Past resolutions feed the RAG tool; rows are only read when a question is first asked
+raghugging.resolution_index.attach(lambda: get_ticket_repository().all())
+
+# Open tickets, so reworded repeats of the same problem get linked on save
+duplicates = DuplicateDetector(refresh_seconds=TICKET_SYNC_SECONDS)
+duplicates.attach(lambda: get_ticket_repository().all())
+
+
+def _ticket_changed(row: dict | None) -> None:
+    """Keep the resolution and duplicate indexes in step with a saved or updated ticket."""
+    if row is None:
+        return
+    try:
+        duplicates.on_ticket_changed(row)
+        raghugging.resolution_index.on_ticket_changed(row)
+    except Exception as e:
+        print(f"[WARN] Could not update ticket indexes for {row.get('ticket_id')}: {e}")
 
 # -----------------------------
-# Ticket Lookup (run once per session)
+# Ticket Lookup (cached, shared by every session in the process)
 # -----------------------------
-lookup_cache = {}
+LOOKUP_CACHE_SIZE = 2048
+LOOKUP_CACHE_TTL = 120  # 🔹 Seconds before a cached ticket is re-read, so edits made elsewhere show up
+lookup_cache = TTLCache(maxsize=LOOKUP_CACHE_SIZE, ttl=LOOKUP_CACHE_TTL)
+
+
+def _format_ticket(info: dict) -> str:
+    text = f"Ticket {info['ticket_id']} ({info['ticket_category']}) was created by {info['ticket_by']} on {info['ticket_timestamp']}. Status: {info['ticket_status']}. Content: {info['ticket_content']}"
+    if info.get("ticket_resolution", "N/A") != "N/A":
+        text += f" Resolution: {info['ticket_resolution']}"
+    if info.get("ticket_duplicate_of", "N/A") != "N/A":
+        text += f" Duplicate of: {info['ticket_duplicate_of']}"
+    return text
+
+
+def _cache_ticket(row: dict) -> dict:
+    info = {k: (v if v != "" else "N/A") for k, v in row.items()}
+    lookup_cache.set(row["ticket_id"], info)
+    return info
+
+
+def invalidate_ticket(ticket_id: str) -> None:
+    """Drop a ticket from the lookup cache, e.g. after it was edited outside this process."""
+    lookup_cache.invalidate(ticket_id)
+
 
 def ticket_lookup(input_str):
     """Extract a ticket ID from any string and lookup in Google Sheets."""
@@ -42,50 +140,104 @@ def ticket_lookup(input_str):
     ticket_id = match.group(0)
     
     # Check cache first
-    if ticket_id in lookup_cache:
-        info = lookup_cache[ticket_id]
-        return f"Ticket {info['ticket_id']} ({info['ticket_category']}) was created by {info['ticket_by']} on {info['ticket_timestamp']}. Status: {info['ticket_status']}. Content: {info['ticket_content']}"
-    
-    # Lookup in sheet
-    all_tickets = ticket_sheet.get_all_records()
-    for row in all_tickets:
-        if row.get("ticket_id") == ticket_id:
-            ticket_info = {
-                "ticket_id": row.get("ticket_id"),
-                "ticket_content": row.get("ticket_content", "N/A"),
-                "ticket_category": row.get("ticket_category", "N/A"),
-                "ticket_timestamp": row.get("ticket_timestamp", "N/A"),
-                "ticket_by": row.get("ticket_by", "N/A"),
-                "ticket_status": row.get("ticket_status", "N/A")
-            }
-            lookup_cache[ticket_id] = ticket_info
-            return f"Ticket {ticket_info['ticket_id']} ({ticket_info['ticket_category']}) was created by {ticket_info['ticket_by']} on {ticket_info['ticket_timestamp']}. Status: {ticket_info['ticket_status']}. Content: {ticket_info['ticket_content']}"
-    
+    info = lookup_cache.get(ticket_id)
+    if info is not None:
+        return _format_ticket(info)
+
+    # Lookup in the indexed local copy of the sheet
+    row = get_ticket_repository().get(ticket_id)
+    if row is not None:
+        return _format_ticket(_cache_ticket(row))
+
     return f"Ticket ID {ticket_id} not found in the sheet."
+
+
+async def aticket_lookup(input_str):
+    # Usually a local cache/SQLite hit; the periodic sheet sync must not block the event loop
+    return await asyncio.to_thread(ticket_lookup, input_str)
+
+
+# -----------------------------
+# Tool execution (per-tool deadlines, result caching and latency stats)
+# -----------------------------
+RAG_TOOL_TIMEOUT = 60       # 🔹 Not cached here: raghugging's answer cache already is, and is cleared on re-index
+LOOKUP_TOOL_TIMEOUT = 15    # 🔹 Lookups are not cached here: lookup_cache already is, with write-through
+TAVILY_TTL = 900            # 🔹 Seconds an identical web search reuses its results
+TAVILY_TIMEOUT = 10         # 🔹 A slower search is dropped and the agent answers without it
+tool_runner = ToolRunner()
+atexit.register(tool_runner.close)
+
+
+def tool_stats() -> dict:
+    """Calls, cache hit rate, timeouts and p50/p95 latency per tool."""
+    return tool_runner.stats()
+
+
+def latency_stats() -> dict:
+    """p50/p95, counts, tokens and cache hit rate per traced stage (turn, route, tool.*, rag.*, llm.*, sheet.*)."""
+    return stage_stats()
+
+
+def lookup_tickets(input_str):
+    """Look up every ticket ID in the input; several IDs are looked up concurrently."""
+    ids = list(dict.fromkeys(m.upper() for m in TICKET_ID.findall(input_str)))
+    if len(ids) <= 1:
+        return tool_runner.run("GoogleSheetsLookup", input_str)
+    return "\n".join(tool_runner.run_many([("GoogleSheetsLookup", t) for t in ids]))
+
+
+async def alookup_tickets(input_str):
+    ids = list(dict.fromkeys(m.upper() for m in TICKET_ID.findall(input_str)))
+    if len(ids) <= 1:
+        return await tool_runner.arun("GoogleSheetsLookup", input_str)
+    return "\n".join(await tool_runner.arun_many([("GoogleSheetsLookup", t) for t in ids]))
+
+
 # -----------------------------
 # Tools
 # -----------------------------
+tool_runner.register("RAGKnowledgeBase", get_answer, aget_answer, timeout=RAG_TOOL_TIMEOUT)
 rag_tool = Tool(
     name="RAGKnowledgeBase",
-    func=get_answer,
+    func=tool_runner.caller("RAGKnowledgeBase"),
+    coroutine=tool_runner.acaller("RAGKnowledgeBase"),
     description="Answer ticket-related queries using internal knowledge base (Train.pdf)."
 )
 
+tool_runner.register("GoogleSheetsLookup", ticket_lookup, aticket_lookup, timeout=LOOKUP_TOOL_TIMEOUT)
 google_sheet_lookup_tool = Tool(
     name="GoogleSheetsLookup",
-    func=ticket_lookup,
-    description="Look up ticket information by ticket ID in Google Sheets."
+    func=lookup_tickets,
+    coroutine=alookup_tickets,
+    description="Look up ticket information by ticket ID in Google Sheets. Several IDs can be given at once, separated by commas."
 )
 
-tavily = TavilySearch(max_results=3, tavily_api_key=os.getenv("TAVILY_API_KEY"))
+_tavily = None
+
+
+def get_tavily():
+    global _tavily
+    if _tavily is None:
+        with _lock:
+            if _tavily is None:
+                _tavily = TavilySearch(max_results=3, tavily_api_key=os.getenv("TAVILY_API_KEY"))
+    return _tavily
+
 
 def tavily_search_fn(query: str) -> str:
-    result = tavily.invoke({"query": query})
+    result = get_tavily().invoke({"query": query})
     return str(result)
 
+
+async def atavily_search_fn(query: str) -> str:
+    result = await get_tavily().ainvoke({"query": query})
+    return str(result)
+
+tool_runner.register("TavilySearch", tavily_search_fn, atavily_search_fn, ttl=TAVILY_TTL, timeout=TAVILY_TIMEOUT)
 tavily_tool = Tool(
     name="TavilySearch",
-    func=tavily_search_fn,
+    func=tool_runner.caller("TavilySearch"),
+    coroutine=tool_runner.acaller("TavilySearch"),
     description="Search the web using Tavily. Input should be a search query string."
 )
 from datetime import datetime
@@ -108,6 +260,28 @@ def save_ticket_tool(ticket: dict):
     if not ticket_id or not content or not user_email:
         return "❌ Missing required ticket information."
 
+    # New tickets are linked to an open ticket about the same problem; updates keep their link
+    try:
+        repo = get_ticket_repository()
+        existing = repo.get(ticket_id)
+    except Exception as e:
+        return f"⚠️ Error saving ticket: {str(e)}"
+    duplicate = None
+    if existing is not None:
+        # Unchanged content keeps its category instead of being classified again
+        if not category and content == existing["ticket_content"]:
+            category = existing["ticket_category"]
+    else:
+        try:
+            duplicate = duplicates.find(content, exclude=ticket_id)
+        except Exception as e:
+            print(f"[WARN] Duplicate check failed: {e}")
+        duplicate_of = duplicate[1] if duplicate else ""
+        # A duplicate takes its original's category instead of being classified again
+        original = repo.get(duplicate[0]) if duplicate and not category else None
+        if original is not None:
+            category = original["ticket_category"]
+
     # Auto-categorize if category not provided
     if not category:
         try:
@@ -115,96 +289,131 @@ def save_ticket_tool(ticket: dict):
         except Exception:
             category = "uncategorized"
 
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if existing is not None:
+        # An update keeps the creation time, status, resolution, close time and duplicate link
+        record = dict(existing, ticket_content=content, ticket_category=category, ticket_by=user_email)
+    else:
+        record = {
+            "ticket_id": ticket_id,
+            "ticket_content": content,
+            "ticket_category": category,
+            "ticket_timestamp": datetime.now().strftime(TIMESTAMP_FORMAT),
+            "ticket_by": user_email,
+            "ticket_status": "pending",
+            "ticket_resolution": "",
+            "ticket_duplicate_of": duplicate_of,
+            "ticket_closed_at": ""
+        }
 
     try:
-        all_tickets = ticket_sheet.get_all_records()
-        existing_ids = [row["ticket_id"] for row in all_tickets]
-
-        row_data = [ticket_id, content, category, timestamp, user_email, "pending"]
-
-        if ticket_id in existing_ids:
-            # Direct update if ticket exists
-            row_index = existing_ids.index(ticket_id) + 2
-            ticket_sheet.update(f"A{row_index}:F{row_index}", [row_data])
-            lookup_cache[ticket_id] = {
-                "ticket_id": ticket_id,
-                "ticket_content": content,
-                "ticket_category": category,
-                "ticket_timestamp": timestamp,
-                "ticket_by": user_email,
-                "ticket_status": lookup_cache.get(ticket_id, {}).get("ticket_status", "pending")
-            }
+        created = repo.save(record)
+        # Write-through: the cache holds exactly what the sheet now holds
+        _cache_ticket(record)
+        _ticket_changed(record)  # indexes see the new content
+
+        if not created:
             return f"✅ Ticket '{ticket_id}' updated successfully (category: {category})."
-        else:
-            ticket_sheet.append_row(row_data)
-            lookup_cache[ticket_id] = {
-                "ticket_id": ticket_id,
-                "ticket_content": content,
-                "ticket_category": category,
-                "ticket_timestamp": timestamp,
-                "ticket_by": user_email,
-                "ticket_status": "pending"
-            }
-            return f"✅ Ticket '{ticket_id}' saved successfully (category: {category})."
+        if duplicate:
+            return (f"✅ Ticket '{ticket_id}' saved successfully (category: {category}). "
+                    f"It looks like a duplicate of open ticket {duplicate[0]} and was linked to {cluster_id(record)}.")
+        return f"✅ Ticket '{ticket_id}' saved successfully (category: {category})."
     except Exception as e:
         return f"⚠️ Error saving ticket: {str(e)}"
 
 
+async def asave_ticket_tool(ticket: dict):
+    return await asyncio.to_thread(save_ticket_tool, ticket)
+
+
 def update_ticket_status_tool(input_str: str):
     """
     Update ticket status in Google Sheets.
     Input examples:
         "TIC123, closed" -> sets ticket TIC123 to closed
+        "TIC123, closed, reissued the e-ticket" -> closes it and records how it was resolved
         "TIC123" -> defaults status to 'pending'
     """
     try:
-        # Split ticket ID and optional status
-        parts = [p.strip() for p in input_str.split(",")]
+        # Split ticket ID, optional status and optional resolution (which may itself contain commas)
+        parts = [p.strip() for p in input_str.split(",", 2)]
         ticket_id = parts[0].upper()
         status = parts[1].lower() if len(parts) > 1 else "pending"
+        resolution = parts[2] if len(parts) > 2 else ""
 
-        all_tickets = ticket_sheet.get_all_records()
-        existing_ids = [row["ticket_id"] for row in all_tickets]
-
-        if ticket_id not in existing_ids:
+        repo = get_ticket_repository()
+        if not repo.update_status(ticket_id, status):
+            invalidate_ticket(ticket_id)
             return f"⚠️ Ticket ID '{ticket_id}' not found."
-
-        row_index = existing_ids.index(ticket_id) + 2
-        status_col_index = ticket_sheet.row_values(1).index("ticket_status") + 1
-
-        ticket_sheet.update_cell(row_index, status_col_index, status)
-
-        # Update cache
-        lookup_cache[ticket_id]["ticket_status"] = status
+        if resolution:
+            repo.update_field(ticket_id, "ticket_resolution", resolution)
+
+        # Write-through (works whether or not the ticket was looked up before)
+        row = repo.get(ticket_id)
+        if row is not None:
+            _cache_ticket(row)
+            _ticket_changed(row)
         return f"✅ Ticket '{ticket_id}' status updated to '{status}'."
 
     except Exception as e:
         return f"⚠️ Error updating ticket status: {str(e)}"
 
+def bulk_update_ticket_status(ticket_ids: list[str], status: str = "closed") -> list[str]:
+    """
+    Set one status on many tickets (e.g. closing everything after an incident).
+    All changes go to the sheet in a single batched flush. Returns the ids that were not found.
+    """
+    repo = get_ticket_repository()
+    ids = [t.strip().upper() for t in ticket_ids]
+    missing = repo.bulk_update_status(ids, status.lower())
+    for ticket_id in ids:
+        invalidate_ticket(ticket_id)
+        _ticket_changed(repo.get(ticket_id))
+    return missing
+
 # -----------------------------
 # Tool Wrappers for LangChain
 # -----------------------------
+# Writes are never cached and never abandoned half-way, so they get no TTL and no deadline
+tool_runner.register("SaveTicket", save_ticket_tool, asave_ticket_tool)
+tool_runner.register("UpdateTicketStatus", update_ticket_status_tool)
+
 save_ticket_tool_wrapper = Tool(
     name="SaveTicket",
-    func=save_ticket_tool,
+    func=tool_runner.caller("SaveTicket"),
+    coroutine=tool_runner.acaller("SaveTicket"),
     description="Save or update a ticket. Input must be a dict with keys: ticket_id, content, category, user_email."
 )
 
 update_ticket_status_tool_wrapper = Tool(
     name="UpdateTicketStatus",
-    func=update_ticket_status_tool,
-    description="Update the status of a ticket. Input: 'TIC123, closed' or 'TIC123'."
+    func=tool_runner.caller("UpdateTicketStatus"),
+    description="Update the status of a ticket. Input: 'TIC123, closed', 'TIC123, closed, <how it was resolved>' or 'TIC123'."
 )
 
-memory = ConversationBufferMemory(
-    memory_key="chat_history",   # must match your agent input
-    return_messages=True          # keeps messages as structured chat
-)
 # -----------------------------
 # LLM
 # -----------------------------
-llm = ChatGroq(model="llama-3.1-8b-instant")
+LLM_MODEL = "llama-3.1-8b-instant"
+
+# -----------------------------
+# Memory (one bounded conversation per session)
+# -----------------------------
+DEFAULT_SESSION = "default"
+MEMORY_TOKEN_LIMIT = 1200     # 🔹 Older turns beyond this budget are folded into a running summary
+SESSION_IDLE_SECONDS = 1800   # 🔹 Conversations idle this long are forgotten
+MAX_SESSIONS = 500
+
+
+def _make_memory():
+    return ConversationSummaryBufferMemory(
+        llm=ChatGroq(model=LLM_MODEL),   # summarises old turns
+        max_token_limit=MEMORY_TOKEN_LIMIT,
+        memory_key="chat_history",       # must match your agent input
+        return_messages=True             # keeps messages as structured chat
+    )
+
+
+sessions = SessionMemoryManager(_make_memory, idle_seconds=SESSION_IDLE_SECONDS, max_sessions=MAX_SESSIONS)
 
 # -----------------------------
 # Prompt (for final reasoning)
@@ -224,16 +433,167 @@ prompt = PromptTemplate(
 # -----------------------------
 tools = [rag_tool, google_sheet_lookup_tool, tavily_tool,save_ticket_tool_wrapper]
 
-agent = initialize_agent(
-    tools=tools,
-    llm=llm,
-    agent=AgentType.CHAT_CONVERSATIONAL_REACT_DESCRIPTION,
-    verbose=True,
-    memory=memory,
-    handle_parsing_errors=True,
-    max_iterations=5,         
-    max_execution_time=100
-)
+def _build_agent(memory):
+    return initialize_agent(
+        tools=tools,
+        llm=ChatGroq(model=LLM_MODEL, streaming=True),  # tokens reach stream_answer callbacks
+        agent=AgentType.CHAT_CONVERSATIONAL_REACT_DESCRIPTION,
+        verbose=True,
+        memory=memory,
+        handle_parsing_errors=True,
+        max_iterations=5,
+        max_execution_time=100
+    )
+
+
+def get_agent(session_id: str = DEFAULT_SESSION):
+    """
+    The agent for one conversation, built on first use with its own memory.
+    The RAG index itself is only built when the tool is called or warmed up.
+    """
+    return sessions.agent(session_id, _build_agent)
+
+
+# -----------------------------
+# Async execution
+# -----------------------------
+AGENT_CONCURRENCY = 8  # 🔹 Agent runs allowed in flight per event loop; the rest wait their turn
+_agent_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _agent_slots.get(loop)
+    if sem is None:
+        sem = _agent_slots[loop] = asyncio.Semaphore(AGENT_CONCURRENCY)
+    return sem
+
+
+# -----------------------------
+# Fast path: lookups, status updates and plain KB questions skip the agent loop
+# -----------------------------
+def _route(user_input: str) -> dict:
+    with span("route") as trace:
+        try:
+            route = route_message(user_input)
+        except Exception as e:
+            print(f"[WARN] Router failed, using the agent: {e}")
+            route = {"intent": "agent", "tool": None, "input": None, "reason": str(e)}
+        trace.set(intent=route["intent"])
+        return route
+
+
+def _format_rag(result) -> str:
+    if not isinstance(result, dict):
+        return str(result)
+    text = result.get("answer", "")
+    if result.get("sources"):
+        text += f"\n\nSources:\n{result['sources']}"
+    return text
+
+
+def _run_route(route: dict) -> str:
+    if route["intent"] == "lookup":
+        return lookup_tickets(route["input"])
+    return _format_rag(tool_runner.run(route["tool"], route["input"]))
+
+
+async def _arun_route(route: dict) -> str:
+    if route["intent"] == "lookup":
+        return await alookup_tickets(route["input"])
+    return _format_rag(await tool_runner.arun(route["tool"], route["input"]))
+
+
+def _remember(session_id: str, user_input: str, output: str) -> None:
+    """Record a routed turn in the session memory, so a later agent turn can refer back to it."""
+    try:
+        sessions.memory(session_id).save_context({"input": user_input}, {"output": output})
+    except Exception as e:
+        print(f"[WARN] Could not record turn in memory: {e}")
+
+
+def _stream_route(route: dict, user_input: str, session_id: str, context):
+    yield {"type": "tool_start", "tool": route["tool"], "input": route["input"]}
+    try:
+        output = context.run(_run_route, route)
+    except Exception as e:
+        yield {"type": "error", "error": str(e)}
+        return
+    yield {"type": "tool_end", "output": output}
+    _remember(session_id, user_input, output)
+    yield {"type": "final", "output": output}
+
+
+async def arun_agent(user_input: str, session_id: str = DEFAULT_SESSION) -> str:
+    """
+    Async agent turn. Tools run through their coroutines, so while one conversation
+    waits on Gemini, Groq, Sheets or Tavily the event loop serves the others.
+    Messages the router recognises are answered by one tool call without the agent.
+    """
+    with span("turn", session=session_id) as turn:
+        route = await asyncio.to_thread(_route, user_input)  # may embed the message locally
+        turn.set(intent=route["intent"])
+        async with _slots():
+            if route["intent"] != "agent":
+                output = await _arun_route(route)
+                await asyncio.to_thread(_remember, session_id, user_input, output)
+                return output
+            handler = TraceCallbackHandler(turn)  # one span per Groq call, with token counts
+            response = await get_agent(session_id).ainvoke({"input": user_input}, config={"callbacks": [handler]})
+            turn.set(iterations=handler.iterations)
+    return response.get("output", "No response from agent.")
+
+
+def stream_answer(user_input: str, session_id: str = DEFAULT_SESSION):
+    """
+    Run one message and yield events as they happen (tool steps, answer tokens, then the
+    full answer); see streaming.stream_agent for the event shapes. Messages the router
+    recognises produce one tool_start/tool_end pair and the final answer, without the agent.
+    """
+    turn = start_span("turn", session=session_id)
+    try:
+        context = context_for(turn)  # tool and retrieval spans of this turn nest under it
+        route = context.run(_route, user_input)
+        turn.set(intent=route["intent"])
+        if route["intent"] != "agent":
+            return _traced(_stream_route(route, user_input, session_id, context), turn)
+        handler = TraceCallbackHandler(turn)
+        events = stream_agent(get_agent(session_id), {"input": user_input}, callbacks=[handler], context=context)
+    except BaseException as e:
+        finish(turn, e)  # otherwise _traced finishes it once the events are consumed
+        raise
+    return _traced(events, turn, handler)
+
+
+def _traced(events, turn, handler=None):
+    """Pass the events through and finish the turn's span once the last one is consumed."""
+    error = None
+    try:
+        for event in events:
+            if event["type"] == "error":
+                error = RuntimeError(event["error"])
+            yield event
+    finally:
+        if handler is not None:
+            turn.set(iterations=handler.iterations)
+        finish(turn, error)
+
+
+def warm_up(background: bool = True) -> None:
+    """Start building the RAG pipeline (in a thread by default) so the first answer is fast."""
+    raghugging.warm_up(background=background)
+
+
+def is_ready() -> bool:
+    """True once the RAG tool can answer without building the index."""
+    return raghugging.is_ready()
+
+
+def __getattr__(name):
+    # Keeps `from ai3 import agent` working without building it at import time
+    if name == "agent":
+        return get_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # -----------------------------
@@ -242,6 +602,7 @@ agent = initialize_agent(
 if __name__ == "__main__":
     print("🛠️ Welcome to the AI Ticket Assistant!")
     print("Type 'exit' or 'quit' to end the session.\n")
+    warm_up()
 
     while True:
         try:
@@ -251,11 +612,20 @@ if __name__ == "__main__":
                 print("👋 Goodbye!")
                 break
 
-            # Agent now automatically handles memory
-            response = agent.invoke({"input": user_input})
-            
-            # Print the final answer
-            print("\nFinal Answer:\n", response.get("output", "No response from agent.\n"))
+            # Agent now automatically handles memory; answer is printed as it streams
+            streamed = False
+            for event in stream_answer(user_input, session_id="cli"):
+                if event["type"] == "tool_start":
+                    print(f"🔧 {event['tool']}: {event['input']}")
+                elif event["type"] == "token":
+                    if not streamed:
+                        print("\nFinal Answer:")
+                        streamed = True
+                    print(event["text"], end="", flush=True)
+                elif event["type"] == "final":
+                    print("\n" if streamed else f"\nFinal Answer:\n {event['output']}\n")
+                elif event["type"] == "error":
+                    print(f"⚠️ Error: {event['error']}\n")
 
         except KeyboardInterrupt:
             print("\n👋 Session interrupted. Exiting...")
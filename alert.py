@@ -1,33 +1,64 @@
 # alert_system.py
-import smtplib
-from email.message import EmailMessage
 import streamlit as st
+from alert_dispatch import get_dispatcher, config_problem, ALERT_RECIPIENTS
+
+PENDING_ALERT_THRESHOLD = 50  # 🔹 Pending tickets at which the backlog alert fires
+
 
 def gmail_alert_sidebar():
     st.sidebar.subheader("🚨 Send Gmail Alert")
     to_email = st.sidebar.text_input("Recipient Email", key="alert_to")
     subject = st.sidebar.text_input("Subject", key="alert_subject")
     message = st.sidebar.text_area("Message", key="alert_message")
+    digest = st.sidebar.checkbox("Bundle into the next digest email", key="alert_digest")
 
     if st.sidebar.button("🚀 Send Alert", key="alert_button"):
-        if to_email and subject and message:
-            sender_email = "techscam377@gmail.com"
-            app_password = "nksf cbdp nzvr yomp"  # App Password
-
-            msg = EmailMessage()
-            msg["From"] = sender_email
-            msg["To"] = to_email
-            msg["Subject"] = subject
-            msg.set_content(message, subtype="plain")
-
+        problem = config_problem()
+        if problem:
+            # Queuing would only fail later in the background sender
+            st.sidebar.error(f"❌ Alerts are not configured: {problem} in .env.")
+        elif to_email and subject and message:
+            # Queued for the background sender (pooled connection, retries) - the page doesn't wait on SMTP
             try:
-                with smtplib.SMTP("smtp.gmail.com", 587) as server:
-                    server.starttls()
-                    server.login(sender_email, app_password)
-                    server.send_message(msg)
-                st.sidebar.success("✅ Alert sent successfully!")
+                get_dispatcher().send(to_email, subject, message, digest=digest)
+                st.sidebar.success("✅ Alert queued" + (" for the next digest!" if digest else " and sending!"))
             except Exception as e:
-                st.sidebar.error(f"❌ Failed to send alert: {str(e)}")
+                st.sidebar.error(f"❌ Failed to queue alert: {str(e)}")
         else:
             st.sidebar.warning("⚠️ Please fill in all fields before sending.")
 
+    stats = get_dispatcher().stats()
+    st.sidebar.caption(f"📨 Sent {stats['sent']} · waiting {stats['outstanding']} · failed {stats['failed']}")
+
+
+def automated_alerts(low_coverage: dict, pending: int, coverage_threshold: int) -> list[str]:
+    """
+    Mail ALERT_RECIPIENTS when the dashboard sees low-coverage categories or a pending
+    backlog over PENDING_ALERT_THRESHOLD. Safe to call on every rerun: the same
+    condition is mailed at most once per ALERT_COOLDOWN_SECONDS, bundled into digests.
+    Returns the alerts queued by this call.
+    """
+    if not ALERT_RECIPIENTS or config_problem():
+        return []
+    alerts = []
+    if low_coverage:
+        alerts.append((
+            "low-coverage:" + ",".join(sorted(low_coverage)),
+            "Low coverage ticket categories",
+            f"Categories with fewer than {coverage_threshold} tickets: "
+            + ", ".join(f"{cat} ({count})" for cat, count in sorted(low_coverage.items()))
+        ))
+    if pending >= PENDING_ALERT_THRESHOLD:
+        alerts.append((
+            "pending-backlog",
+            f"Pending ticket backlog: {pending}",
+            f"{pending} tickets are pending (alert threshold {PENDING_ALERT_THRESHOLD})."
+        ))
+
+    queued = []
+    dispatcher = get_dispatcher()
+    for key, subject, body in alerts:
+        for to in ALERT_RECIPIENTS:
+            if dispatcher.alert_once(key, to, subject, body, digest=True):
+                queued.append(subject)
+    return queued
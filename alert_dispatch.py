@@ -0,0 +1,315 @@
+import atexit
+import heapq
+import itertools
+import os
+import queue
+import random
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from email.message import EmailMessage
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# -----------------------------
+# Config (from .env)
+# -----------------------------
+SMTP_HOST = os.getenv("ALERT_SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("ALERT_SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("ALERT_SMTP_STARTTLS", "1") != "0"  # 🔹 Set to 0 for a local stand-in server
+SENDER_EMAIL = os.getenv("ALERT_SENDER_EMAIL", "")
+SENDER_PASSWORD = os.getenv("ALERT_APP_PASSWORD", "")        # 🔹 Gmail app password; empty skips login
+ALERT_RECIPIENTS = [r.strip() for r in os.getenv("ALERT_RECIPIENTS", "").split(",") if r.strip()]
+ALERT_WORKERS = 1             # 🔹 Sender threads, each holding one pooled connection
+ALERT_MAX_RETRIES = 5         # 🔹 Attempts per message before it is dropped
+ALERT_BACKOFF_SECONDS = 2.0   # 🔹 First retry delay; doubles on every further attempt
+ALERT_DIGEST_SECONDS = 300    # 🔹 Digest alerts to one recipient are collected this long, then sent as one email
+ALERT_COOLDOWN_SECONDS = 3600  # 🔹 An automated alert with the same key is not repeated within this window
+SMTP_IDLE_SECONDS = 60        # 🔹 A pooled connection idle longer than this is checked with NOOP before reuse
+
+
+def config_problem() -> str | None:
+    """Why alerts can't be sent with the current settings, or None if they can."""
+    if not SENDER_EMAIL:
+        return "ALERT_SENDER_EMAIL is not set"
+    if SMTP_STARTTLS and not SENDER_PASSWORD:
+        # Only a local stand-in (ALERT_SMTP_STARTTLS=0) is used without logging in
+        return "ALERT_APP_PASSWORD is not set"
+    return None
+
+
+def _permanent(e: Exception) -> bool:
+    """Errors that retrying will not fix (bad recipient, bad credentials, 5xx replies)."""
+    if isinstance(e, (smtplib.SMTPRecipientsRefused, smtplib.SMTPAuthenticationError)):
+        return True
+    return isinstance(e, smtplib.SMTPResponseException) and 500 <= e.smtp_code < 600
+
+
+class SmtpPool:
+    """
+    Logged-in SMTP connections reused across messages, so STARTTLS and login happen
+    once per connection instead of once per alert. Connections that fail are dropped
+    and replaced on the next use.
+    """
+
+    def __init__(self, host: str, port: int, user: str = "", password: str = "", starttls: bool = True,
+                 size: int = 1, idle_seconds: float = SMTP_IDLE_SECONDS, timeout: float = 30):
+        self.host, self.port = host, port
+        self.user, self.password = user, password
+        self.starttls = starttls
+        self.idle_seconds = idle_seconds
+        self.timeout = timeout
+        self._idle: queue.LifoQueue = queue.LifoQueue()  # (server, last_used)
+        self._slots = threading.BoundedSemaphore(size)
+        self.opened = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            server.starttls()
+        if self.password:
+            server.login(self.user, self.password)
+        self.opened += 1
+        return server
+
+    def _alive(self, server: smtplib.SMTP, last_used: float) -> bool:
+        if time.monotonic() - last_used < self.idle_seconds:
+            return True
+        try:
+            return server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    @staticmethod
+    def _quit(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    @contextmanager
+    def connection(self):
+        with self._slots:
+            server = None
+            try:
+                server, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            if server is not None and not self._alive(server, last_used):
+                self._quit(server)
+                server = None
+            if server is None:
+                server = self._connect()
+            try:
+                yield server
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                # The server answered; the connection itself is still good
+                self._idle.put((server, time.monotonic()))
+                raise
+            except BaseException:
+                self._quit(server)
+                raise
+            else:
+                self._idle.put((server, time.monotonic()))
+
+    def close(self) -> None:
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._quit(server)
+
+
+class AlertDispatcher:
+    """
+    Background alert delivery. `send` only queues: sender threads deliver over a
+    SmtpPool, retrying transient failures with exponential backoff. Alerts sent with
+    digest=True are collected per recipient for `digest_seconds` and go out as one
+    email. `alert_once` suppresses repeats of the same automated alert within
+    `cooldown_seconds`, so a condition seen on every dashboard rerun mails once.
+    """
+
+    def __init__(self, pool: SmtpPool, sender: str, workers: int = ALERT_WORKERS,
+                 max_retries: int = ALERT_MAX_RETRIES, backoff_seconds: float = ALERT_BACKOFF_SECONDS,
+                 digest_seconds: float = ALERT_DIGEST_SECONDS, cooldown_seconds: float = ALERT_COOLDOWN_SECONDS):
+        self.pool = pool
+        self.sender = sender
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.digest_seconds = digest_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self._ready: queue.Queue = queue.Queue()   # (attempt, message, alerts carried) or None to stop
+        self._scheduled: list = []                 # heap of (due, seq, kind, payload): digests and retries
+        self._digests: dict[str, list[tuple[str, str, datetime]]] = {}
+        self._last_alert: dict[str, float] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._outstanding = 0                      # alerts queued, collecting or being retried
+        self._closed = False
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.digests_sent = 0
+        self._threads = [threading.Thread(target=self._schedule_loop, name="alert-scheduler", daemon=True)]
+        self._threads += [threading.Thread(target=self._send_loop, name=f"alert-sender-{i}", daemon=True)
+                          for i in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    # -- public --
+    def send(self, to: str, subject: str, body: str, digest: bool = False) -> None:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Alert dispatcher is closed")
+            self._outstanding += 1
+            if digest:
+                entries = self._digests.setdefault(to, [])
+                if not entries:
+                    self._push(time.monotonic() + self.digest_seconds, "digest", to)
+                entries.append((subject, body, datetime.now()))
+                return
+        self._ready.put((0, self._message(to, subject, body), 1))
+
+    def alert_once(self, key: str, to: str, subject: str, body: str, digest: bool = True) -> bool:
+        """Send unless an alert with this key went to this recipient within cooldown_seconds. Returns True if queued."""
+        now = time.monotonic()
+        with self._cond:
+            last = self._last_alert.get(f"{key}|{to}")
+            if last is not None and now - last < self.cooldown_seconds:
+                return False
+            self._last_alert[f"{key}|{to}"] = now
+        self.send(to, subject, body, digest=digest)
+        return True
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Send collected digests now and wait for everything queued to be delivered or given up on."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            now = time.monotonic()
+            self._scheduled = [(min(due, now) if kind == "digest" else due, seq, kind, payload)
+                               for due, seq, kind, payload in self._scheduled]
+            heapq.heapify(self._scheduled)
+            self._cond.notify_all()
+            while self._outstanding:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self, timeout: float = 10) -> None:
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for _ in self._threads[1:]:
+            self._ready.put(None)
+        for t in self._threads:
+            t.join(timeout=1)
+        self.pool.close()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "sent": self.sent,
+                "failed": self.failed,
+                "retries": self.retries,
+                "digests_sent": self.digests_sent,
+                "outstanding": self._outstanding,
+                "collecting": sum(len(v) for v in self._digests.values()),
+                "connections_opened": self.pool.opened,
+            }
+
+    # -- internals --
+    def _message(self, to: str, subject: str, body: str) -> EmailMessage:
+        msg = EmailMessage()
+        msg["From"] = self.sender
+        msg["To"] = to
+        msg["Subject"] = subject
+        msg.set_content(body, subtype="plain")
+        return msg
+
+    def _digest_message(self, to: str, entries: list[tuple[str, str, datetime]]) -> EmailMessage:
+        if len(entries) == 1:
+            subject, body, _ = entries[0]
+            return self._message(to, subject, body)
+        parts = [f"[{at:%Y-%m-%d %H:%M}] {subject}\n{body}" for subject, body, at in entries]
+        return self._message(to, f"🚨 {len(entries)} ticket alerts", "\n\n---\n\n".join(parts))
+
+    def _push(self, due: float, kind: str, payload) -> None:
+        heapq.heappush(self._scheduled, (due, next(self._seq), kind, payload))
+        self._cond.notify_all()
+
+    def _done(self, count: int) -> None:
+        with self._cond:
+            self._outstanding -= count
+            self._cond.notify_all()
+
+    def _schedule_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and (not self._scheduled or self._scheduled[0][0] > time.monotonic()):
+                    self._cond.wait(self._scheduled[0][0] - time.monotonic() if self._scheduled else None)
+                if self._closed and not self._scheduled:
+                    return
+                due = []
+                while self._scheduled and (self._closed or self._scheduled[0][0] <= time.monotonic()):
+                    due.append(heapq.heappop(self._scheduled))
+                batches = {payload: self._digests.pop(payload, []) for _, _, kind, payload in due if kind == "digest"}
+            for _, _, kind, payload in due:
+                if kind == "digest":
+                    entries = batches.get(payload)
+                    if entries:
+                        self._ready.put((0, self._digest_message(payload, entries), len(entries)))
+                else:
+                    self._ready.put(payload)
+
+    def _send_loop(self) -> None:
+        while True:
+            item = self._ready.get()
+            if item is None:
+                return
+            attempt, msg, count = item
+            try:
+                with self.pool.connection() as server:
+                    server.send_message(msg)
+            except Exception as e:
+                if _permanent(e) or attempt + 1 >= self.max_retries:
+                    print(f"[WARN] Alert to {msg['To']} dropped after {attempt + 1} attempt(s): {e}")
+                    with self._cond:
+                        self.failed += count
+                    self._done(count)
+                    continue
+                delay = self.backoff_seconds * (2 ** attempt) * random.uniform(0.8, 1.2)
+                with self._cond:
+                    self.retries += 1
+                    self._push(time.monotonic() + delay, "retry", (attempt + 1, msg, count))
+                continue
+            with self._cond:
+                self.sent += count
+                if count > 1:
+                    self.digests_sent += 1
+            self._done(count)
+
+
+# -----------------------------
+# Shared dispatcher (created on first alert)
+# -----------------------------
+_dispatcher: AlertDispatcher | None = None
+_lock = threading.Lock()
+
+
+def get_dispatcher() -> AlertDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        with _lock:
+            if _dispatcher is None:
+                pool = SmtpPool(SMTP_HOST, SMTP_PORT, SENDER_EMAIL, SENDER_PASSWORD,
+                                starttls=SMTP_STARTTLS, size=ALERT_WORKERS)
+                _dispatcher = AlertDispatcher(pool, SENDER_EMAIL)
+                atexit.register(_dispatcher.close)  # deliver collected digests on shutdown
+    return _dispatcher
@@ -0,0 +1,81 @@
+import argparse
+from categorization import CATEGORIES, categorize_tickets
+from ai3 import get_ticket_repository, invalidate_ticket
+from dedup import MinHashLSH, DuplicateDetector, cluster_id
+from rollups import parse_timestamp
+
+
+def backfill_categories(recategorize_all: bool = False, use_llm: bool = True) -> dict:
+    """
+    Re-categorise sheet rows whose category is missing, 'uncategorized' or not in CATEGORIES
+    (or every row with recategorize_all=True) and write the results back.
+    Writes go through the repository's write-behind queue, so they reach the sheet in batches.
+    """
+    repo = get_ticket_repository()
+    rows = [r for r in repo.all() if r["ticket_content"]]
+    if not recategorize_all:
+        rows = [r for r in rows if r["ticket_category"] not in CATEGORIES]
+
+    categories = categorize_tickets([r["ticket_content"] for r in rows], use_llm=use_llm)
+    changed = 0
+    for row, category in zip(rows, categories):
+        if category != row["ticket_category"]:
+            repo.update_field(row["ticket_id"], "ticket_category", category)
+            invalidate_ticket(row["ticket_id"])
+            changed += 1
+    repo.flush()
+    return {"checked": len(rows), "changed": changed}
+
+
+def _open_at(row: dict, when) -> bool:
+    """Whether a ticket was still open at `when` (a datetime, or None for "now")."""
+    if DuplicateDetector.is_open(row):
+        return True
+    closed = parse_timestamp(row.get("ticket_closed_at", ""))
+    # Closed tickets without a close time (closed before it was recorded) never match
+    return when is not None and closed is not None and closed > when
+
+
+def backfill_duplicates() -> dict:
+    """
+    Link existing tickets that repeat an earlier ticket (in sheet order) through
+    ticket_duplicate_of, the same way new tickets are linked on save: only tickets
+    that were still open when the repeat was created are candidates.
+    The dashboard's clusters then also cover tickets saved before duplicate detection existed.
+    """
+    repo = get_ticket_repository()
+    lsh = MinHashLSH()
+    roots: dict[str, str] = {}
+    earlier: dict[str, dict] = {}
+    rows = repo.all()
+    linked = 0
+    for row in rows:
+        tid, content = row["ticket_id"], row["ticket_content"]
+        if not row["ticket_duplicate_of"] and content:
+            created = parse_timestamp(row["ticket_timestamp"])
+            match = next((m for m, _ in lsh.query(content) if _open_at(earlier[m], created)), None)
+            if match is not None:
+                repo.update_field(tid, "ticket_duplicate_of", roots[match])
+                invalidate_ticket(tid)
+                row = dict(row, ticket_duplicate_of=roots[match])
+                linked += 1
+        if content and lsh.add(tid, content):
+            roots[tid] = cluster_id(row)
+            earlier[tid] = row
+    repo.flush()
+    return {"checked": len(rows), "linked": linked}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-categorise tickets in the sheet.")
+    parser.add_argument("--all", action="store_true", help="Re-categorise every row, not only invalid ones")
+    parser.add_argument("--no-llm", action="store_true", help="Use only the local classifier")
+    parser.add_argument("--duplicates", action="store_true", help="Link near-duplicate tickets instead")
+    args = parser.parse_args()
+
+    if args.duplicates:
+        result = backfill_duplicates()
+        print(f"✅ Checked {result['checked']} tickets, linked {result['linked']} duplicates.")
+        raise SystemExit(0)
+    result = backfill_categories(recategorize_all=args.all, use_llm=not args.no_llm)
+    print(f"✅ Checked {result['checked']} tickets, updated {result['changed']} categories.")
@@ -0,0 +1,431 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+import zlib
+from pathlib import Path
+from types import SimpleNamespace
+from xml.etree import ElementTree
+
+ROOT = Path(__file__).resolve().parent
+SEED_XLSX = ROOT / "MyDatabaseSheet.xlsx"
+KB_DOCS = ROOT / "Train.pdf"
+
+# Stand-in latencies, so numbers reflect this code plus realistic waits, not live services
+SHEET_LATENCY = 0.05   # 🔹 Seconds per Sheets API call
+LLM_LATENCY = 0.3      # 🔹 Seconds per Groq / Gemini call
+SEARCH_LATENCY = 0.5   # 🔹 Seconds per Tavily search
+EMBED_DIM = 384
+CATEGORY_ANSWER = "refund"
+
+_XLSX_NS = {"m": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+# -----------------------------
+# Seed data
+# -----------------------------
+def read_xlsx(path: Path, sheet: int = 1) -> list[list[str]]:
+    """Cell values of one worksheet as rows of strings (header first); stdlib only."""
+    with zipfile.ZipFile(path) as z:
+        shared = []
+        if "xl/sharedStrings.xml" in z.namelist():
+            for si in ElementTree.fromstring(z.read("xl/sharedStrings.xml")).findall("m:si", _XLSX_NS):
+                shared.append("".join(t.text or "" for t in si.iter(f"{{{_XLSX_NS['m']}}}t")))
+        root = ElementTree.fromstring(z.read(f"xl/worksheets/sheet{sheet}.xml"))
+    rows = []
+    for row in root.iter(f"{{{_XLSX_NS['m']}}}row"):
+        values: dict[int, str] = {}
+        for c in row.findall("m:c", _XLSX_NS):
+            col = 0
+            for ch in re.match(r"[A-Z]+", c.get("r")).group(0):
+                col = col * 26 + ord(ch) - 64
+            v = c.find("m:v", _XLSX_NS)
+            if c.get("t") == "s" and v is not None:
+                values[col] = shared[int(v.text)]
+            elif c.get("t") == "inlineStr":
+                values[col] = "".join(t.text or "" for t in c.iter(f"{{{_XLSX_NS['m']}}}t"))
+            else:
+                values[col] = v.text if v is not None and v.text else ""
+        if any(values.values()):
+            rows.append([values.get(i, "") for i in range(1, max(values) + 1)])
+    return rows
+
+
+def seed_rows(n_tickets: int | None = None) -> list[list[str]]:
+    """The sample sheet, repeated with new IDs up to `n_tickets` rows."""
+    rows = read_xlsx(SEED_XLSX)
+    header, body = rows[0], rows[1:]
+    if n_tickets is None or n_tickets <= len(body):
+        return [header] + body[:n_tickets]
+    out = list(body)
+    for i in range(len(body), n_tickets):
+        row = list(body[i % len(body)])
+        row[0] = f"TIC{100000 + i}"
+        out.append(row)
+    return [header] + out
+
+
+# -----------------------------
+# Fakes
+# -----------------------------
+def _fakes():
+    """Fake classes that need LangChain; built on demand so `--compare` runs without it."""
+    import numpy as np
+    from langchain_core.embeddings import Embeddings
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    class HashEmbeddings(Embeddings):
+        """Deterministic bag-of-words vectors (hashed words and bigrams), no model download."""
+
+        def __init__(self, dim: int = EMBED_DIM):
+            self.dim = dim
+
+        def _embed(self, text: str) -> list[float]:
+            words = re.findall(r"\w+", text.lower())
+            v = np.zeros(self.dim, dtype=np.float32)
+            for gram in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                h = zlib.crc32(gram.encode("utf-8"))
+                v[h % self.dim] += 1.0 if h & 1 << 31 else -1.0
+            norm = np.linalg.norm(v)
+            return (v / norm if norm else v).tolist()
+
+        def embed_documents(self, texts: list[str]) -> list[list[float]]:
+            return [self._embed(t) for t in texts]
+
+        def embed_query(self, text: str) -> list[float]:
+            return self._embed(text)
+
+    class ScriptedChatModel(BaseChatModel):
+        """
+        Chat model with a fixed latency and scripted replies: the agent looks a ticket up
+        (or asks the knowledge base, or searches the web) once, then gives a final answer;
+        any other prompt (RAG chain, memory summary) gets a short canned answer.
+        """
+
+        latency: float = LLM_LATENCY
+
+        @property
+        def _llm_type(self) -> str:
+            return "scripted"
+
+        def _reply(self, messages) -> str:
+            text = "\n".join(str(m.content) for m in messages)
+            last = str(messages[-1].content)
+            if "RESPONSE FORMAT INSTRUCTIONS" not in text:
+                return "- Cancel the ticket from the booking history page.\n- The refund reaches the original payment method in 5-7 days."
+            if "TOOL RESPONSE" in last:
+                action, action_input = "Final Answer", "Here is what I found: " + last[-200:].strip()
+            elif re.search(r"\bTIC\d+\b", last, re.I):
+                action, action_input = "GoogleSheetsLookup", re.search(r"\bTIC\d+\b", last, re.I).group(0)
+            elif re.search(r"\b(?:news|weather|today)\b", last, re.I):
+                action, action_input = "TavilySearch", last[-120:]
+            else:
+                action, action_input = "RAGKnowledgeBase", last[-200:]
+            return "```json\n" + json.dumps({"action": action, "action_input": action_input}) + "\n```"
+
+        def _result(self, messages) -> ChatResult:
+            content = self._reply(messages)
+            tokens_in = sum(len(str(m.content)) for m in messages) // 4
+            tokens_out = len(content) // 4
+            message = AIMessage(content=content, usage_metadata={
+                "input_tokens": tokens_in, "output_tokens": tokens_out, "total_tokens": tokens_in + tokens_out})
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+            time.sleep(self.latency)
+            return self._result(messages)
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+            await asyncio.sleep(self.latency)
+            return self._result(messages)
+
+    return HashEmbeddings, ScriptedChatModel
+
+
+class FakeGroq:
+    """The slice of the Groq client that categorization uses."""
+
+    def __init__(self, latency: float = LLM_LATENCY, answer: str = CATEGORY_ANSWER):
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.answer = answer
+
+    def _create(self, messages, model, **kwargs):
+        time.sleep(self.latency)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.answer))],
+            usage=SimpleNamespace(prompt_tokens=sum(len(m["content"]) for m in messages) // 4, completion_tokens=2),
+        )
+
+
+class FakeSearch:
+    """Tavily stand-in: same canned results for every query, after `latency` seconds."""
+
+    def __init__(self, latency: float = SEARCH_LATENCY):
+        self.latency = latency
+
+    def _results(self, query: str) -> dict:
+        return {"query": query, "results": [
+            {"title": "Railway update", "url": "https://example.com/news", "content": f"No disruption reported for: {query}"}
+        ]}
+
+    def invoke(self, inputs: dict) -> dict:
+        time.sleep(self.latency)
+        return self._results(inputs["query"])
+
+    async def ainvoke(self, inputs: dict) -> dict:
+        await asyncio.sleep(self.latency)
+        return self._results(inputs["query"])
+
+
+def install_fakes(rows: list[list[str]], llm_latency: float, sheet_latency: float, search_latency: float,
+                  docs: Path = KB_DOCS):
+    """Point every external service used by ai3 at a local stand-in. Returns the ai3 module."""
+    import ai3
+    import categorization
+    import ingest
+    import raghugging
+    from ticket_store import TicketRepository, MemoryBackend
+
+    HashEmbeddings, ScriptedChatModel = _fakes()
+    ingest._base_embeddings = ingest._embeddings = HashEmbeddings()
+    raghugging.ChatGoogleGenerativeAI = lambda **kwargs: ScriptedChatModel(latency=llm_latency)
+    raghugging.RERANK_MODEL = None  # the cross-encoder would be downloaded
+    raghugging.DOCS_PATH = docs
+    ai3.ChatGroq = lambda **kwargs: ScriptedChatModel(latency=llm_latency)
+    ai3.get_tavily = lambda: FakeSearch(search_latency)
+    categorization._groq_client = FakeGroq(llm_latency)
+    ai3._ticket_repo = TicketRepository(
+        MemoryBackend(rows, latency=sheet_latency),
+        sync_interval=ai3.TICKET_SYNC_SECONDS,
+        batch_writes=True,
+        batch_size=ai3.TICKET_BATCH_SIZE,
+        flush_interval=ai3.TICKET_FLUSH_SECONDS
+    )
+    return ai3
+
+
+# -----------------------------
+# Measurements
+# -----------------------------
+def _summary(latencies: list[float]) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(statistics.median(ordered) * 1000, 3) if ordered else None,
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 3) if ordered else None,
+    }
+
+
+def _timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def measure_cold_start(runs: int = 3) -> dict:
+    """Seconds to import ai3 in a fresh interpreter (no service is contacted at import)."""
+    code = "import time; t = time.perf_counter(); import ai3; print(time.perf_counter() - t)"
+    times = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                             env={**os.environ, "TRACE_FILE": ""})
+        if out.returncode != 0:
+            return {"error": out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "import failed"}
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return {"import_seconds": round(min(times), 3), "runs": runs}
+
+
+def measure_index() -> dict:
+    """First build of the knowledge-base index (parse, chunk, embed, index) and a reload from disk."""
+    import raghugging
+    build = _timed(raghugging.get_rag_chain)
+    inner = getattr(raghugging.get_retriever(), "retriever", None)  # hybrid retriever inside WithResolutions
+    chunks = len(inner.doc_ids) if hasattr(inner, "doc_ids") else None
+    with raghugging._lock:
+        raghugging._retriever = raghugging._rag_chain = None
+        raghugging._ready.clear()
+    load = _timed(raghugging.get_rag_chain)
+    return {"build_seconds": round(build, 3), "load_seconds": round(load, 3), "chunks": chunks}
+
+
+def measure_retrieval(questions: list[str], repeats: int) -> dict:
+    import raghugging
+    retriever = raghugging.get_retriever()
+    raghugging.answer_cache.invalidate()
+    retrieval, answers = [], []
+    for _ in range(repeats):
+        for q in questions:
+            retrieval.append(_timed(retriever.invoke, q))
+    for q in questions:
+        answers.append(_timed(raghugging.get_answer, q))  # first ask: retrieval + LLM
+    cached = [_timed(raghugging.get_answer, q) for q in questions]  # same questions again: answer cache
+    return {"retrieval": _summary(retrieval), "answer_uncached": _summary(answers), "answer_cached": _summary(cached)}
+
+
+def measure_crud(ai3, n: int) -> dict:
+    """Ticket operations per second against the repository and through the agent's ticket tools."""
+    repo = ai3.get_ticket_repository()
+    repo.sync()
+    ids = [r["ticket_id"] for r in repo.all()]
+    rng = random.Random(0)
+    out = {}
+
+    def rate(name: str, fn, count: int) -> None:
+        start = time.perf_counter()
+        for i in range(count):
+            fn(i)
+        seconds = time.perf_counter() - start
+        out[name] = {"ops": count, "seconds": round(seconds, 3), "ops_per_second": round(count / seconds, 1)}
+
+    rate("get", lambda i: repo.get(rng.choice(ids)), n * 10)
+    rate("query", lambda i: repo.query(status="pending", search="refund", limit=50, offset=0), n)
+    rate("save", lambda i: repo.save({
+        "ticket_id": f"BENCH{i}", "ticket_content": f"Refund not received for booking {i}",
+        "ticket_category": "refund", "ticket_timestamp": "2025-09-06 10:00:00",
+        "ticket_by": "bench@example.com", "ticket_status": "pending",
+    }), n)
+    rate("update_status", lambda i: repo.update_status(f"BENCH{i}", "closed"), n)
+    rate("flush", lambda i: repo.flush(), 1)
+    # Full tool path: duplicate check, categorisation (local or fake Groq), save, index updates
+    rate("save_ticket_tool", lambda i: ai3.save_ticket_tool({
+        "ticket_id": f"BENCHT{i}", "content": f"My payment of {i} rupees was deducted twice", "user_email": "bench@example.com",
+    }), n)
+    rate("ticket_lookup_tool", lambda i: ai3.ticket_lookup(rng.choice(ids)), n * 10)
+    repo.flush()
+    out["sheet_calls"] = repo.backend.calls
+    return out
+
+
+def measure_turns(ai3, sessions: int, turns: int, router: bool) -> dict:
+    """End-to-end agent turns through loadtest.load_test (router fast path on or off)."""
+    import loadtest
+    import raghugging
+    import router as router_module
+    # Each run starts from empty caches and new conversations, so the two runs are comparable
+    ai3.tool_runner.cache.clear()
+    ai3.lookup_cache.clear()
+    raghugging.answer_cache.invalidate()
+    for i in range(sessions):
+        ai3.sessions.drop(f"load-{i}")
+    router_module.ROUTER_ENABLED = router
+    random.seed(0)
+    try:
+        report = asyncio.run(loadtest.load_test(sessions, turns))
+    finally:
+        router_module.ROUTER_ENABLED = True
+    report.pop("tools", None)
+    report.pop("stages", None)
+    return report
+
+
+def run(args) -> dict:
+    results = {
+        "config": {
+            "tickets": args.tickets, "sheet_latency": args.sheet_latency, "llm_latency": args.llm_latency,
+            "search_latency": args.search_latency, "sessions": args.sessions, "turns": args.turns,
+            "python": sys.version.split()[0],
+        },
+        "cold_start": measure_cold_start(),
+    }
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        os.chdir(workdir)  # index, embedding cache and traces.jsonl land here, not in the repo
+        try:
+            os.environ["TRACE_FILE"] = str(Path(workdir) / "traces.jsonl")
+            ai3 = install_fakes(seed_rows(args.tickets), args.llm_latency, args.sheet_latency, args.search_latency)
+            results["index"] = measure_index()
+            import loadtest
+            results["rag"] = measure_retrieval(loadtest.QUESTIONS, args.repeats)
+            results["crud"] = measure_crud(ai3, args.crud_ops)
+            results["turns_agent"] = measure_turns(ai3, args.sessions, args.turns, router=False)
+            results["turns_routed"] = measure_turns(ai3, args.sessions, args.turns, router=True)
+            results["tools"] = ai3.tool_stats()
+            results["stages"] = ai3.latency_stats()
+            ai3.get_ticket_repository().close()
+        finally:
+            os.chdir(cwd)  # also lets the temporary directory be removed
+    return results
+
+
+# -----------------------------
+# Comparing runs
+# -----------------------------
+def _metrics(results: dict, prefix: str = "") -> dict:
+    """Flattened numeric metrics whose direction is known: *_seconds / *_ms lower is better, *_per_second higher."""
+    out = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and key not in ("config", "tools", "stages"):
+            out.update(_metrics(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and value is not None:
+            if key.endswith("_per_second") or key.endswith(("_seconds", "_ms")):
+                out[name] = value
+    return out
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Metrics that got worse than the baseline by more than `tolerance` (0.2 = 20%)."""
+    regressions = []
+    base = _metrics(baseline)
+    for name, value in _metrics(current).items():
+        old = base.get(name)
+        if not old:
+            continue
+        higher_is_better = name.endswith("_per_second")
+        change = (old - value) / old if higher_is_better else (value - old) / old
+        if change > tolerance:
+            regressions.append(f"{name}: {old} -> {value} ({change:+.0%} worse)")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Offline benchmark: cold start, index build, retrieval, ticket CRUD and agent turns/s, "
+                    "with local stand-ins for Google Sheets, Groq, Gemini and Tavily.")
+    parser.add_argument("--tickets", type=int, default=None, help="Grow the seed sheet to N tickets (default: as is)")
+    parser.add_argument("--sheet-latency", type=float, default=SHEET_LATENCY)
+    parser.add_argument("--llm-latency", type=float, default=LLM_LATENCY)
+    parser.add_argument("--search-latency", type=float, default=SEARCH_LATENCY)
+    parser.add_argument("--repeats", type=int, default=20, help="Retrieval passes over the sample questions")
+    parser.add_argument("--crud-ops", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--out", type=str, default=None, help="Write the JSON results to this file")
+    parser.add_argument("--baseline", type=str, default=None, help="Earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before a metric counts as a regression")
+    parser.add_argument("--compare", type=str, default=None, help="Compare this results file with --baseline without running")
+    args = parser.parse_args()
+    # Paths are relative to where the command was run, not to the benchmark's working directory
+    for name in ("out", "baseline", "compare"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            results = json.load(f)
+    else:
+        results = run(args)
+        print(json.dumps(results, indent=2))
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"❌ {line}")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against the baseline")
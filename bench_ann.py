@@ -0,0 +1,114 @@
+import argparse
+import json
+import statistics
+import time
+import faiss
+import numpy as np
+from index_store import make_index
+
+# (kind, storage, params) compared against the exact flat/float32 index
+CONFIGS = [
+    ("flat", "float16", {}),
+    ("flat", "pq", {"pq_m": 16}),
+    ("ivf", "float32", {"nlist": 256, "nprobe": 4}),
+    ("ivf", "float32", {"nlist": 256, "nprobe": 16}),
+    ("ivf", "float32", {"nlist": 256, "nprobe": 64}),
+    ("ivf", "pq", {"nlist": 256, "nprobe": 16, "pq_m": 16}),
+    ("hnsw", "float32", {"hnsw_m": 32, "ef_search": 16}),
+    ("hnsw", "float32", {"hnsw_m": 32, "ef_search": 64}),
+    ("hnsw", "float32", {"hnsw_m": 32, "ef_search": 128}),
+    ("hnsw", "float16", {"hnsw_m": 32, "ef_search": 64}),
+]
+
+
+def load_kb_vectors() -> np.ndarray | None:
+    """Vectors of the current knowledge-base index, if it exists and stores them exactly."""
+    from ingest import INDEX_DIR, read_manifest
+    from index_store import INDEX_FILE
+    key = read_manifest().get("key")
+    if not key or not (INDEX_DIR / key / INDEX_FILE).exists():
+        return None
+    index = faiss.read_index(str(INDEX_DIR / key / INDEX_FILE))
+    try:
+        return index.reconstruct_n(0, index.ntotal)
+    except RuntimeError:
+        return None
+
+
+def synthetic_vectors(n: int, dim: int = 384, clusters: int = 64, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, roughly shaped like sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    data = centers[rng.integers(0, clusters, n)] + 0.6 * rng.normal(size=(n, dim))
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    return data.astype(np.float32)
+
+
+def make_queries(data: np.ndarray, n: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    q = data[rng.integers(0, len(data), n)] + 0.05 * rng.normal(size=(n, data.shape[1]))
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    return q.astype(np.float32)
+
+
+def run_config(kind: str, storage: str, params: dict, data: np.ndarray, queries: np.ndarray,
+               truth: np.ndarray, k: int, train_sample: int) -> dict:
+    start = time.perf_counter()
+    rng = np.random.default_rng(0)
+    sample = data[rng.choice(len(data), size=min(train_sample, len(data)), replace=False)]
+    index = make_index(kind, storage, data.shape[1], sample, **params)
+    index.add(data)
+    build = time.perf_counter() - start
+
+    latencies, hits = [], 0
+    for i, q in enumerate(queries):
+        t = time.perf_counter()
+        _, found = index.search(q[None, :], k)
+        latencies.append((time.perf_counter() - t) * 1000)
+        hits += len(set(found[0]) & set(truth[i]))
+    latencies.sort()
+    return {
+        "index": kind,
+        "storage": storage,
+        "params": params,
+        "recall_at_k": round(hits / (len(queries) * k), 4),
+        "query_p50_ms": round(statistics.median(latencies), 4),
+        "query_p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 4),
+        "build_seconds": round(build, 3),
+        "index_bytes": len(faiss.serialize_index(index)),
+    }
+
+
+def benchmark(data: np.ndarray, n_queries: int = 200, k: int = 10, train_sample: int = 20000) -> list[dict]:
+    queries = make_queries(data, n_queries)
+    exact = faiss.IndexFlatL2(data.shape[1])
+    exact.add(data)
+    _, truth = exact.search(queries, k)
+    results = [run_config("flat", "float32", {}, data, queries, truth, k, train_sample)]
+    for kind, storage, params in CONFIGS:
+        results.append(run_config(kind, storage, params, data, queries, truth, k, train_sample))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall vs latency of FAISS index options against the exact flat index.")
+    parser.add_argument("--synthetic", type=int, default=None,
+                        help="Benchmark N synthetic vectors instead of the current knowledge-base index")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--out", type=str, default=None, help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    vectors = None if args.synthetic else load_kb_vectors()
+    if vectors is None:
+        vectors = synthetic_vectors(args.synthetic or 50000)
+    print(f"Benchmarking {len(vectors)} vectors of dim {vectors.shape[1]}, k={args.k}")
+
+    rows = benchmark(vectors, args.queries, args.k)
+    for r in rows:
+        print(f"{r['index']:>5} {r['storage']:>8} recall={r['recall_at_k']:.3f} "
+              f"p50={r['query_p50_ms']:.3f}ms p95={r['query_p95_ms']:.3f}ms "
+              f"size={r['index_bytes'] / 1e6:.1f}MB build={r['build_seconds']}s {r['params']}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
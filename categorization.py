@@ -1,8 +1,28 @@
 import os
-from groq import Groq
+import re
+import time
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from groq import Groq, RateLimitError, APIConnectionError, InternalServerError
+from ingest import get_base_embeddings  # same model instance the RAG index uses
+from cache import TTLCache
+from tracing import span
 
-# Load Groq API key from environment
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Groq client, created on first use (reads the API key from the environment)
+_groq_client = None
+_groq_lock = threading.Lock()
+
+
+def get_groq_client() -> Groq:
+    global _groq_client
+    if _groq_client is None:
+        with _groq_lock:
+            if _groq_client is None:
+                _groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+    return _groq_client
 
 # Categories list
 CATEGORIES = [
@@ -13,27 +33,308 @@ CATEGORIES = [
     "general_enquiry", "high_priority_escalation"
 ]
 
-def categorize_ticket(content: str, model: str = "llama-3.1-8b-instant") -> str:
+# Labelled examples for the local classifier (one centroid per category)
+CATEGORY_EXAMPLES = {
+    "maintenance": [
+        "The booking website is down for maintenance",
+        "App shows scheduled maintenance and I cannot log in",
+        "Service unavailable during system upgrade",
+    ],
+    "product_support": [
+        "Problem in ticket booking try to book but showing error",
+        "How do I use the app to download my ticket",
+        "I need help with my account settings",
+    ],
+    "refund": [
+        "I was charged twice for my booking, please refund one of the payments",
+        "When will I get my refund for the cancelled ticket",
+        "Refund not received after cancellation",
+    ],
+    "high_priority_product": [
+        "Booking system is failing for all users, urgent",
+        "Critical error in the ticketing product blocking my journey today",
+        "I have issue in booking my ticket and the train leaves in an hour",
+    ],
+    "technical_issue": [
+        "The app crashes when I open my bookings",
+        "Page keeps loading and OTP is not received",
+        "Getting a server error while logging in",
+    ],
+    "new_booking": [
+        "I want to book a train ticket from Delhi to Mumbai",
+        "How can I book a new ticket for next week",
+        "Book two seats on the morning train",
+    ],
+    "cancellation": [
+        "I am not able to cancel ticket",
+        "How do I cancel my train ticket",
+        "Please cancel my booking",
+    ],
+    "reschedule": [
+        "I want to change the date of my journey",
+        "Can I move my ticket to a later train",
+        "Reschedule my booking to next Monday",
+    ],
+    "seat_change": [
+        "I want a window seat instead of the middle berth",
+        "Can I change my seat to a lower berth",
+        "Please allot me a seat near my family",
+    ],
+    "payment_issue": [
+        "Money was debited but ticket not booked",
+        "My payment failed while booking",
+        "UPI payment is stuck in pending",
+    ],
+    "discount_coupon_issue": [
+        "My promo code is not working",
+        "Coupon discount was not applied to my booking",
+        "Senior citizen concession not applied",
+    ],
+    "booking_confirmation": [
+        "I did not receive my booking confirmation",
+        "I have lost my phone and cant retrive the ticket",
+        "I lost my ticket, please resend it",
+    ],
+    "waitlist_enquiry": [
+        "What is the status of my waitlisted ticket",
+        "Will my RAC ticket get confirmed",
+        "My PNR shows WL 12, what are the chances",
+    ],
+    "tatkal_booking": [
+        "How do I book a tatkal ticket",
+        "Tatkal booking opens at what time",
+        "Can I cancel a tatkal ticket and get a refund",
+    ],
+    "special_assistance": [
+        "I need a wheelchair at the station",
+        "Assistance for a senior citizen travelling alone",
+        "Facilities for passengers with disabilities",
+    ],
+    "baggage_luggage": [
+        "How much luggage can I carry on the train",
+        "I left my bag on the train",
+        "Charges for extra baggage",
+    ],
+    "travel_passes": [
+        "How do I renew my monthly season pass",
+        "Buy a rail travel pass for students",
+        "My travel card is not working at the gate",
+    ],
+    "group_booking": [
+        "I want to book tickets for a group of 30 people",
+        "Group booking for a school trip",
+        "Can I reserve a whole coach for a wedding party",
+    ],
+    "general_enquiry": [
+        "What time does the train to Chennai leave",
+        "What documents do I need to travel",
+        "General question about train timings",
+    ],
+    "high_priority_escalation": [
+        "This is my third complaint and nobody has responded, escalate now",
+        "I want to speak to a manager immediately",
+        "Unacceptable service, escalating to higher authority",
+    ],
+}
+
+LOCAL_MIN_SCORE = 0.45   # 🔹 Cosine similarity to the nearest centroid needed to skip the LLM
+LOCAL_MIN_MARGIN = 0.03  # 🔹 ...and how far ahead of the runner-up it must be
+LLM_CONCURRENCY = 4      # 🔹 Parallel Groq requests in a batch
+LLM_MAX_RETRIES = 4      # 🔹 Retries on rate limits / transient errors, with exponential backoff
+LLM_BACKOFF_SECONDS = 1.0
+
+# Results by content hash; categories don't go stale, so entries only leave by LRU eviction
+category_cache = TTLCache(maxsize=10000, ttl=0)
+
+
+def normalize_category(text: str) -> str | None:
+    """Map raw model output (quotes, spaces, extra words) to a name in CATEGORIES, or None."""
+    cleaned = re.sub(r"[^a-z_ ]", "", text.strip().lower()).strip().replace(" ", "_")
+    if cleaned in CATEGORIES:
+        return cleaned
+    for c in sorted(CATEGORIES, key=len, reverse=True):
+        if c in cleaned:
+            return c
+    return None
+
+
+# -----------------------------
+# Local classifier (nearest centroid over EMBED_MODEL vectors)
+# -----------------------------
+class LocalCategorizer:
+    def __init__(self, embeddings, examples: dict[str, list[str]] = CATEGORY_EXAMPLES, labels: list[str] | None = None):
+        self.embeddings = embeddings
+        self.labels = list(labels or CATEGORIES)
+        self._texts = {c: list(examples.get(c, [])) or [c.replace("_", " ")] for c in self.labels}
+        self._centroids = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(m: np.ndarray) -> np.ndarray:
+        return m / np.clip(np.linalg.norm(m, axis=-1, keepdims=True), 1e-12, None)
+
+    def _build(self) -> np.ndarray:
+        with self._lock:
+            if self._centroids is None:
+                texts = [t for c in self.labels for t in self._texts[c]]
+                vecs = self._normalize(np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32))
+                centroids, start = [], 0
+                for c in self.labels:
+                    n = len(self._texts[c])
+                    centroids.append(vecs[start:start + n].mean(axis=0))
+                    start += n
+                self._centroids = self._normalize(np.stack(centroids))
+            return self._centroids
+
+    def add_examples(self, texts: list[str], labels: list[str]) -> None:
+        """Teach the classifier from labelled tickets (e.g. closed rows with a valid category)."""
+        with self._lock:
+            for t, l in zip(texts, labels):
+                if l in self._texts and t:
+                    self._texts[l].append(t)
+            self._centroids = None
+
+    def classify(self, contents: list[str]) -> list[tuple[str, float, float]]:
+        """One embedding pass for the whole batch. Returns (category, score, margin) per ticket."""
+        if not contents:
+            return []
+        centroids = self._build()
+        vecs = self._normalize(np.asarray(self.embeddings.embed_documents(list(contents)), dtype=np.float32))
+        scores = vecs @ centroids.T
+        top2 = np.argsort(-scores, axis=1)[:, :2]
+        results = []
+        for i, (best, second) in enumerate(top2):
+            s1, s2 = float(scores[i, best]), float(scores[i, second])
+            results.append((self.labels[best], s1, s1 - s2))
+        return results
+
+
+_local = None
+_local_lock = threading.Lock()
+
+
+def get_local_categorizer() -> LocalCategorizer:
+    global _local
+    if _local is None:
+        with _local_lock:
+            if _local is None:
+                _local = LocalCategorizer(get_base_embeddings())
+    return _local
+
+
+def _confident(score: float, margin: float) -> bool:
+    return score >= LOCAL_MIN_SCORE and margin >= LOCAL_MIN_MARGIN
+
+
+def content_key(content: str) -> str:
+    """Hash of the ticket text with case and whitespace normalised, so trivial variants share a result."""
+    return hashlib.sha256(" ".join(content.lower().split()).encode("utf-8")).hexdigest()
+
+
+def _retry_after(e: Exception) -> float | None:
+    response = getattr(e, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def categorize_ticket_llm(content: str, model: str = "llama-3.1-8b-instant", parent=None) -> str | None:
     """
     Use Groq LLM to categorize a ticket.
+    Rate limits and transient errors are retried with backoff (honouring Retry-After).
+    Returns a category from CATEGORIES, or None if the call failed or the answer was not a category.
+    `parent` is the trace span to record the call under when it runs in a worker thread.
+    """
+    with span("categorize.llm", parent, model=model) as trace:
+        return _categorize_llm(content, model, trace)
+
+
+def _categorize_llm(content: str, model: str, trace) -> str | None:
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        trace.set(attempts=attempt + 1)
+        try:
+            response = get_groq_client().chat.completions.create(
+                messages=[
+                    {"role": "system", "content": f"""
+                    You are an expert support ticket categorizer.
+                    Analyze the SEMANTIC MEANING of the ticket.
+                    Choose the most appropriate category from:
+                    {CATEGORIES}.
+                    Return ONLY the category name.
+                    """},
+                    {"role": "user", "content": f"Ticket content: {content}"}
+                ],
+                model=model,
+                temperature=0.0,
+            )
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                trace.set(input_tokens=usage.prompt_tokens, output_tokens=usage.completion_tokens)
+            return normalize_category(response.choices[0].message.content)
+        except (RateLimitError, APIConnectionError, InternalServerError) as e:
+            if attempt == LLM_MAX_RETRIES:
+                print("⚠️ Error in categorization (giving up):", e)
+                return None
+            delay = _retry_after(e) or LLM_BACKOFF_SECONDS * (2 ** attempt)
+            time.sleep(delay + random.uniform(0, delay / 4))
+        except Exception as e:
+            print("⚠️ Error in categorization:", e)
+            return None
+    return None
+
+
+def categorize_tickets(contents: list[str], use_llm: bool = True, model: str = "llama-3.1-8b-instant") -> list[str]:
+    """
+    Categorize many tickets at once.
+    Identical contents are classified once, cached results are reused, the rest go
+    through one local embedding pass, and only low-confidence tickets reach the LLM
+    (at most LLM_CONCURRENCY requests in flight). Always returns names from CATEGORIES.
+    """
+    with span("categorize", tickets=len(contents)) as trace:
+        return _categorize_tickets(contents, use_llm, model, trace)
+
+
+def _categorize_tickets(contents: list[str], use_llm: bool, model: str, trace) -> list[str]:
+    keys = [content_key(c) for c in contents]
+    unique: dict[str, str] = {}
+    for k, c in zip(keys, contents):
+        if k not in unique and category_cache.get(k) is None:
+            unique[k] = c
+    trace.set(cache="hit" if not unique else "miss")
+
+    resolved: dict[str, str] = {}
+    if unique:
+        todo_keys, todo = list(unique), list(unique.values())
+        try:
+            local = get_local_categorizer().classify(todo)
+        except Exception as e:
+            print("⚠️ Local categorizer unavailable:", e)
+            local = [("general_enquiry", 0.0, 0.0)] * len(todo)
+
+        unsure = []
+        for k, c, (category, score, margin) in zip(todo_keys, todo, local):
+            resolved[k] = category if score > 0 else "general_enquiry"
+            if _confident(score, margin):
+                category_cache.set(k, category)
+            elif use_llm:
+                unsure.append((k, c))
+
+        trace.set(llm_calls=len(unsure))
+        if unsure:
+            with ThreadPoolExecutor(max_workers=LLM_CONCURRENCY) as pool:
+                answers = pool.map(lambda kc: categorize_ticket_llm(kc[1], model, parent=trace), unsure)
+                for (k, _), answer in zip(unsure, answers):
+                    if answer:
+                        resolved[k] = answer
+                        category_cache.set(k, answer)
+
+    return [resolved.get(k) or category_cache.get(k) or "general_enquiry" for k in keys]
+
+
+def categorize_ticket(content: str, model: str = "llama-3.1-8b-instant") -> str:
+    """
+    Categorize one ticket: local nearest-centroid classifier first, Groq LLM only when it is unsure.
     Returns the most appropriate category from CATEGORIES.
     """
-    try:
-        response = groq_client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": f"""
-                You are an expert support ticket categorizer.
-                Analyze the SEMANTIC MEANING of the ticket.
-                Choose the most appropriate category from:
-                {CATEGORIES}.
-                Return ONLY the category name.
-                """},
-                {"role": "user", "content": f"Ticket content: {content}"}
-            ],
-            model=model,
-            temperature=0.0,
-        )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        print("⚠️ Error in categorization:", e)
-        return "general_enquiry"
+    return categorize_tickets([content], model=model)[0]
@@ -1,9 +1,19 @@
+import uuid
 import streamlit as st
-from ai3 import agent  # Import your LangChain agent with memory
+from ai3 import stream_answer, warm_up  # Import your LangChain agent with memory
+from raghugging import rag_status
 def chatbot():
     st.set_page_config(page_title="AI Ticket Assistant Chatbot", layout="wide")
     st.title("🤖 AI Ticket Assistant Chatbot")
 
+    # Build the knowledge base in the background; the page renders right away
+    warm_up()
+    status = rag_status()
+    if status == "warming":
+        st.info("⏳ Knowledge base is warming up - ticket lookups work now, document answers will be slower until it is ready.")
+    elif status == "failed":
+        st.warning("⚠️ Knowledge base failed to load; retrying in the background.")
+
     st.markdown(
         "Chat with the AI assistant about tickets, lookup, update, or save tickets."
     )
@@ -11,25 +21,43 @@ def chatbot():
     # Initialize chat history in session state
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    # Each browser session gets its own agent memory
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
 
     # Chat input
     user_input = st.text_input("Type your message here and press Enter:", key="input")
 
+    # Display chat messages
+    for message in st.session_state.messages:
+        if message["role"] == "user":
+            st.markdown(f"**You:** {message['content']}")
+        else:
+            st.markdown(f"**AI:** {message['content']}")
+
     if user_input:
         # Add user message to chat
         st.session_state.messages.append({"role": "user", "content": user_input})
+        st.markdown(f"**You:** {user_input}")
 
-        # Get AI response
-        with st.spinner("🤖 AI is typing..."):
-            response = agent.invoke({"input": user_input})
-            ai_message = response.get("output", "No response from agent.")
+        # Stream AI response: tool steps in a status box, answer tokens as they arrive
+        steps = st.status("🤖 AI is typing...", expanded=False)
+        placeholder = st.empty()
+        ai_message = ""
+        for event in stream_answer(user_input, session_id=st.session_state.session_id):
+            if event["type"] == "tool_start":
+                steps.write(f"🔧 **{event['tool']}** ← {event['input']}")
+            elif event["type"] == "tool_end":
+                steps.write(event["output"][:500])
+            elif event["type"] == "token":
+                ai_message += event["text"]
+                placeholder.markdown(f"**AI:** {ai_message}▌")
+            elif event["type"] == "final":
+                ai_message = event["output"]
+            elif event["type"] == "error":
+                ai_message = f"⚠️ Error: {event['error']}"
+        steps.update(label="✅ Done", state="complete")
+        placeholder.markdown(f"**AI:** {ai_message}")
 
         # Add AI message to chat
         st.session_state.messages.append({"role": "assistant", "content": ai_message})
-
-    # Display chat messages
-    for message in st.session_state.messages:
-        if message["role"] == "user":
-            st.markdown(f"**You:** {message['content']}")
-        else:
-            st.markdown(f"**AI:** {message['content']}")
@@ -1,38 +1,55 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-from collections import Counter
-def dashboard():
-  
-    # -----------------------------
-    # Google Sheets setup
-    # -----------------------------
-    scope = ["https://spreadsheets.google.com/feeds",
-            "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_name("credentials.json", scope)
-    gspread_client = gspread.authorize(creds)
+from dashboard_data import data_version, get_rollups, ticket_page, refresh_ticket_data, latency_summary, PAGE_SIZES
+from ticket_store import SORTABLE_COLUMNS, CLOSED_STATUSES
+from alert import automated_alerts
+
+
+def ticket_table(key: str, rollups, status=None):
+    """
+    Filter / search / sort controls plus one page of tickets. Only the visible page is
+    queried and sent to the browser; see dashboard_data.ticket_page.
+    """
+    c1, c2, c3 = st.columns([3, 2, 2])
+    search = c1.text_input("Search content or user", key=f"{key}_search")
+    categories = c2.multiselect("Category", sorted(rollups.counts("by_category")), key=f"{key}_category")
+    if status is None:
+        status = c3.multiselect("Status", sorted(rollups.counts("by_status")), key=f"{key}_status")
+
+    c4, c5, c6, c7 = st.columns(4)
+    sort_by = c4.selectbox("Sort by", SORTABLE_COLUMNS, key=f"{key}_sort")
+    descending = c5.toggle("Descending", key=f"{key}_desc")
+    page_size = c6.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_size")
+    page = c7.number_input("Page", min_value=1, value=1, step=1, key=f"{key}_page")
+
+    page_df, total = ticket_page(status=status, category=categories, search=search, sort_by=sort_by,
+                                 descending=descending, page=int(page), page_size=page_size)
+    pages = max(1, -(-total // page_size))
+    if page_df.empty:
+        st.info("No tickets match these filters." if total == 0 else f"Only {pages} page(s) of results.")
+        return total
+    st.dataframe(page_df, use_container_width=True, hide_index=True)
+    first = (int(page) - 1) * page_size + 1
+    st.caption(f"Showing {first}-{first + len(page_df) - 1} of {total} tickets (page {int(page)} of {pages})")
+    return total
 
-    SHEET_NAME = "MyDatabaseSheet"
-    sheet = gspread_client.open(SHEET_NAME)
-    ticket_sheet = sheet.sheet1
+
+def dashboard():
 
     # -----------------------------
-    # Load data
+    # Load data (shared, cached; reruns don't touch the sheet)
     # -----------------------------
-    all_tickets = ticket_sheet.get_all_records()
-    df = pd.DataFrame(all_tickets)
+    if st.sidebar.button("🔄 Refresh data"):
+        refresh_ticket_data()
+    data_version()            # re-syncs the ticket store when due; the rollups follow each sync
+    rollups = get_rollups()   # counts and trends, maintained on every ticket change
+    kpis = rollups.kpis()
 
-    # Normalize column names
-    df.columns = [c.strip().lower() for c in df.columns]
-
-    if df.empty:
+    if kpis["total"] == 0:
         st.warning("No ticket data available yet!")
         st.stop()
 
-    # Pending subset
-    pending_data = df[df['ticket_status'].str.lower() == 'pending']
     st.title("📊 Ticket Analytics Dashboard")
 
     # -----------------------------
@@ -40,15 +57,10 @@ def dashboard():
     # -----------------------------
     col1, col2, col3, col4 = st.columns(4)
 
-    total_tickets = len(df)
-    resolved = df[df["ticket_status"].str.lower() == "closed"].shape[0]
-    unresolved = df[df["ticket_status"].str.lower() == "pending"].shape[0]
-    resolution_per = (resolved / total_tickets) * 100 if total_tickets > 0 else 0
-
-    col1.metric("Total Tickets", total_tickets)
-    col2.metric("Resolved", resolved)
-    col3.metric("Unresolved", unresolved)
-    col4.metric("Resolution Percentage", f"{resolution_per:.2f}%")
+    col1.metric("Total Tickets", kpis["total"])
+    col2.metric("Resolved", kpis["resolved"])
+    col3.metric("Unresolved", kpis["unresolved"])
+    col4.metric("Resolution Percentage", f"{kpis['resolution_pct']:.2f}%")
 
     # -----------------------------
     # Donut charts
@@ -56,9 +68,8 @@ def dashboard():
     col4, col5 = st.columns(2)
 
     # Ticket status distribution
-    if "ticket_status" in df.columns:
-        status_counts = df["ticket_status"].value_counts().reset_index()
-        status_counts.columns = ["Status", "Count"]
+    status_counts = pd.DataFrame(rollups.counts("by_status").items(), columns=["Status", "Count"])
+    if not status_counts.empty:
         fig_status = px.pie(
             status_counts,
             values="Count",
@@ -70,9 +81,8 @@ def dashboard():
         col4.plotly_chart(fig_status, use_container_width=True)
 
     # Ticket category distribution
-    if "ticket_category" in df.columns:
-        category_counts = df["ticket_category"].value_counts().reset_index()
-        category_counts.columns = ["Category", "Count"]
+    category_counts = pd.DataFrame(rollups.counts("by_category").items(), columns=["Category", "Count"])
+    if not category_counts.empty:
         fig_category = px.pie(
             category_counts,
             values="Count",
@@ -88,9 +98,8 @@ def dashboard():
     # -----------------------------
     col6, = st.columns(1)
 
-    if not pending_data.empty and "ticket_category" in pending_data.columns:
-        pending_counts = pending_data["ticket_category"].value_counts().reset_index()
-        pending_counts.columns = ["Category", "Count"]
+    pending_counts = pd.DataFrame(rollups.counts("open_by_category").items(), columns=["Category", "Count"])
+    if not pending_counts.empty:
         fig_pending = px.pie(
             pending_counts,
             values="Count",
@@ -101,19 +110,55 @@ def dashboard():
         )
         col6.plotly_chart(fig_pending, use_container_width=True)
 
+    # -----------------------------
+    # Trends (from the daily / hourly rollups)
+    # -----------------------------
+    st.subheader("📈 Trends")
+    daily = pd.DataFrame(rollups.daily())
+    if not daily.empty:
+        fig_daily = px.line(daily, x="Day", y=["Created", "Closed", "Backlog"], markers=True,
+                            title="Tickets per Day and Open Backlog")
+        st.plotly_chart(fig_daily, use_container_width=True)
+
+    col7, col8 = st.columns(2)
+    fig_hourly = px.bar(pd.DataFrame(rollups.hourly()), x="Hour", y="Created", title="Tickets by Hour of Day")
+    col7.plotly_chart(fig_hourly, use_container_width=True)
+
+    age = rollups.backlog_age()
+    age_df = pd.DataFrame(age["buckets"].items(), columns=["Age", "Open Tickets"])
+    fig_age = px.bar(age_df, x="Age", y="Open Tickets", title="Open Backlog by Age")
+    col8.plotly_chart(fig_age, use_container_width=True)
+
+    res = rollups.resolution_time()
+    col9, col10, col11, col12 = st.columns(4)
+    col9.metric("Median Resolution", f"{res['p50']:.1f} h" if res["p50"] is not None else "N/A")
+    col10.metric("90th pct Resolution", f"{res['p90']:.1f} h" if res["p90"] is not None else "N/A")
+    col11.metric("Oldest Open Ticket", f"{age['oldest_hours'] / 24:.1f} days" if age["oldest_hours"] is not None else "N/A")
+    col12.metric("Mean Backlog Age", f"{age['mean_hours'] / 24:.1f} days" if age["mean_hours"] is not None else "N/A")
+
+    # -----------------------------
+    # Assistant latency per stage (spans from the trace file, see tracing.py)
+    # -----------------------------
+    st.subheader("⏱️ Assistant Latency by Stage")
+    latency = pd.DataFrame(latency_summary())
+    if latency.empty:
+        st.info("No traces yet: stages show up here once the assistant has answered questions.")
+    else:
+        fig_latency = px.bar(latency, x="Stage", y=["p50_ms", "p95_ms"], barmode="group",
+                             title="p50 / p95 Latency per Stage (ms)")
+        st.plotly_chart(fig_latency, use_container_width=True)
+        st.dataframe(latency, use_container_width=True)
+
     # -----------------------------
     # Track article references / usage
     # -----------------------------
     st.subheader("📌 Article / Knowledge Base Insights")
 
-    if "ticket_content" in df.columns:
-        # Count frequency of each unique content/article
-        article_counts = Counter(df["ticket_content"])
-        article_df = pd.DataFrame(article_counts.items(), columns=["Article", "References"])
-        article_df = article_df.sort_values(by="References", ascending=False)
-
-        st.markdown("**Top Referenced Articles / Queries**")
-        st.dataframe(article_df.head(10), use_container_width=True)
+    top_clusters = rollups.top_clusters(10)
+    if top_clusters:
+        # Reworded duplicates are grouped into one cluster (see dedup.py)
+        st.markdown("**Top Referenced Articles / Queries** (near-duplicates grouped)")
+        st.dataframe(pd.DataFrame(top_clusters), use_container_width=True)
 
         # Identify articles never referenced (if you have a list of all articles)
         # Example: `all_articles = ["Article1", "Article2", ...]`
@@ -126,8 +171,8 @@ def dashboard():
     # -----------------------------
     st.subheader("🚨 Low Coverage Categories / Alerts")
 
-    if "ticket_category" in df.columns:
-        category_counts_dict = df["ticket_category"].value_counts().to_dict()
+    if not category_counts.empty:
+        category_counts_dict = dict(zip(category_counts["Category"], category_counts["Count"]))
         # Define threshold (e.g., categories with <5 tickets)
         threshold = 5
         low_coverage = {cat: count for cat, count in category_counts_dict.items() if count < threshold}
@@ -137,6 +182,11 @@ def dashboard():
         else:
             st.success("All categories have sufficient coverage!")
 
+        # Mail the same conditions to ALERT_RECIPIENTS (at most once per cooldown, in digests)
+        queued = automated_alerts(low_coverage, kpis["unresolved"], threshold)
+        if queued:
+            st.caption("📨 Alert queued: " + "; ".join(queued))
+
     # -----------------------------
     # Tabs for ticket tables
     # -----------------------------
@@ -144,11 +194,11 @@ def dashboard():
     tab1, tab2 = st.tabs(["🚨 Unresolved Queries", "📑 All Queries"])
 
     with tab1:
-        unresolved_df = df[df["ticket_status"].str.lower() == "pending"]
-        if not unresolved_df.empty:
-            st.dataframe(unresolved_df, use_container_width=True)
+        if kpis["unresolved"]:
+            open_statuses = [s for s in rollups.counts("by_status") if s not in CLOSED_STATUSES]
+            ticket_table("unresolved", rollups, status=open_statuses)
         else:
             st.success("🎉 No unresolved queries!")
 
     with tab2:
-        st.dataframe(df, use_container_width=True)
+        ticket_table("all", rollups)
@@ -0,0 +1,85 @@
+import os
+import threading
+import pandas as pd
+from cache import TTLCache
+from rollups import TicketRollups
+from ticket_store import TICKET_COLUMNS
+from ai3 import get_ticket_repository
+from tracing import TRACE_FILE, read_spans, summarize
+
+DASHBOARD_REFRESH_SECONDS = 30  # 🔹 How often the dashboard asks the ticket store whether anything changed
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+_cache = TTLCache(maxsize=256, ttl=DASHBOARD_REFRESH_SECONDS)
+_lock = threading.Lock()
+
+
+def data_version() -> int:
+    """
+    Version of the ticket store, checked at most every DASHBOARD_REFRESH_SECONDS. Checking
+    re-syncs the store's local copy when it is due (every TICKET_SYNC_SECONDS); between
+    syncs every read is served locally, so reruns and widget clicks never touch the sheet.
+    """
+    version = _cache.get("version")
+    if version is None:
+        version = get_ticket_repository().version
+        _cache.set("version", version)
+    return version
+
+
+def ticket_page(status=None, category=None, search: str = "", sort_by: str = "row_number",
+                descending: bool = False, page: int = 1, page_size: int = 50) -> tuple[pd.DataFrame, int]:
+    """
+    One page of the ticket table as a DataFrame, plus the number of matching tickets.
+    Filtering, search, sorting and paging run as indexed queries on the repository's
+    SQLite copy; results are shared by every session until the data changes.
+    """
+    status = tuple(status) if isinstance(status, (list, tuple)) else status
+    category = tuple(category) if isinstance(category, (list, tuple)) else category
+    key = ("page", data_version(), status, category, search.strip(), sort_by, descending, page, page_size)
+    cached = _cache.get(key)
+    if cached is None:
+        rows, total = get_ticket_repository().query(
+            status=status, category=category, search=search, sort_by=sort_by,
+            descending=descending, limit=page_size, offset=(page - 1) * page_size
+        )
+        cached = (pd.DataFrame(rows, columns=TICKET_COLUMNS), total)
+        _cache.set(key, cached)
+    return cached
+
+
+_rollups: TicketRollups | None = None
+
+
+def get_rollups() -> TicketRollups:
+    """Aggregates kept current by the ticket repository on every save and status change."""
+    global _rollups
+    if _rollups is None:
+        with _lock:
+            if _rollups is None:
+                rollups = TicketRollups()
+                get_ticket_repository().add_listener(rollups)
+                _rollups = rollups
+    return _rollups
+
+
+def latency_summary() -> list[dict]:
+    """p50/p95 per stage over the most recent spans in the trace file, re-read only when it grows."""
+    try:
+        stat = os.stat(TRACE_FILE)
+    except OSError:
+        return []
+    key = ("latency", stat.st_mtime, stat.st_size)
+    cached = _cache.get(key)
+    if cached is None:
+        cached = summarize(read_spans(TRACE_FILE))
+        _cache.set(key, cached)
+    return cached
+
+
+def refresh_ticket_data() -> None:
+    """Re-read the sheet now instead of waiting for the next sync."""
+    with _lock:
+        get_ticket_repository().sync()
+        _cache.clear()
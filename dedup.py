@@ -0,0 +1,166 @@
+import hashlib
+import threading
+import time
+from collections import defaultdict
+import numpy as np
+from retrieval import tokenize
+from ticket_store import CLOSED_STATUSES
+
+NUM_PERM = 64              # 🔹 MinHash signature length
+BANDS = 16                 # 🔹 16 bands x 4 rows: pairs above ~0.5 Jaccard almost always share a bucket
+DUPLICATE_THRESHOLD = 0.5  # 🔹 Word/bigram Jaccard similarity at which a new ticket counts as a duplicate
+MIN_SHINGLES = 3           # 🔹 Texts shorter than this ("refund") are too vague to call duplicates
+
+_PRIME = (1 << 31) - 1     # hashes are reduced below this, so a * h + b fits in uint64
+_rng = np.random.default_rng(42)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+
+
+def shingles(text: str) -> set[str]:
+    """Words plus word bigrams, so reordered and slightly reworded tickets still overlap."""
+    tokens = tokenize(text)
+    return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+
+def minhash(sh: set[str]) -> tuple[int, ...]:
+    h = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") % _PRIME for s in sh),
+        dtype=np.uint64, count=len(sh)
+    )
+    return tuple(((np.outer(_A, h) + _B[:, None]) % np.uint64(_PRIME)).min(axis=1).tolist())
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def cluster_id(row: dict) -> str:
+    """The ticket a row's duplicate cluster is named after (itself unless it was linked on save)."""
+    return row.get("ticket_duplicate_of") or row["ticket_id"]
+
+
+class MinHashLSH:
+    """
+    Incremental near-duplicate index: each text's MinHash signature is cut into bands
+    and a query only compares against texts sharing at least one band bucket.
+    Candidates are confirmed with the exact Jaccard similarity of their shingles.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, bands: int = BANDS):
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets: dict[tuple, set[str]] = defaultdict(set)
+        self._items: dict[str, tuple[set[str], tuple[int, ...]]] = {}
+
+    def _band_keys(self, signature: tuple[int, ...]):
+        for i in range(self.bands):
+            yield (i,) + signature[i * self.rows:(i + 1) * self.rows]
+
+    def add(self, key: str, text: str) -> bool:
+        """Index `text` under `key` (replacing any previous text). Returns False if it is too short to index."""
+        self.remove(key)
+        sh = shingles(text)
+        if len(sh) < MIN_SHINGLES:
+            return False
+        signature = minhash(sh)
+        self._items[key] = (sh, signature)
+        for band in self._band_keys(signature):
+            self._buckets[band].add(key)
+        return True
+
+    def remove(self, key: str) -> bool:
+        item = self._items.pop(key, None)
+        if item is None:
+            return False
+        for band in self._band_keys(item[1]):
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band]
+        return True
+
+    def query(self, text: str, threshold: float = DUPLICATE_THRESHOLD) -> list[tuple[str, float]]:
+        """Indexed keys whose text has Jaccard similarity >= threshold with `text`, best first."""
+        sh = shingles(text)
+        if len(sh) < MIN_SHINGLES:
+            return []
+        candidates = set()
+        for band in self._band_keys(minhash(sh)):
+            candidates |= self._buckets.get(band, set())
+        scored = [(key, jaccard(sh, self._items[key][0])) for key in candidates]
+        return sorted([(k, s) for k, s in scored if s >= threshold], key=lambda x: -x[1])
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class DuplicateDetector:
+    """
+    Open tickets in a MinHashLSH index, so a new ticket can be linked to an open
+    ticket that reports the same problem. Syncs from an attached row source on
+    first use and every `refresh_seconds`; `on_ticket_changed(row)` keeps it current
+    between syncs (closed tickets leave the index).
+    """
+
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD, refresh_seconds: float = 300):
+        self.threshold = threshold
+        self.refresh_seconds = refresh_seconds
+        self.lsh = MinHashLSH()
+        self._roots: dict[str, str] = {}  # open ticket_id -> cluster id
+        self._source = None
+        self._synced_at = 0.0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def is_open(row: dict) -> bool:
+        return str(row.get("ticket_status", "")).strip().lower() not in CLOSED_STATUSES
+
+    def attach(self, source) -> None:
+        self._source = source
+        self._synced_at = 0.0
+
+    def sync(self, rows: list[dict]) -> None:
+        with self._lock:
+            self.lsh = MinHashLSH()
+            self._roots = {}
+            for row in rows:
+                self.on_ticket_changed(row)
+            self._synced_at = time.monotonic()
+
+    def _ensure_synced(self) -> None:
+        if self._source is None or time.monotonic() - self._synced_at < self.refresh_seconds:
+            return
+        with self._lock:
+            if time.monotonic() - self._synced_at < self.refresh_seconds:
+                return
+            try:
+                self.sync(self._source())
+            except Exception as e:
+                print(f"[WARN] Duplicate index sync failed: {e}")
+                self._synced_at = time.monotonic()
+
+    def on_ticket_changed(self, row: dict) -> None:
+        with self._lock:
+            tid = row["ticket_id"]
+            if self.is_open(row) and row.get("ticket_content") and self.lsh.add(tid, row["ticket_content"]):
+                self._roots[tid] = cluster_id(row)
+            else:
+                self.lsh.remove(tid)
+                self._roots.pop(tid, None)
+
+    def find(self, content: str, exclude: str | None = None) -> tuple[str, str, float] | None:
+        """Best open match for `content` as (matched ticket_id, its cluster id, similarity), or None."""
+        self._ensure_synced()
+        with self._lock:
+            for tid, score in self.lsh.query(content, self.threshold):
+                if tid != exclude:
+                    return tid, self._roots.get(tid, tid), score
+        return None
+
+    def __len__(self) -> int:
+        return len(self.lsh)
@@ -2,6 +2,10 @@ import streamlit as st
 from dashboard2 import dashboard
 from chatbot import chatbot
 from alert import gmail_alert_sidebar  # your alert function
+from ai3 import warm_up
+
+# Start building the knowledge base in the background so whichever page opens first isn't blocked
+warm_up()
 
 # -----------------------------
 # Session state to remember page
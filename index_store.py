@@ -0,0 +1,150 @@
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+# On-disk layout: <root>/<key>/index.faiss + docstore.pkl
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.pkl"
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def index_key(paths: list[Path], embed_model: str, chunk_size: int, chunk_overlap: int, index_spec: str = "") -> str:
+    """Content address of an index: source files plus every setting that shapes the vectors."""
+    h = hashlib.sha256()
+    h.update(f"{embed_model}|{chunk_size}|{chunk_overlap}".encode())
+    if index_spec:
+        h.update(f"|{index_spec}".encode())
+    for p in sorted(paths):
+        h.update(f"|{p.as_posix()}:{file_sha256(p)}".encode())
+    return h.hexdigest()[:16]
+
+
+def save_faiss(vectorstore: FAISS, dest: Path) -> None:
+    """Write the index to `dest` atomically so concurrent readers never see a half-written snapshot."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=dest.parent))
+    try:
+        faiss.write_index(vectorstore.index, str(tmp / INDEX_FILE))
+        with open(tmp / DOCSTORE_FILE, "wb") as f:
+            pickle.dump((vectorstore.docstore, vectorstore.index_to_docstore_id), f)
+        try:
+            os.replace(tmp, dest)
+        except OSError:
+            # Another process published the same key first - theirs is identical.
+            pass
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def load_faiss(src: Path, embeddings, mmap: bool = True) -> FAISS:
+    """
+    Load an index written by `save_faiss`.
+    With mmap=True the vectors are memory-mapped read-only, so every process
+    on the box shares the same page-cache pages instead of a private copy.
+    """
+    path = str(src / INDEX_FILE)
+    index = None
+    if mmap:
+        # IO_FLAG_MMAP_IFC maps flat codes (faiss >= 1.9); older builds only map IVF lists
+        flags = faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+        try:
+            index = faiss.read_index(path, flags)
+        except RuntimeError as e:
+            print(f"[WARN] mmap load failed for {path}, reading into memory: {e}")
+    if index is None:
+        index = faiss.read_index(path)
+    with open(src / DOCSTORE_FILE, "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+
+def prune_indexes(root: Path, keep: str) -> None:
+    """Drop stale snapshots. Readers that still map them keep working until they exit."""
+    if not root.exists():
+        return
+    for p in root.iterdir():
+        if p.is_dir() and p.name != keep and not p.name.startswith(".tmp-"):
+            shutil.rmtree(p, ignore_errors=True)
+
+
+# -----------------------------
+# Index types
+# -----------------------------
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+STORAGE_TYPES = ("float32", "float16", "pq")
+
+
+def make_index(kind: str, storage: str, dim: int, train: np.ndarray,
+               nlist: int = 256, nprobe: int = 16, pq_m: int = 16, hnsw_m: int = 32, ef_search: int = 64):
+    """
+    Build an empty (trained) FAISS index.
+        kind:    flat (exact scan) | ivf (inverted lists, searches nprobe of nlist cells) | hnsw (graph)
+        storage: float32 | float16 (scalar-quantised, half the memory) | pq (product-quantised, pq_m bytes per vector)
+    `train` is a sample of vectors; settings that need more training data than it has
+    are scaled down (nlist) or fall back (pq -> float16) with a warning.
+    """
+    if kind not in INDEX_TYPES or storage not in STORAGE_TYPES:
+        raise ValueError(f"Unknown index type {kind}/{storage}")
+    n = len(train)
+    if storage == "pq" and (n < 256 or dim % pq_m):
+        print(f"[WARN] PQ needs >= 256 training vectors and dim divisible by {pq_m}; using float16")
+        storage = "float16"
+    fp16 = faiss.ScalarQuantizer.QT_fp16
+
+    if kind == "ivf":
+        nlist = max(1, min(nlist, n // 39))  # faiss wants ~39 training points per cell
+        quantizer = faiss.IndexFlatL2(dim)
+        if storage == "pq":
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, 8)
+        elif storage == "float16":
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, fp16)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        index.nprobe = min(nprobe, nlist)
+    elif kind == "hnsw":
+        if storage == "pq":
+            index = faiss.IndexHNSWPQ(dim, pq_m, hnsw_m)
+        elif storage == "float16":
+            index = faiss.IndexHNSWSQ(dim, fp16, hnsw_m)
+        else:
+            index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efSearch = ef_search
+    else:
+        if storage == "pq":
+            index = faiss.IndexPQ(dim, pq_m, 8)
+        elif storage == "float16":
+            index = faiss.IndexScalarQuantizer(dim, fp16)
+        else:
+            index = faiss.IndexFlatL2(dim)
+
+    if not index.is_trained:
+        index.train(np.ascontiguousarray(train, dtype=np.float32))
+    return index
+
+
+def build_vectorstore(texts: list[str], metadatas: list[dict], ids: list[str], vectors: np.ndarray,
+                      embeddings, kind: str = "flat", storage: str = "float32",
+                      train_sample: int = 20000, **params) -> FAISS:
+    """A LangChain FAISS store over a `make_index` index, trained on a random sample of `vectors`."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    rng = np.random.default_rng(0)
+    sample = vectors[rng.choice(len(vectors), size=min(train_sample, len(vectors)), replace=False)]
+    index = make_index(kind, storage, vectors.shape[1], sample, **params)
+    vectorstore = FAISS(embeddings, index, InMemoryDocstore(), {})
+    vectorstore.add_embeddings(list(zip(texts, vectors.tolist())), metadatas=metadatas, ids=ids)
+    return vectorstore
@@ -0,0 +1,385 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator
+import numpy as np
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import TextLoader
+from langchain_community.vectorstores import FAISS
+from langchain_huggingface import HuggingFaceEmbeddings
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain.storage import LocalFileStore
+from index_store import file_sha256, index_key, save_faiss, load_faiss, prune_indexes, build_vectorstore
+from pdf_pages import page_count, read_pages
+
+# CONFIG
+DOCS_PATH = Path("./Train.pdf")
+EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"  # 🔹 Change HuggingFace model here
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 120
+INDEX_DIR = Path("./.faiss_index")  # 🔹 Persisted indexes, one sub-folder per content key
+EMBED_CACHE_DIR = Path("./.embedding_cache")  # 🔹 One cached vector per chunk text
+MANIFEST_FILE = INDEX_DIR / "manifest.json"
+INDEX_TYPE = "flat"         # 🔹 flat (exact) | ivf | hnsw - see bench_ann.py before switching
+VECTOR_STORAGE = "float32"  # 🔹 float32 | float16 | pq (product-quantised)
+INDEX_PARAMS = {"nlist": 256, "nprobe": 16, "pq_m": 16, "hnsw_m": 32, "ef_search": 64}
+TRAIN_SAMPLE = 20000        # 🔹 Vectors used to train IVF / PQ
+INGEST_WORKERS = max(1, (os.cpu_count() or 1) - 1)  # 🔹 Processes parsing PDF pages in parallel (`python ingest.py` only)
+PAGES_PER_TASK = 16         # 🔹 PDF pages parsed per worker task
+EMBED_BATCH_SIZE = 256      # 🔹 Chunks embedded and added to the index at a time
+
+
+def find_files(path: Path) -> list[Path]:
+    if path.is_file():
+        return [path]
+    exts = {".txt", ".md", ".pdf"}
+    return [p for p in path.rglob("*") if p.is_file() and p.suffix.lower() in exts]
+
+
+def load_documents(paths: list[Path]) -> list[Document]:
+    docs: list[Document] = []
+    for p in paths:
+        try:
+            docs.extend(iter_pages(p))
+        except Exception as e:
+            print(f"[WARN] Failed to load {p}: {e}")
+    return docs
+
+
+def split_documents(docs: list[Document]) -> list[Document]:
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP
+    )
+    return splitter.split_documents(docs)
+
+
+# -----------------------------
+# Streaming ingestion: pages -> chunks -> fixed-size embedding batches
+# -----------------------------
+def _page_ranges(path: Path, pool: ProcessPoolExecutor | None) -> Iterator[list[tuple[int, str]]]:
+    """Parsed page ranges of one PDF, in order. At most 2 * INGEST_WORKERS ranges are in flight."""
+    total = page_count(str(path))
+    ranges = deque((s, min(s + PAGES_PER_TASK, total)) for s in range(0, total, PAGES_PER_TASK))
+    if pool is None or len(ranges) < 2:
+        for start, stop in ranges:
+            yield read_pages(str(path), start, stop)
+        return
+    pending = deque()
+    while ranges or pending:
+        while ranges and len(pending) < 2 * INGEST_WORKERS:
+            start, stop = ranges.popleft()
+            pending.append(((start, stop), pool.submit(read_pages, str(path), start, stop)))
+        (start, stop), future = pending.popleft()
+        try:
+            pages = future.result()
+        except Exception as e:
+            raise RuntimeError(f"pages {start + 1}-{stop}: {e}") from e
+        yield pages
+
+
+def iter_pages(path: Path, pool: ProcessPoolExecutor | None = None) -> Iterator[Document]:
+    """
+    Pages of a PDF (or the whole text of a .txt/.md file) as Documents, in order,
+    with the same source/page metadata as PyPDFLoader. PDF pages are parsed in `pool`
+    when one is given; only a bounded window of pages is held at a time.
+    Raises if the file (or any page range) cannot be parsed, after yielding the pages before it.
+    """
+    if path.suffix.lower() in (".txt", ".md"):
+        yield from TextLoader(str(path), encoding="utf-8").load()
+    elif path.suffix.lower() == ".pdf":
+        for pages in _page_ranges(path, pool):
+            for number, text in pages:
+                yield Document(page_content=text, metadata={"source": str(path), "page": number})
+
+
+def iter_chunks(path: Path, pool: ProcessPoolExecutor | None = None) -> Iterator[Document]:
+    """Chunks of one file as its pages arrive; the same chunks split_documents gives for all pages at once."""
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP
+    )
+    for page in iter_pages(path, pool):
+        yield from splitter.split_documents([page])
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _needs_training() -> bool:
+    return INDEX_TYPE == "ivf" or VECTOR_STORAGE == "pq"
+
+
+class IndexWriter:
+    """
+    Embeds chunks batch by batch and adds them to a FAISS store, so vectors are never
+    all in memory at once. A new store is created from the first batch, or from the
+    first TRAIN_SAMPLE vectors when the index type needs training (IVF / PQ).
+    """
+
+    def __init__(self, embeddings, vectorstore: FAISS | None = None):
+        self.embeddings = embeddings
+        self.vectorstore = vectorstore
+        self._pending: list[tuple[list[str], list[dict], list[str], np.ndarray]] = []
+        self._pending_count = 0
+        self.added = 0
+        self.batches = 0
+
+    def add(self, docs: list[Document], ids: list[str]) -> None:
+        texts = [d.page_content for d in docs]
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        batch = (texts, [d.metadata for d in docs], ids, vectors)
+        self.added += len(ids)
+        self.batches += 1
+        if self.vectorstore is not None:
+            self._add(batch)
+            return
+        self._pending.append(batch)
+        self._pending_count += len(ids)
+        if not _needs_training() or self._pending_count >= TRAIN_SAMPLE:
+            self._create()
+
+    def _add(self, batch) -> None:
+        texts, metadatas, ids, vectors = batch
+        self.vectorstore.add_embeddings(list(zip(texts, vectors.tolist())), metadatas=metadatas, ids=ids)
+
+    def _create(self) -> None:
+        texts = [t for b in self._pending for t in b[0]]
+        metadatas = [m for b in self._pending for m in b[1]]
+        ids = [i for b in self._pending for i in b[2]]
+        vectors = np.concatenate([b[3] for b in self._pending])
+        self._pending, self._pending_count = [], 0
+        self.vectorstore = build_vectorstore(
+            texts, metadatas, ids, vectors, self.embeddings,
+            kind=INDEX_TYPE, storage=VECTOR_STORAGE, train_sample=TRAIN_SAMPLE, **INDEX_PARAMS
+        )
+
+    def finish(self) -> FAISS | None:
+        if self.vectorstore is None and self._pending:
+            self._create()
+        return self.vectorstore
+
+
+def page_pool() -> ProcessPoolExecutor | None:
+    """
+    Spawned worker processes for PDF parsing, or None to parse in-process.
+    Each worker re-imports the parent's __main__, so a pool is only started when that is this
+    script's guarded entry point; an index built from inside the app (raghugging) would otherwise
+    run the app's whole top level again in every worker.
+    """
+    if INGEST_WORKERS <= 1 or __name__ != "__main__":
+        return None
+    return ProcessPoolExecutor(max_workers=INGEST_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+
+def make_embeddings(base=None):
+    """HuggingFace embeddings with an on-disk cache keyed by chunk text, so unchanged chunks are never re-embedded."""
+    if base is None:
+        base = get_base_embeddings()
+    store = LocalFileStore(str(EMBED_CACHE_DIR))
+    return CacheBackedEmbeddings.from_bytes_store(base, store, namespace=EMBED_MODEL)
+
+
+_embed_lock = threading.Lock()
+_base_embeddings = None
+_embeddings = None
+
+
+def get_base_embeddings() -> HuggingFaceEmbeddings:
+    """The one EMBED_MODEL instance shared by retrieval, ingestion and the ticket categorizer."""
+    global _base_embeddings
+    if _base_embeddings is None:
+        with _embed_lock:
+            if _base_embeddings is None:
+                _base_embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+    return _base_embeddings
+
+
+def get_embeddings():
+    """Shared cache-backed embeddings (see make_embeddings)."""
+    global _embeddings
+    if _embeddings is None:
+        base = get_base_embeddings()
+        with _embed_lock:
+            if _embeddings is None:
+                _embeddings = make_embeddings(base)
+    return _embeddings
+
+
+def index_spec() -> str:
+    """Index type and parameters as a string, part of the index key and manifest settings."""
+    params = ",".join(f"{k}={v}" for k, v in sorted(INDEX_PARAMS.items()))
+    return f"{INDEX_TYPE}/{VECTOR_STORAGE}/{params}/train={TRAIN_SAMPLE}"
+
+
+def build_index(docs: list[Document], ids: list[str], embeddings) -> FAISS:
+    """Embed (through the cache) and index `docs` with the configured index type."""
+    if not docs:
+        raise ValueError("No documents to index")
+    texts = [d.page_content for d in docs]
+    vectors = embeddings.embed_documents(texts)
+    return build_vectorstore(
+        texts, [d.metadata for d in docs], ids, vectors, embeddings,
+        kind=INDEX_TYPE, storage=VECTOR_STORAGE, train_sample=TRAIN_SAMPLE, **INDEX_PARAMS
+    )
+
+
+def iter_chunk_ids(chunks: Iterable[Document]) -> Iterator[tuple[Document, str]]:
+    """Stable fingerprint per chunk: source, page and text, plus a counter for repeated text."""
+    seen = {}
+    for c in chunks:
+        raw = f"{c.metadata.get('source')}|{c.metadata.get('page')}|{c.page_content}"
+        digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:24]
+        seen[digest] = seen.get(digest, 0) + 1
+        yield c, f"{digest}-{seen[digest]}"
+
+
+def chunk_ids(chunks: list[Document]) -> list[str]:
+    return [i for _, i in iter_chunk_ids(chunks)]
+
+
+def read_manifest() -> dict:
+    try:
+        with open(MANIFEST_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(manifest: dict) -> None:
+    MANIFEST_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = MANIFEST_FILE.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, MANIFEST_FILE)
+
+
+def ingest(paths: list[Path] | None = None, embeddings=None, rebuild: bool = False) -> dict:
+    """
+    Bring the persisted index in line with `paths`.
+    Only files whose hash changed are re-parsed; only chunks whose fingerprint
+    changed are added or removed, and their vectors come from the embedding cache
+    when the same text was embedded before. A file that fails to parse keeps its
+    previous chunks and is parsed again on the next run.
+    Returns a small report with the new index key, what changed and failed_files (name -> error).
+    """
+    paths = find_files(DOCS_PATH) if paths is None else paths
+    embeddings = embeddings or get_embeddings()
+    settings = [EMBED_MODEL, CHUNK_SIZE, CHUNK_OVERLAP, index_spec()]
+    key = index_key(paths, EMBED_MODEL, CHUNK_SIZE, CHUNK_OVERLAP, index_spec())
+    report = {"key": key, "changed_files": 0, "unchanged_files": 0, "added": 0, "removed": 0, "failed_files": {}}
+
+    manifest = {} if rebuild else read_manifest()
+    if manifest.get("key") == key and (INDEX_DIR / key).exists() and not manifest.get("failed"):
+        report["unchanged_files"] = len(paths)
+        return report
+
+    # Start from the previous snapshot when it was built with the same settings
+    vectorstore = None
+    prev_dir = INDEX_DIR / manifest.get("key", "")
+    if manifest.get("settings") == settings and manifest.get("key") and prev_dir.exists():
+        try:
+            vectorstore = load_faiss(prev_dir, embeddings, mmap=False)
+        except Exception as e:
+            print(f"[WARN] Failed to load previous index {prev_dir}, rebuilding: {e}")
+    old_files = manifest.get("files", {}) if vectorstore is not None else {}
+
+    new_files: dict[str, dict] = {}
+    remove_ids: list[str] = []
+    changed: list[tuple[str, Path, str]] = []
+    current = {p.as_posix(): p for p in paths}
+    for name, p in current.items():
+        sha = file_sha256(p)
+        old = old_files.get(name)
+        if old and old["sha"] == sha:
+            new_files[name] = old
+            report["unchanged_files"] += 1
+        else:
+            changed.append((name, p, sha))
+    for name in old_files.keys() - current.keys():
+        remove_ids.extend(old_files[name]["chunks"])
+
+    def additions(pool) -> Iterator[tuple[Document, str]]:
+        # Chunks of changed files whose fingerprint is new, as the pages are parsed
+        for name, p, sha in changed:
+            old = old_files.get(name, {"sha": "", "chunks": []})
+            old_ids = set(old["chunks"])
+            ids = []
+            try:
+                for chunk, i in iter_chunk_ids(iter_chunks(p, pool)):
+                    ids.append(i)
+                    if i not in old_ids:
+                        yield chunk, i
+            except Exception as e:
+                # Keep every old chunk and the old hash so the file is parsed again next run;
+                # chunks already yielded are still indexed, so they are listed too
+                print(f"[WARN] Failed to parse {p}, keeping its previous chunks: {e}")
+                report["failed_files"][name] = str(e)
+                new_files[name] = {"sha": old["sha"], "chunks": old["chunks"] + [i for i in ids if i not in old_ids]}
+                continue
+            remove_ids.extend(old_ids - set(ids))
+            new_files[name] = {"sha": sha, "chunks": ids}
+            report["changed_files"] += 1
+
+    # New vectors go into the previous snapshot (or a new store) one embedding batch at a time
+    writer = IndexWriter(embeddings, vectorstore)
+    pool = page_pool() if any(p.suffix.lower() == ".pdf" for _, p, _ in changed) else None
+    try:
+        for batch in batched(additions(pool), EMBED_BATCH_SIZE):
+            writer.add([c for c, _ in batch], [i for _, i in batch])
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+    vectorstore = writer.finish()
+    report["added"], report["removed"], report["batches"] = writer.added, len(remove_ids), writer.batches
+
+    if vectorstore is not None and remove_ids:
+        try:
+            vectorstore.delete(remove_ids)
+        except RuntimeError:
+            # HNSW cannot remove vectors: rebuild from the surviving chunks (their vectors are cached)
+            removed = set(remove_ids)
+            kept = [i for i in vectorstore.index_to_docstore_id.values() if i not in removed]
+            docstore = vectorstore.docstore
+            writer = IndexWriter(embeddings)
+            for ids in batched(kept, EMBED_BATCH_SIZE):
+                writer.add([docstore.search(i) for i in ids], ids)
+            vectorstore = writer.finish()
+    if vectorstore is None:
+        failed = "; ".join(f"{name}: {error}" for name, error in report["failed_files"].items())
+        raise ValueError("No documents to index" + (f" (failed to parse {failed})" if failed else ""))
+
+    save_faiss(vectorstore, INDEX_DIR / key)
+    write_manifest({"key": key, "settings": settings, "files": new_files, "failed": sorted(report["failed_files"])})
+    prune_indexes(INDEX_DIR, keep=key)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest the knowledge base into the persisted FAISS index.")
+    parser.add_argument("--docs", type=Path, default=DOCS_PATH, help="File or folder to ingest")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the previous snapshot and re-index everything")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="Processes parsing PDF pages (1 parses in-process)")
+    args = parser.parse_args()
+    INGEST_WORKERS = max(1, args.workers)
+
+    result = ingest(find_files(args.docs), rebuild=args.rebuild)
+    print(f"✅ Index {result['key']}: {result['changed_files']} changed / {result['unchanged_files']} unchanged files, "
+          f"+{result['added']} / -{result['removed']} chunks in {result.get('batches', 0)} embedding batches")
+    for name, error in result["failed_files"].items():
+        print(f"❌ {name} could not be parsed and will be retried on the next run: {error}")
@@ -0,0 +1,73 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+QUESTIONS = [
+    "How do I cancel a tatkal ticket?",
+    "What is the status of TIC1?",
+    "I was charged twice for my booking, what should I do?",
+    "How much luggage can I carry?",
+    "My waitlisted ticket did not confirm, will I get a refund?",
+]
+
+
+async def _simulated_turn(user_input: str, session_id: str, latency: float) -> str:
+    await asyncio.sleep(random.uniform(0.5, 1.5) * latency)
+    return f"(simulated) {user_input}"
+
+
+async def run_session(session_id: str, turns: int, run_turn, latencies: list[float], errors: list[str]) -> None:
+    for _ in range(turns):
+        start = time.perf_counter()
+        try:
+            await run_turn(random.choice(QUESTIONS), session_id)
+        except Exception as e:
+            errors.append(str(e))
+        latencies.append(time.perf_counter() - start)
+
+
+async def load_test(sessions: int, turns: int, simulate: float | None = None) -> dict:
+    """Run `sessions` concurrent conversations of `turns` agent turns each and report throughput."""
+    if simulate is not None:
+        async def run_turn(q, session_id):
+            return await _simulated_turn(q, session_id, simulate)
+    else:
+        from ai3 import arun_agent
+        run_turn = arun_agent
+
+    latencies: list[float] = []
+    errors: list[str] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(f"load-{i}", turns, run_turn, latencies, errors) for i in range(sessions)))
+    wall = time.perf_counter() - start
+
+    ordered = sorted(latencies)
+    report = {
+        "sessions": sessions,
+        "turns_per_session": turns,
+        "wall_seconds": round(wall, 3),
+        "sessions_per_second": round(sessions / wall, 3) if wall else None,
+        "turns_per_second": round(len(latencies) / wall, 3) if wall else None,
+        "turn_p50_seconds": round(statistics.median(ordered), 3) if ordered else None,
+        "turn_p95_seconds": round(ordered[int(0.95 * (len(ordered) - 1))], 3) if ordered else None,
+        "errors": len(errors),
+    }
+    if simulate is None:
+        from ai3 import tool_stats, latency_stats
+        report["tools"] = tool_stats()
+        report["stages"] = latency_stats()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the async agent path.")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--simulate", type=float, default=None,
+                        help="Replace the agent with a sleep of ~N seconds per turn (checks the harness offline)")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(load_test(args.sessions, args.turns, args.simulate)), indent=2))
@@ -0,0 +1,13 @@
+from pypdf import PdfReader
+
+# Kept apart from ingest.py so worker processes only import pypdf, not LangChain or FAISS
+
+
+def page_count(path: str) -> int:
+    return len(PdfReader(path).pages)
+
+
+def read_pages(path: str, start: int, stop: int) -> list[tuple[int, str]]:
+    """(page number, text) for pages [start, stop) of one PDF, 0-based like PyPDFLoader."""
+    reader = PdfReader(path)
+    return [(i, reader.pages[i].extract_text() or "") for i in range(start, stop)]
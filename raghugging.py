@@ -1,71 +1,95 @@
 from pathlib import Path
 from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import TextLoader, PyPDFLoader
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.chains import create_retrieval_chain
 import os
 import asyncio
+import threading
+import time
 from dotenv import load_dotenv
+from index_store import index_key, load_faiss
+from ingest import (
+    DOCS_PATH, EMBED_MODEL, CHUNK_SIZE, CHUNK_OVERLAP, INDEX_DIR,
+    find_files, get_embeddings, get_base_embeddings, ingest, read_manifest, index_spec,
+)
+from semantic_cache import SemanticCache
+from retrieval import HybridRetriever
+from resolution_index import ResolutionIndex, WithResolutions
+from tracing import span, TraceCallbackHandler
 load_dotenv()
 
-# 🔹 Fix: Ensure asyncio event loop exists (needed for grpc.aio in Streamlit)
-try:
-    asyncio.get_running_loop()
-except RuntimeError:
-    asyncio.set_event_loop(asyncio.new_event_loop())
-
-# CONFIG
-DOCS_PATH = Path("./Train.pdf")
-EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"  # 🔹 Change HuggingFace model here
-CHAT_MODEL = "gemini-1.5-flash"
-TOP_K = 8
-SEARCH_TYPE = "similarity"
-CHUNK_SIZE = 800
-CHUNK_OVERLAP = 120
 
+def _ensure_event_loop():
+    # 🔹 Fix: Ensure asyncio event loop exists (needed for grpc.aio in Streamlit).
+    # Called per thread, since the pipeline may be built in a warm-up thread.
+    try:
+        asyncio.get_event_loop_policy().get_event_loop()
+    except RuntimeError:
+        asyncio.set_event_loop(asyncio.new_event_loop())
 
-def find_files(path: Path) -> list[Path]:
-    if path.is_file():
-        return [path]
-    exts = {".txt", ".md", ".pdf"}
-    return [p for p in path.rglob("*") if p.is_file() and p.suffix.lower() in exts]
+# CONFIG (ingestion settings live in ingest.py)
+CHAT_MODEL = "gemini-1.5-flash"
+TOP_K = 4              # 🔹 Chunks that go into the prompt
+SEARCH_TYPE = "hybrid"  # 🔹 "hybrid" (BM25 + vector + rerank) or plain "similarity"
+CANDIDATE_K = 20       # 🔹 Candidates pulled from each of BM25 and FAISS before reranking
+MAX_CONTEXT_CHARS = 2400
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"  # 🔹 Set to None to skip reranking
+ANSWER_CACHE_THRESHOLD = 0.92  # 🔹 Cosine similarity at which a past question counts as the same question
+ANSWER_CACHE_TTL = 3600        # 🔹 Seconds a cached answer stays valid
+ANSWER_CACHE_SIZE = 512
+INDEX_CHECK_SECONDS = 30       # 🔹 How often to look for an index rebuilt by `python ingest.py`
+RESOLUTION_ANSWER_THRESHOLD = 0.85   # 🔹 A resolved ticket this similar answers the question directly (no LLM call)
+RESOLUTION_CONTEXT_THRESHOLD = 0.6   # 🔹 Less similar resolved tickets are added to the prompt context instead
+RESOLUTION_CONTEXT_K = 2
+RESOLUTION_SYNC_SECONDS = 300        # 🔹 How often the resolution index re-reads the ticket rows
 
 
-def load_documents(paths: list[Path]) -> list[Document]:
-    docs: list[Document] = []
-    for p in paths:
+def load_or_build_faiss(paths: list[Path]) -> FAISS:
+    """
+    Load the persisted index for these files if one exists, otherwise ingest them first.
+    The key covers file contents, EMBED_MODEL, CHUNK_SIZE and CHUNK_OVERLAP; ingestion
+    only re-embeds the chunks that actually changed.
+    """
+    global _index_key
+    embeddings = get_embeddings()
+    key = index_key(paths, EMBED_MODEL, CHUNK_SIZE, CHUNK_OVERLAP, index_spec())
+    target = INDEX_DIR / key
+    _index_key = key
+    if target.exists():
         try:
-            if p.suffix.lower() in (".txt", ".md"):
-                docs.extend(TextLoader(str(p), encoding="utf-8").load())
-            elif p.suffix.lower() == ".pdf":
-                docs.extend(PyPDFLoader(str(p)).load())
+            return load_faiss(target, embeddings)
         except Exception as e:
-            print(f"[WARN] Failed to load {p}: {e}")
-    return docs
-
-
-def split_documents(docs: list[Document]) -> list[Document]:
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP
-    )
-    return splitter.split_documents(docs)
+            print(f"[WARN] Failed to load index {target}, rebuilding: {e}")
+            ingest(paths, embeddings, rebuild=True)
+            return load_faiss(target, embeddings)
 
-
-def build_faiss_in_memory(chunks: list[Document]) -> FAISS:
-    embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)  # 🔹 Hugging Face instead of Google
-    return FAISS.from_documents(chunks, embeddings)
+    ingest(paths, embeddings)
+    return load_faiss(target, embeddings)
 
 
 def make_retriever(vectorstore: FAISS):
-    return vectorstore.as_retriever(
-        search_type=SEARCH_TYPE,
-        search_kwargs={"k": TOP_K}
+    if SEARCH_TYPE == "hybrid":
+        retriever = HybridRetriever.from_vectorstore(
+            vectorstore,
+            candidates_k=CANDIDATE_K,
+            top_n=TOP_K,
+            max_chars=MAX_CONTEXT_CHARS,
+            reranker_model=RERANK_MODEL
+        )
+    else:
+        retriever = vectorstore.as_retriever(
+            search_type=SEARCH_TYPE,
+            search_kwargs={"k": TOP_K}
+        )
+    # Past resolutions from the ticket sheet are queried alongside the documents
+    return WithResolutions(
+        retriever=retriever,
+        index=resolution_index,
+        k=RESOLUTION_CONTEXT_K,
+        min_score=RESOLUTION_CONTEXT_THRESHOLD
     )
 
 
@@ -92,21 +116,188 @@ def format_sources(ctx: list[Document]) -> str:
     return "\n".join(lines)
 
 
-# 🔹 Build pipeline once when module is imported
-_files = find_files(DOCS_PATH)
-_docs = load_documents(_files)
-_chunks = split_documents(_docs)
-_vectorstore = build_faiss_in_memory(_chunks)
-_retriever = make_retriever(_vectorstore)
-_rag_chain = make_rag_chain(_retriever)
+# -----------------------------
+# Lazy pipeline (built on first use or by warm_up)
+# -----------------------------
+_lock = threading.RLock()
+_retriever = None
+_rag_chain = None
+_index_key: str | None = None
+_index_checked_at = 0.0
+_ready = threading.Event()
+_warmup_thread: threading.Thread | None = None
+_warmup_error: Exception | None = None
 
 
-def get_answer(question: str) -> dict:
-    """Answer a question using the pre-built RAG pipeline."""
-    result = _rag_chain.invoke({"input": question})
+def get_retriever():
+    global _retriever
+    if _retriever is None:
+        with _lock:
+            if _retriever is None:
+                _retriever = make_retriever(load_or_build_faiss(find_files(DOCS_PATH)))
+    return _retriever
+
+
+def get_rag_chain():
+    global _rag_chain
+    if _rag_chain is None:
+        with _lock:
+            if _rag_chain is None:
+                _ensure_event_loop()
+                _rag_chain = make_rag_chain(get_retriever())
+                _ready.set()
+    return _rag_chain
+
+
+def _refresh_if_rebuilt() -> None:
+    """Swap in a newer index published by ingestion in another process (checked every INDEX_CHECK_SECONDS)."""
+    global _retriever, _rag_chain, _index_key, _index_checked_at
+    if not _ready.is_set() or time.monotonic() - _index_checked_at < INDEX_CHECK_SECONDS:
+        return
+    _index_checked_at = time.monotonic()
+    key = read_manifest().get("key")
+    if not key or key == _index_key or not (INDEX_DIR / key).exists():
+        return
+    with _lock:
+        retriever = make_retriever(load_faiss(INDEX_DIR / key, get_embeddings()))
+        _retriever, _rag_chain, _index_key = retriever, make_rag_chain(retriever), key
+    answer_cache.set_generation(key)
+
+
+def _warm_up():
+    global _warmup_error
+    try:
+        get_rag_chain()
+    except Exception as e:
+        _warmup_error = e
+        print(f"[WARN] RAG warm-up failed: {e}")
+
+
+def warm_up(background: bool = True) -> None:
+    """Build the pipeline ahead of the first question. Safe to call on every Streamlit rerun."""
+    global _warmup_thread, _warmup_error
+    if _ready.is_set():
+        return
+    if not background:
+        get_rag_chain()
+        return
+    with _lock:
+        if _warmup_thread is None or (not _warmup_thread.is_alive() and _warmup_error is not None):
+            _warmup_error = None
+            _warmup_thread = threading.Thread(target=_warm_up, name="rag-warmup", daemon=True)
+            _warmup_thread.start()
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def rag_status() -> str:
+    """One of 'ready', 'warming', 'failed' or 'cold'."""
+    if _ready.is_set():
+        return "ready"
+    if _warmup_error is not None:
+        return "failed"
+    if _warmup_thread is not None and _warmup_thread.is_alive():
+        return "warming"
+    return "cold"
+
+
+# -----------------------------
+# Semantic answer cache
+# -----------------------------
+answer_cache = SemanticCache(
+    lambda q: get_base_embeddings().embed_query(q),  # model loads on first use, not at import
+    threshold=ANSWER_CACHE_THRESHOLD,
+    ttl=ANSWER_CACHE_TTL,
+    maxsize=ANSWER_CACHE_SIZE
+)
+
+
+def answer_cache_stats() -> dict:
+    return answer_cache.stats()
+
+
+# -----------------------------
+# Resolved-ticket index
+# -----------------------------
+# Empty until a ticket source is attached (ai3 attaches the ticket repository)
+resolution_index = ResolutionIndex(
+    lambda texts: get_embeddings().embed_documents(texts),  # disk-cached, so restarts re-embed nothing
+    lambda q: get_base_embeddings().embed_query(q),
+    refresh_seconds=RESOLUTION_SYNC_SECONDS
+)
+
+
+def _resolved_answer(question: str) -> dict | None:
+    """The resolution of a past ticket that asked the same thing, if there is one."""
+    with span("rag.resolution") as s:
+        try:
+            hits = resolution_index.search(question, k=1, min_score=RESOLUTION_ANSWER_THRESHOLD)
+        except Exception as e:
+            print(f"[WARN] Resolution lookup failed: {e}")
+            return None
+        s.set(cache="hit" if hits else "miss")
+    if not hits:
+        return None
+    row, _ = hits[0]
+    return {
+        "answer": f"This was already resolved in ticket {row['ticket_id']}:\n{row['ticket_resolution'].strip()}",
+        "sources": f"- ticket {row['ticket_id']} ({row['ticket_status']})"
+    }
+
+
+def _current_chain():
+    chain = get_rag_chain()
+    _refresh_if_rebuilt()
+    answer_cache.set_generation(_index_key)
+    return _rag_chain or chain
+
+
+def _cached_answer(question: str) -> dict | None:
+    with span("rag.answer_cache") as s:
+        try:
+            cached = answer_cache.lookup(question)
+        except Exception as e:
+            print(f"[WARN] Answer cache lookup failed: {e}")
+            return None
+        s.set(cache="hit" if cached is not None else "miss")
+    return dict(cached) if cached is not None else None
+
+
+def _to_response(question: str, result: dict) -> dict:
     answer = result.get("answer") or result.get("output") or str(result)
     ctx = result.get("context", [])
-    return {
+    response = {
         "answer": answer.strip(),
         "sources": format_sources(ctx) if ctx else None
     }
+    try:
+        answer_cache.store(question, response)
+    except Exception as e:
+        print(f"[WARN] Answer cache store failed: {e}")
+    return dict(response)
+
+
+def get_answer(question: str) -> dict:
+    """Answer a question using the RAG pipeline (built on first call if not warmed up)."""
+    _ensure_event_loop()
+    with span("rag") as s:
+        chain = _current_chain()
+        cached = _cached_answer(question) or _resolved_answer(question)
+        if cached is not None:
+            return cached
+        # Retrieval and the Gemini call are recorded as child spans by the callback handler
+        result = chain.invoke({"input": question}, config={"callbacks": [TraceCallbackHandler(s)]})
+        return _to_response(question, result)
+
+
+async def aget_answer(question: str) -> dict:
+    """Async get_answer: index work and embeddings run in threads, the Gemini call is awaited."""
+    with span("rag") as s:
+        chain = await asyncio.to_thread(_current_chain)
+        cached = await asyncio.to_thread(lambda: _cached_answer(question) or _resolved_answer(question))
+        if cached is not None:
+            return cached
+        result = await chain.ainvoke({"input": question}, config={"callbacks": [TraceCallbackHandler(s)]})
+        return await asyncio.to_thread(_to_response, question, result)
@@ -0,0 +1,97 @@
+import threading
+import time
+from typing import Any
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from ticket_index import TicketVectorIndex
+from ticket_store import CLOSED_STATUSES
+
+
+def is_resolved(row: dict) -> bool:
+    """Closed tickets that say how they were fixed; a closed ticket without a resolution teaches nothing."""
+    return (str(row.get("ticket_status", "")).strip().lower() in CLOSED_STATUSES
+            and bool(str(row.get("ticket_resolution", "")).strip()))
+
+
+def resolution_text(row: dict) -> str:
+    return f"{row['ticket_content']}\nResolution: {row['ticket_resolution']}"
+
+
+class ResolutionIndex:
+    """
+    Vector index of resolved tickets (content plus resolution), so questions that were
+    already answered in the ticket sheet can be answered from it.
+
+    `attach(source)` gives it a callable returning all ticket rows; the index syncs
+    from it on first use and every `refresh_seconds` after that, embedding only tickets
+    that are new or changed. `on_ticket_changed(row)` applies one save or status
+    change immediately.
+    """
+
+    def __init__(self, embed_documents, embed_query, refresh_seconds: float = 300):
+        self.tickets = TicketVectorIndex(embed_documents, embed_query)
+        self.refresh_seconds = refresh_seconds
+        self._source = None
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def attach(self, source) -> None:
+        self._source = source
+        self._synced_at = 0.0
+
+    def sync(self, rows: list[dict]) -> int:
+        """Bring the index in line with `rows`. Returns how many tickets had to be embedded."""
+        resolved = [r for r in rows if is_resolved(r)]
+        embedded = self.tickets.upsert_many([(r["ticket_id"], resolution_text(r), dict(r)) for r in resolved])
+        self.tickets.retain({r["ticket_id"] for r in resolved})
+        return embedded
+
+    def _ensure_synced(self) -> None:
+        if self._source is None or time.monotonic() - self._synced_at < self.refresh_seconds:
+            return
+        with self._lock:
+            if time.monotonic() - self._synced_at < self.refresh_seconds:
+                return
+            try:
+                self.sync(self._source())
+            except Exception as e:
+                print(f"[WARN] Resolution index sync failed: {e}")
+            self._synced_at = time.monotonic()
+
+    def on_ticket_changed(self, row: dict) -> None:
+        if is_resolved(row):
+            self.tickets.upsert(row["ticket_id"], resolution_text(row), dict(row))
+        else:
+            self.tickets.remove(row["ticket_id"])
+
+    def search(self, question: str, k: int = 3, min_score: float = 0.0) -> list[tuple[dict, float]]:
+        """Most similar resolved tickets as (row, cosine similarity), best first."""
+        self._ensure_synced()
+        return [(row, score) for _, score, row in self.tickets.search(question, k, min_score)]
+
+    def documents(self, question: str, k: int = 2, min_score: float = 0.0) -> list[Document]:
+        return [
+            Document(page_content=resolution_text(row),
+                     metadata={"source": f"ticket {row['ticket_id']}", "score": round(score, 3)})
+            for row, score in self.search(question, k, min_score)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.tickets)
+
+
+class WithResolutions(BaseRetriever):
+    """A document retriever whose results are followed by the most similar past resolutions."""
+
+    retriever: Any
+    index: Any
+    k: int = 2
+    min_score: float = 0.6
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> list[Document]:
+        docs = self.retriever.invoke(query)
+        try:
+            return docs + self.index.documents(query, self.k, self.min_score)
+        except Exception as e:
+            print(f"[WARN] Resolution search failed: {e}")
+            return docs
@@ -0,0 +1,122 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "is", "are", "was", "be",
+    "i", "my", "me", "it", "this", "that", "with", "how", "do", "can", "what", "at", "by",
+}
+
+
+def tokenize(text: str) -> list[str]:
+    # Keeps digits, so train numbers and PNRs stay searchable as exact tokens
+    return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in STOPWORDS]
+
+
+# -----------------------------
+# BM25 over an inverted index
+# -----------------------------
+class BM25Index:
+    def __init__(self, texts: list[str], k1: float = 1.5, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.postings: dict[str, list[tuple[int, int]]] = defaultdict(list)  # term -> [(doc, tf)]
+        self.doc_len: list[int] = []
+        for i, text in enumerate(texts):
+            tokens = tokenize(text)
+            self.doc_len.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                self.postings[term].append((i, tf))
+        n = len(self.doc_len)
+        self.avg_len = (sum(self.doc_len) / n) if n else 0.0
+        self.idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in self.postings.items()}
+
+    def search(self, query: str, k: int) -> list[tuple[int, float]]:
+        """Top-k (doc index, score); only documents sharing a term with the query are touched."""
+        scores: dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[doc] / (self.avg_len or 1))
+                scores[doc] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda x: -x[1])[:k]
+
+
+# -----------------------------
+# Reranker
+# -----------------------------
+_rerankers: dict[str, Any] = {}
+_reranker_lock = threading.Lock()
+
+
+def get_reranker(model_name: str):
+    """Local cross-encoder (loaded once per process). Returns None if it cannot be loaded."""
+    with _reranker_lock:
+        if model_name not in _rerankers:
+            try:
+                from sentence_transformers import CrossEncoder
+                _rerankers[model_name] = CrossEncoder(model_name)
+            except Exception as e:
+                print(f"[WARN] Reranker {model_name} unavailable, using fused ranking: {e}")
+                _rerankers[model_name] = None
+        return _rerankers[model_name]
+
+
+# -----------------------------
+# Hybrid retriever
+# -----------------------------
+class HybridRetriever(BaseRetriever):
+    """
+    FAISS vector search + BM25 keyword search, fused with reciprocal rank fusion,
+    then reranked by a cross-encoder. Returns at most `top_n` chunks and at most
+    `max_chars` characters of context, so the LLM prompt stays small.
+    """
+
+    vectorstore: Any
+    bm25: Any
+    doc_ids: list[str]
+    candidates_k: int = 20
+    top_n: int = 4
+    max_chars: int = 2400
+    rrf_k: int = 60
+    reranker_model: str | None = None
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, **kwargs) -> "HybridRetriever":
+        doc_ids = list(vectorstore.index_to_docstore_id.values())
+        texts = [vectorstore.docstore.search(i).page_content for i in doc_ids]
+        return cls(vectorstore=vectorstore, bm25=BM25Index(texts), doc_ids=doc_ids, **kwargs)
+
+    def _vector_ids(self, query: str) -> list[str]:
+        vs = self.vectorstore
+        emb = np.asarray([vs.embedding_function.embed_query(query)], dtype=np.float32)
+        _, indices = vs.index.search(emb, self.candidates_k)
+        return [vs.index_to_docstore_id[i] for i in indices[0] if i >= 0]
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> list[Document]:
+        fused: dict[str, float] = defaultdict(float)
+        for rank, doc_id in enumerate(self._vector_ids(query)):
+            fused[doc_id] += 1 / (self.rrf_k + rank + 1)
+        for rank, (i, _) in enumerate(self.bm25.search(query, self.candidates_k)):
+            fused[self.doc_ids[i]] += 1 / (self.rrf_k + rank + 1)
+        ranked = sorted(fused, key=lambda d: -fused[d])[:self.candidates_k]
+        docs = [self.vectorstore.docstore.search(d) for d in ranked]
+
+        reranker = get_reranker(self.reranker_model) if self.reranker_model else None
+        if reranker is not None and docs:
+            scores = reranker.predict([(query, d.page_content) for d in docs])
+            docs = [d for _, d in sorted(zip(scores, docs), key=lambda x: -x[0])]
+
+        picked, used = [], 0
+        for d in docs[:self.top_n]:
+            if picked and used + len(d.page_content) > self.max_chars:
+                break
+            picked.append(d)
+            used += len(d.page_content)
+        return picked
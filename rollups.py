@@ -0,0 +1,182 @@
+import bisect
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from ticket_store import CLOSED_STATUSES, TIMESTAMP_FORMAT
+
+# Backlog age buckets shown on the dashboard: (label, upper bound in hours)
+AGE_BUCKETS = [("< 1 day", 24), ("1-3 days", 72), ("3-7 days", 168), ("> 7 days", float("inf"))]
+
+
+def parse_timestamp(value: str) -> datetime | None:
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, TIMESTAMP_FORMAT)
+    except ValueError:
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+
+
+def _bump(counter: Counter, key, sign: int) -> None:
+    counter[key] += sign
+    if counter[key] <= 0:
+        del counter[key]
+
+
+def _sorted_add(values: list, value: float, sign: int) -> None:
+    if sign > 0:
+        bisect.insort(values, value)
+        return
+    i = bisect.bisect_left(values, value)
+    if i < len(values) and values[i] == value:
+        values.pop(i)
+
+
+class TicketRollups:
+    """
+    Dashboard aggregates kept up to date one ticket change at a time instead of
+    recomputed from the full table: counts by status, category, duplicate cluster,
+    creation day and hour of day, closures per day, resolution times
+    (ticket_closed_at - ticket_timestamp) and the age of the open backlog.
+
+    Register it with `TicketRepository.add_listener`; every change is applied as
+    "remove the old row's contribution, add the new row's".
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.rebuild([])
+
+    def rebuild(self, rows: list[dict]) -> None:
+        with self._lock:
+            self.by_status = Counter()
+            self.by_category = Counter()
+            self.open_by_category = Counter()
+            self.by_cluster = Counter()
+            self.open_by_cluster = Counter()
+            self.cluster_labels: dict[str, str] = {}
+            self.created_by_day = Counter()
+            self.closed_by_day = Counter()
+            self.created_by_hour = Counter()
+            self.resolution_hours: list[float] = []  # sorted
+            self.resolution_sum = 0.0
+            self.open_created: list[float] = []      # sorted epoch seconds of open tickets
+            self.open_created_sum = 0.0
+            for row in rows:
+                self._add(row, 1)
+
+    def apply(self, old: dict | None, new: dict | None) -> None:
+        with self._lock:
+            if old is not None:
+                self._add(old, -1)
+            if new is not None:
+                self._add(new, 1)
+
+    def _add(self, row: dict, sign: int) -> None:
+        status = row["ticket_status"].strip().lower()
+        category = row["ticket_category"].strip() or "uncategorized"
+        cluster = row.get("ticket_duplicate_of") or row["ticket_id"]
+        is_open = status not in CLOSED_STATUSES
+        created = parse_timestamp(row["ticket_timestamp"])
+        closed = parse_timestamp(row.get("ticket_closed_at", "")) if not is_open else None
+        # Tickets closed before ticket_closed_at existed count as closed on the day they were created;
+        # only tickets counted as created are counted as closed, so the backlog ends at the open count
+        closed_day = (closed or created) if not is_open and created is not None else None
+
+        _bump(self.by_status, status, sign)
+        _bump(self.by_category, category, sign)
+        _bump(self.by_cluster, cluster, sign)
+        if is_open:
+            _bump(self.open_by_category, category, sign)
+            _bump(self.open_by_cluster, cluster, sign)
+        if sign > 0 and (cluster == row["ticket_id"] or cluster not in self.cluster_labels):
+            self.cluster_labels[cluster] = row["ticket_content"]
+        if created is not None:
+            _bump(self.created_by_day, created.date().isoformat(), sign)
+            _bump(self.created_by_hour, created.hour, sign)
+            if is_open:
+                _sorted_add(self.open_created, created.timestamp(), sign)
+                self.open_created_sum += sign * created.timestamp()
+        if closed_day is not None:
+            _bump(self.closed_by_day, closed_day.date().isoformat(), sign)
+        if closed is not None:
+            if created is not None:
+                hours = (closed - created).total_seconds() / 3600
+                _sorted_add(self.resolution_hours, hours, sign)
+                self.resolution_sum += sign * hours
+
+    # -- reads (all O(categories/days), independent of the number of tickets) --
+    def counts(self, name: str) -> dict:
+        """Copy of one counter, e.g. counts("by_status"), safe to use while tickets keep changing."""
+        with self._lock:
+            return dict(getattr(self, name))
+
+    def kpis(self) -> dict:
+        with self._lock:
+            total = sum(self.by_status.values())
+            resolved = sum(self.by_status.get(s, 0) for s in CLOSED_STATUSES)
+            return {
+                "total": total,
+                "resolved": resolved,
+                "unresolved": total - resolved,
+                "resolution_pct": (resolved / total) * 100 if total else 0.0,
+            }
+
+    def top_clusters(self, n: int = 10) -> list[dict]:
+        with self._lock:
+            return [
+                {"Article": self.cluster_labels.get(c, ""), "Cluster": c, "References": count,
+                 "Open": self.open_by_cluster.get(c, 0)}
+                for c, count in self.by_cluster.most_common(n)
+            ]
+
+    def daily(self) -> list[dict]:
+        """Created, closed and open backlog per day, oldest first."""
+        with self._lock:
+            days = sorted(set(self.created_by_day) | set(self.closed_by_day))
+            backlog, out = 0, []
+            for day in days:
+                created, closed = self.created_by_day.get(day, 0), self.closed_by_day.get(day, 0)
+                backlog += created - closed
+                out.append({"Day": day, "Created": created, "Closed": closed, "Backlog": backlog})
+            return out
+
+    def hourly(self) -> list[dict]:
+        with self._lock:
+            return [{"Hour": h, "Created": self.created_by_hour.get(h, 0)} for h in range(24)]
+
+    def resolution_time(self) -> dict:
+        """Hours from creation to close over every closed ticket with both timestamps."""
+        with self._lock:
+            hours = self.resolution_hours
+            if not hours:
+                return {"count": 0, "mean": None, "p50": None, "p90": None}
+            return {
+                "count": len(hours),
+                "mean": self.resolution_sum / len(hours),
+                "p50": hours[int(0.5 * (len(hours) - 1))],
+                "p90": hours[int(0.9 * (len(hours) - 1))],
+            }
+
+    def backlog_age(self, now: float | None = None) -> dict:
+        """Open tickets by age bucket, plus the oldest and mean age in hours."""
+        now = time.time() if now is None else now
+        with self._lock:
+            created = self.open_created
+            buckets, start = {}, len(created)
+            for label, hours in AGE_BUCKETS:
+                # Tickets younger than `hours` were created after now - hours
+                cut = bisect.bisect_right(created, now - hours * 3600) if hours != float("inf") else 0
+                buckets[label] = start - cut
+                start = cut
+            return {
+                "open": len(created),
+                "oldest_hours": (now - created[0]) / 3600 if created else None,
+                "mean_hours": (now - self.open_created_sum / len(created)) / 3600 if created else None,
+                "buckets": buckets,
+            }
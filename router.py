@@ -0,0 +1,120 @@
+import re
+import threading
+from categorization import LocalCategorizer
+from ingest import get_base_embeddings
+
+# -----------------------------
+# Config
+# -----------------------------
+ROUTER_ENABLED = True    # 🔹 False sends every message through the agent
+ROUTE_MIN_SCORE = 0.5    # 🔹 Similarity to the knowledge-base examples needed to skip the agent...
+ROUTE_MIN_MARGIN = 0.05  # 🔹 ...and how far ahead of the "needs the agent" examples it must be
+LOOKUP_MAX_WORDS = 10    # 🔹 Longer messages that mention a ticket probably want more than its details
+
+# Examples for the embedding step, used only for messages without a ticket ID
+ROUTE_EXAMPLES = {
+    "kb": [
+        "How do I cancel my train ticket",
+        "What is the refund policy for cancelled tickets",
+        "How long does a refund take",
+        "Can I change my boarding station",
+        "What are the rules for tatkal booking",
+        "How much luggage can I carry",
+        "How do I book tickets for a group",
+        "How does the waitlist work",
+        "What happens if my train is cancelled",
+        "Payment was deducted but ticket not booked, what should I do",
+    ],
+    "agent": [
+        "Create a ticket for my refund problem",
+        "Save a new ticket, payment failed, my email is a@b.com",
+        "Log a complaint about the dirty coach",
+        "Search the web for today's train strike news",
+        "What is the weather in Mumbai today",
+        "Hi there",
+        "Thanks for your help",
+        "Summarise our conversation so far",
+        "What did I ask you before",
+    ],
+}
+
+TICKET_ID = re.compile(r"\bTIC\d+\b", re.IGNORECASE)
+_ID = r"(?P<id>TIC\d+)"
+_REST = r"(?:\s*(?:[:,\-]|with resolution:?|resolution:?|because)\s*(?P<resolution>.+))?"
+UPDATE_PATTERNS = [
+    # "close TIC123", "resolve TIC123: reissued the ticket", "please close TIC123 with resolution refund sent"
+    (re.compile(rf"^(?:please\s+)?(?:close|resolve|mark\s+as\s+(?:closed|resolved))\s+{_ID}{_REST}\W*$", re.I | re.S), "closed"),
+    # "mark TIC123 as closed", "set TIC123 to pending"
+    (re.compile(rf"^(?:please\s+)?(?:mark|set|update|change)\s+{_ID}(?:\s+status)?\s+(?:as|to)\s+"
+                rf"(?P<status>closed|resolved|pending){_REST}\W*$", re.I | re.S), None),
+    # "reopen TIC123"
+    (re.compile(rf"^(?:please\s+)?reopen\s+{_ID}\W*$", re.I), "pending"),
+]
+# Words that mean the user wants something done with a ticket, not just its details
+TICKET_ACTIONS = re.compile(r"\b(?:save|create|update|change|set|close|resolve|reopen|delete|assign|escalate|email|compare)\b", re.I)
+# Requests that need the agent's other tools even without a ticket ID
+AGENT_ACTIONS = re.compile(r"\b(?:save|create|log|raise|file|register|search|google|web|news|email)\b", re.I)
+# Several steps in one message ("check TIC1 and then close it") go to the agent
+MULTI_STEP = re.compile(r"\b(?:and then|then|after that|also|as well as)\b", re.I)
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_route_classifier() -> LocalCategorizer:
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = LocalCategorizer(get_base_embeddings(), ROUTE_EXAMPLES, labels=list(ROUTE_EXAMPLES))
+    return _classifier
+
+
+def _agent(reason: str) -> dict:
+    return {"intent": "agent", "tool": None, "input": None, "reason": reason}
+
+
+def route_message(text: str) -> dict:
+    """
+    Decide whether a message can skip the agent loop.
+    Returns {"intent", "tool", "input", "reason"} where intent is one of
+        lookup         -> GoogleSheetsLookup(input), input one ID or several like "TIC1, TIC2"
+        update_status  -> UpdateTicketStatus(input), input like "TIC123, closed, <resolution>"
+        kb             -> RAGKnowledgeBase(input)
+        agent          -> anything ambiguous or multi-step; run the full agent
+    Regexes handle messages with a ticket ID; the local embedding model handles the rest.
+    """
+    text = (text or "").strip()
+    if not ROUTER_ENABLED or not text:
+        return _agent("router disabled" if text else "empty message")
+    ids = list(dict.fromkeys(m.upper() for m in TICKET_ID.findall(text)))
+    if MULTI_STEP.search(text):
+        return _agent("several steps")
+    if len(ids) > 1:
+        # "status of TIC1, TIC2 and TIC3" is one concurrent lookup; anything more is for the agent
+        if TICKET_ACTIONS.search(text) or len(text.split()) > LOOKUP_MAX_WORDS + len(ids):
+            return _agent("several tickets with another request")
+        return {"intent": "lookup", "tool": "GoogleSheetsLookup", "input": ", ".join(ids), "reason": "ticket IDs"}
+
+    if ids:
+        ticket_id = ids[0]
+        for pattern, status in UPDATE_PATTERNS:
+            match = pattern.match(text)
+            if match:
+                groups = match.groupdict()
+                new_status = (status or groups["status"]).lower()
+                resolution = (groups.get("resolution") or "").strip()
+                tool_input = f"{ticket_id}, {new_status}" + (f", {resolution}" if resolution else "")
+                return {"intent": "update_status", "tool": "UpdateTicketStatus", "input": tool_input,
+                        "reason": "status update pattern"}
+        if TICKET_ACTIONS.search(text) or len(text.split()) > LOOKUP_MAX_WORDS:
+            return _agent("ticket mentioned with another request")
+        return {"intent": "lookup", "tool": "GoogleSheetsLookup", "input": ticket_id, "reason": "ticket ID"}
+
+    if AGENT_ACTIONS.search(text):
+        return _agent("action requested")
+    label, score, margin = get_route_classifier().classify([text])[0]
+    if label == "kb" and score >= ROUTE_MIN_SCORE and margin >= ROUTE_MIN_MARGIN:
+        return {"intent": "kb", "tool": "RAGKnowledgeBase", "input": text,
+                "reason": f"knowledge-base question ({score:.2f})"}
+    return _agent(f"not a confident knowledge-base question ({label}, {score:.2f})")
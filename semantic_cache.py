@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Answer cache keyed by question meaning rather than exact text.
+    A question whose embedding has cosine similarity >= `threshold` with a cached
+    question gets that question's answer. Entries expire after `ttl` seconds and the
+    least recently used ones are evicted beyond `maxsize`. Everything is dropped when
+    the generation (the knowledge-base index key) changes.
+    """
+
+    def __init__(self, embed_query, threshold: float = 0.92, ttl: float = 3600, maxsize: int = 512):
+        self.embed_query = embed_query  # str -> vector
+        self.threshold = threshold
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, np.ndarray, dict]] = OrderedDict()
+        self._generation = None
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.exact_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(question: str) -> str:
+        return " ".join(question.lower().split())
+
+    def _embed(self, question: str) -> np.ndarray:
+        v = np.asarray(self.embed_query(question), dtype=np.float32)
+        return v / max(float(np.linalg.norm(v)), 1e-12)
+
+    def set_generation(self, generation) -> None:
+        """Bind the cache to an index version; a different version clears it."""
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+                self._generation = generation
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for k in [k for k, (exp, _, _) in self._entries.items() if exp <= now]:
+            del self._entries[k]
+
+    def lookup(self, question: str) -> dict | None:
+        key = self._key(question)
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.exact_hits += 1
+                return entry[2]
+            if not self._entries:
+                self.misses += 1
+                return None
+            keys = list(self._entries)
+            matrix = np.stack([self._entries[k][1] for k in keys])
+        vec = self._embed(question)
+        scores = matrix @ vec
+        best = int(np.argmax(scores))
+        with self._lock:
+            entry = self._entries.get(keys[best])
+            if entry is None or float(scores[best]) < self.threshold:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(keys[best])
+            self.hits += 1
+            return entry[2]
+
+    def store(self, question: str, answer: dict) -> None:
+        vec = self._embed(question)
+        with self._lock:
+            self._entries[self._key(question)] = (time.monotonic() + self.ttl, vec, answer)
+            self._entries.move_to_end(self._key(question))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "exact_hits": self.exact_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Session:
+    __slots__ = ("memory", "agent", "last_used")
+
+    def __init__(self, memory):
+        self.memory = memory
+        self.agent = None
+        self.last_used = time.monotonic()
+
+
+class SessionMemoryManager:
+    """
+    One conversation memory (and agent bound to it) per session id.
+
+    `make_memory` should return a token-budgeted memory such as
+    ConversationSummaryBufferMemory, so each prompt stays bounded however long a
+    conversation runs. Sessions idle for `idle_seconds` are dropped, and at most
+    `max_sessions` are kept (least recently used go first), so the process stays
+    bounded too.
+    """
+
+    def __init__(self, make_memory, idle_seconds: float = 1800, max_sessions: int = 500):
+        self.make_memory = make_memory
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, _Session] = OrderedDict()
+        self._lock = threading.RLock()
+        self.evictions = 0
+
+    def _session(self, session_id: str) -> _Session:
+        with self._lock:
+            self.evict_idle()
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = _Session(self.make_memory())
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evictions += 1
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def memory(self, session_id: str):
+        return self._session(session_id).memory
+
+    def agent(self, session_id: str, build_agent):
+        """The session's agent, created once with `build_agent(memory)`."""
+        with self._lock:
+            session = self._session(session_id)
+            if session.agent is None:
+                session.agent = build_agent(session.memory)
+            return session.agent
+
+    def evict_idle(self) -> int:
+        """Drop sessions not used for idle_seconds. Returns how many were dropped."""
+        cutoff = time.monotonic() - self.idle_seconds
+        dropped = 0
+        with self._lock:
+            # Ordered by last use, so idle sessions are at the front
+            while self._sessions:
+                sid, session = next(iter(self._sessions.items()))
+                if session.last_used > cutoff:
+                    break
+                del self._sessions[sid]
+                dropped += 1
+            self.evictions += dropped
+        return dropped
+
+    def drop(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,150 @@
+import queue
+import re
+import threading
+from functools import partial
+from langchain_core.callbacks import BaseCallbackHandler
+
+_DONE = object()
+
+
+class FinalAnswerExtractor:
+    """
+    Pulls the user-facing text out of the conversational agent's JSON blob while it streams:
+        {"action": "Final Answer", "action_input": "<this part>"}
+    Tokens of tool-calling blobs are ignored. JSON string escapes (including \\uXXXX and
+    surrogate pairs) are decoded, even when a token ends in the middle of one.
+    """
+
+    _ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", '"': '"', "\\": "\\", "/": "/"}
+    _FINAL = re.compile(r'"action"\s*:\s*"Final\s*Answer"')
+    _VALUE = re.compile(r'"action_input"\s*:\s*(\S)')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self._buf = ""
+        self._final = False
+        self._in_value = False
+        self._escape = False
+        self._hex = None   # digits of a \\uXXXX escape read so far
+        self._high = None  # high surrogate waiting for its low half
+        self._done = False
+
+    def feed(self, token: str) -> str:
+        """Add a token; return the new characters of the final answer (may be empty)."""
+        if self._done:
+            return ""
+        if not self._in_value:
+            self._buf += token
+            if not self._final:
+                if not self._FINAL.search(self._buf):
+                    return ""
+                self._final = True
+            match = self._VALUE.search(self._buf)
+            if match is None:
+                return ""
+            if match.group(1) != '"':
+                self._done = True  # not a string; the full answer arrives with the final event
+                return ""
+            self._in_value = True
+            token = self._buf[match.end():]
+        out = []
+        for ch in token:
+            if self._hex is not None:
+                self._hex += ch
+                if len(self._hex) == 4:
+                    self._code_point(self._hex, out)
+                    self._hex = None
+                continue
+            if self._high is not None and not (self._escape and ch == "u") and not (ch == "\\" and not self._escape):
+                out.append("\ufffd")  # lone high surrogate
+                self._high = None
+            if self._escape:
+                self._escape = False
+                if ch == "u":
+                    self._hex = ""
+                else:
+                    out.append(self._ESCAPES.get(ch, ch))
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._done = True
+                break
+            else:
+                out.append(ch)
+        return "".join(out)
+
+    def _code_point(self, digits: str, out: list) -> None:
+        try:
+            code = int(digits, 16)
+        except ValueError:
+            out.append("\\u" + digits)
+            return
+        if 0xD800 <= code < 0xDC00:
+            self._high = code
+            return
+        if 0xDC00 <= code < 0xE000:
+            if self._high is None:
+                out.append("\ufffd")
+                return
+            code = 0x10000 + ((self._high - 0xD800) << 10) + (code - 0xDC00)
+            self._high = None
+        out.append(chr(code))
+
+
+class QueueCallbackHandler(BaseCallbackHandler):
+    """Turns agent callbacks into events on a queue for a consumer in another thread."""
+
+    def __init__(self, events: queue.Queue):
+        self.events = events
+        self.extractor = FinalAnswerExtractor()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.extractor.reset()
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.extractor.reset()
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        text = self.extractor.feed(token)
+        if text:
+            self.events.put({"type": "token", "text": text})
+
+    def on_agent_action(self, action, **kwargs):
+        self.events.put({"type": "tool_start", "tool": action.tool, "input": str(action.tool_input)})
+
+    def on_tool_end(self, output, **kwargs):
+        self.events.put({"type": "tool_end", "output": str(output)})
+
+
+def stream_agent(agent, inputs: dict, callbacks: list | None = None, context=None):
+    """
+    Run `agent.invoke(inputs)` in a worker thread and yield events as they happen:
+        {"type": "tool_start", "tool", "input"}   the agent picked a tool
+        {"type": "tool_end", "output"}            the tool returned
+        {"type": "token", "text"}                 next piece of the final answer
+        {"type": "final", "output"}               full final answer (always last on success)
+        {"type": "error", "error"}                the run failed
+    `callbacks` are added to the run's own; `context` (a contextvars.Context) is the one
+    the worker thread runs in, e.g. to keep trace spans under the caller's turn.
+    """
+    events: queue.Queue = queue.Queue()
+    handler = QueueCallbackHandler(events)
+
+    def run():
+        try:
+            result = agent.invoke(inputs, config={"callbacks": [handler] + list(callbacks or [])})
+            events.put({"type": "final", "output": result.get("output", "No response from agent.")})
+        except Exception as e:
+            events.put({"type": "error", "error": str(e)})
+        finally:
+            events.put(_DONE)
+
+    target = run if context is None else partial(context.run, run)
+    threading.Thread(target=target, name="agent-stream", daemon=True).start()
+    while True:
+        event = events.get()
+        if event is _DONE:
+            return
+        yield event
@@ -0,0 +1,8 @@
+import os
+import sys
+from pathlib import Path
+
+# The modules live in the repository root, not in a package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# Spans from the code under test stay in memory instead of going to traces.jsonl
+os.environ.setdefault("TRACE_FILE", "")
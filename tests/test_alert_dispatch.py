@@ -0,0 +1,145 @@
+import email
+import email.header
+import socketserver
+import threading
+import time
+import pytest
+
+alert_dispatch = pytest.importorskip("alert_dispatch")
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, MAIL, RCPT, DATA, NOOP, RSET, QUIT."""
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 localhost test SMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line.decode(errors="replace").strip()[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if chunk in (b".\r\n", b""):
+                        break
+                    data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                with server.lock:
+                    if server.failures:
+                        server.failures.pop(0)
+                        self.reply(f"{server.fail_code} Try again later")
+                        continue
+                    server.messages.append(email.message_from_bytes(b"".join(data)))
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+@pytest.fixture
+def smtp():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SmtpHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.messages = []
+    server.failures = []
+    server.fail_code = 451
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def dispatcher(smtp, **kwargs):
+    pool = alert_dispatch.SmtpPool("127.0.0.1", smtp.server_address[1], starttls=False, timeout=5)
+    kwargs.setdefault("backoff_seconds", 0.01)
+    return alert_dispatch.AlertDispatcher(pool, "alerts@example.com", **kwargs)
+
+
+def test_connection_is_reused(smtp):
+    d = dispatcher(smtp)
+    for i in range(3):
+        d.send("ops@example.com", f"Alert {i}", "body")
+    assert d.flush(timeout=5)
+    assert [m["Subject"] for m in smtp.messages] == ["Alert 0", "Alert 1", "Alert 2"]
+    assert smtp.connections == 1
+    assert d.stats()["connections_opened"] == 1
+    d.close()
+
+
+def test_transient_failure_is_retried(smtp):
+    smtp.failures = [1]
+    d = dispatcher(smtp)
+    d.send("ops@example.com", "Backlog", "body")
+    assert d.flush(timeout=5)
+    stats = d.stats()
+    assert (stats["sent"], stats["retries"], stats["failed"]) == (1, 1, 0)
+    assert [m["Subject"] for m in smtp.messages] == ["Backlog"]
+    d.close()
+
+
+def test_permanent_failure_is_dropped(smtp):
+    smtp.failures, smtp.fail_code = [1], 550
+    d = dispatcher(smtp)
+    d.send("ops@example.com", "Backlog", "body")
+    assert d.flush(timeout=5)
+    stats = d.stats()
+    assert (stats["sent"], stats["retries"], stats["failed"]) == (0, 0, 1)
+    d.close()
+
+
+def test_digest_batches_alerts_per_recipient(smtp):
+    d = dispatcher(smtp, digest_seconds=60)
+    for i in range(3):
+        d.send("ops@example.com", f"Alert {i}", f"body {i}", digest=True)
+    d.send("lead@example.com", "Single", "only one", digest=True)
+    assert d.stats()["collecting"] == 4
+    assert smtp.messages == []
+    assert d.flush(timeout=5)
+    by_recipient = {m["To"]: m for m in smtp.messages}
+    assert len(smtp.messages) == 2
+    digest = by_recipient["ops@example.com"]
+    assert str(email.header.make_header(email.header.decode_header(digest["Subject"]))) == "🚨 3 ticket alerts"
+    assert all(f"body {i}" in digest.get_payload(decode=True).decode() for i in range(3))
+    assert by_recipient["lead@example.com"]["Subject"] == "Single"
+    stats = d.stats()
+    assert (stats["sent"], stats["digests_sent"]) == (4, 1)
+    d.close()
+
+
+def test_alert_once_cooldown(smtp):
+    d = dispatcher(smtp, cooldown_seconds=0.2)
+    assert d.alert_once("pending-backlog", "ops@example.com", "Backlog", "body", digest=False)
+    assert not d.alert_once("pending-backlog", "ops@example.com", "Backlog", "body", digest=False)
+    assert d.alert_once("pending-backlog", "lead@example.com", "Backlog", "body", digest=False)
+    time.sleep(0.3)
+    assert d.alert_once("pending-backlog", "ops@example.com", "Backlog", "body", digest=False)
+    assert d.flush(timeout=5)
+    assert len(smtp.messages) == 3
+    d.close()
+
+
+def test_config_problem(monkeypatch):
+    monkeypatch.setattr(alert_dispatch, "SENDER_EMAIL", "")
+    assert "ALERT_SENDER_EMAIL" in alert_dispatch.config_problem()
+    monkeypatch.setattr(alert_dispatch, "SENDER_EMAIL", "alerts@example.com")
+    monkeypatch.setattr(alert_dispatch, "SENDER_PASSWORD", "")
+    monkeypatch.setattr(alert_dispatch, "SMTP_STARTTLS", True)
+    assert "ALERT_APP_PASSWORD" in alert_dispatch.config_problem()
+    monkeypatch.setattr(alert_dispatch, "SMTP_STARTTLS", False)  # local stand-in, no login
+    assert alert_dispatch.config_problem() is None
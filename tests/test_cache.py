@@ -0,0 +1,37 @@
+import time
+from cache import TTLCache
+
+
+def test_get_set_and_stats():
+    cache = TTLCache(maxsize=10, ttl=60)
+    assert cache.get("a") is None
+    assert cache.get("a", "default") == "default"
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 1)
+    cache.invalidate("a")
+    assert cache.get("a") is None
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # b is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_per_entry_ttl():
+    cache = TTLCache(maxsize=10, ttl=0.05)
+    cache.set("short", 1)
+    cache.set("forever", 2, ttl=0)
+    cache.set("long", 3, ttl=60)
+    time.sleep(0.1)
+    assert cache.get("short") is None
+    assert cache.get("forever") == 2
+    assert cache.get("long") == 3
+    assert cache.stats()["expirations"] == 1
@@ -0,0 +1,26 @@
+import pytest
+
+dedup = pytest.importorskip("dedup")
+
+
+def test_lsh_finds_reworded_duplicates():
+    lsh = dedup.MinHashLSH()
+    assert lsh.add("TIC1", "Payment was deducted but my ticket was not booked")
+    assert lsh.add("TIC2", "Train was cancelled and I need a full refund")
+    matches = lsh.query("payment deducted but ticket was not booked")
+    assert [key for key, _ in matches] == ["TIC1"]
+    assert lsh.query("refund") == []  # too short to call a duplicate
+    assert lsh.remove("TIC1") and "TIC1" not in lsh
+
+
+def test_detector_only_matches_open_tickets():
+    detector = dedup.DuplicateDetector()
+    detector.sync([
+        {"ticket_id": "TIC1", "ticket_content": "Payment was deducted but my ticket was not booked",
+         "ticket_status": "closed", "ticket_duplicate_of": ""},
+        {"ticket_id": "TIC2", "ticket_content": "Payment was deducted but the ticket was not booked at all",
+         "ticket_status": "pending", "ticket_duplicate_of": ""},
+    ])
+    match = detector.find("payment deducted but my ticket was not booked")
+    assert match is not None and match[:2] == ("TIC2", "TIC2")
+    assert detector.find("payment deducted but my ticket was not booked", exclude="TIC2") is None
@@ -0,0 +1,22 @@
+import pytest
+
+index_store = pytest.importorskip("index_store")
+
+
+def test_index_key_changes_with_content_and_settings(tmp_path):
+    doc = tmp_path / "kb.txt"
+    doc.write_text("refund policy")
+    key = index_store.index_key([doc], "model", 800, 120)
+    assert key == index_store.index_key([doc], "model", 800, 120)
+    assert key != index_store.index_key([doc], "model", 500, 120)
+    assert key != index_store.index_key([doc], "model", 800, 120, "hnsw")
+    doc.write_text("refund policy v2")
+    assert key != index_store.index_key([doc], "model", 800, 120)
+
+
+def test_prune_indexes_keeps_current_and_in_progress(tmp_path):
+    for name in ("old", "current", ".tmp-123"):
+        (tmp_path / name).mkdir()
+    index_store.prune_indexes(tmp_path, keep="current")
+    assert sorted(p.name for p in tmp_path.iterdir()) == [".tmp-123", "current"]
+    index_store.prune_indexes(tmp_path / "missing", keep="current")
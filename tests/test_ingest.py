@@ -0,0 +1,9 @@
+import pytest
+
+ingest = pytest.importorskip("ingest")
+
+
+def test_no_worker_processes_when_imported(monkeypatch):
+    # Workers would re-import the importing app's __main__; only `python ingest.py` gets a pool
+    monkeypatch.setattr(ingest, "INGEST_WORKERS", 4)
+    assert ingest.page_pool() is None
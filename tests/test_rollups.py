@@ -0,0 +1,66 @@
+from rollups import TicketRollups, parse_timestamp
+
+
+def row(tid: str, status: str = "pending", created: str = "2025-01-01 10:00:00", closed_at: str = "",
+        category: str = "Refund", duplicate_of: str = "") -> dict:
+    return {"ticket_id": tid, "ticket_content": f"problem {tid}", "ticket_category": category,
+            "ticket_timestamp": created, "ticket_by": "a@b.com", "ticket_status": status,
+            "ticket_resolution": "", "ticket_duplicate_of": duplicate_of, "ticket_closed_at": closed_at}
+
+
+def test_parse_timestamp():
+    assert parse_timestamp("2025-01-01 10:00:00").hour == 10
+    assert parse_timestamp("2025-01-01T10:00:00").hour == 10
+    assert parse_timestamp("") is None
+    assert parse_timestamp("yesterday") is None
+
+
+def test_kpis_count_every_closed_status():
+    rollups = TicketRollups()
+    rollups.rebuild([row("TIC1", "closed"), row("TIC2", "Resolved"), row("TIC3"), row("TIC4", "on hold")])
+    assert rollups.kpis() == {"total": 4, "resolved": 2, "unresolved": 2, "resolution_pct": 50.0}
+    assert rollups.counts("open_by_category") == {"Refund": 2}
+
+
+def test_backlog_ends_at_open_count_without_closed_at():
+    rollups = TicketRollups()
+    rollups.rebuild([
+        row("TIC1", "closed", "2025-01-01 10:00:00"),  # closed before ticket_closed_at existed
+        row("TIC2", "closed", "2025-01-01 11:00:00", "2025-01-03 09:00:00"),
+        row("TIC3", "pending", "2025-01-02 12:00:00"),
+    ])
+    days = rollups.daily()
+    assert [d["Day"] for d in days] == ["2025-01-01", "2025-01-02", "2025-01-03"]
+    assert [d["Backlog"] for d in days] == [1, 2, 1]
+    assert days[-1]["Backlog"] == rollups.kpis()["unresolved"]
+
+    rollups.apply(row("TIC3"), row("TIC3", "closed", "2025-01-02 12:00:00"))
+    assert rollups.daily()[-1]["Backlog"] == rollups.kpis()["unresolved"] == 0
+
+
+def test_apply_matches_rebuild():
+    before = [row("TIC1"), row("TIC2", duplicate_of="TIC1"), row("TIC3", created="2025-01-02 09:00:00")]
+    after = [row("TIC1", "closed", closed_at="2025-01-01 16:00:00"), before[1], before[2]]
+    incremental = TicketRollups()
+    incremental.rebuild(before)
+    incremental.apply(before[0], after[0])
+    incremental.apply(None, row("TIC4", category="Booking"))
+    full = TicketRollups()
+    full.rebuild(after + [row("TIC4", category="Booking")])
+    for name in ("by_status", "by_category", "by_cluster", "open_by_cluster", "created_by_day", "closed_by_day"):
+        assert incremental.counts(name) == full.counts(name)
+    assert incremental.daily() == full.daily()
+    assert incremental.resolution_time() == full.resolution_time() == {"count": 1, "mean": 6.0, "p50": 6.0, "p90": 6.0}
+    assert incremental.top_clusters(1)[0] == {"Article": "problem TIC1", "Cluster": "TIC1", "References": 2, "Open": 1}
+
+
+def test_backlog_age_buckets():
+    rollups = TicketRollups()
+    rollups.rebuild([row("TIC1", created="2025-01-01 00:00:00"), row("TIC2", created="2025-01-05 00:00:00"),
+                     row("TIC3", "closed", created="2025-01-01 00:00:00")])
+    now = parse_timestamp("2025-01-06 00:00:00").timestamp()
+    age = rollups.backlog_age(now)
+    assert age["open"] == 2
+    assert age["oldest_hours"] == 120
+    assert age["mean_hours"] == 72
+    assert age["buckets"] == {"< 1 day": 0, "1-3 days": 1, "3-7 days": 1, "> 7 days": 0}
@@ -0,0 +1,38 @@
+import pytest
+
+# router loads the local embedding model through categorization/ingest
+router = pytest.importorskip("router")
+
+
+@pytest.mark.parametrize("text, intent, tool_input", [
+    ("TIC12", "lookup", "TIC12"),
+    ("what is the status of tic12?", "lookup", "TIC12"),
+    ("status of TIC1, TIC2 and TIC1", "lookup", "TIC1, TIC2"),
+    ("close TIC7", "update_status", "TIC7, closed"),
+    ("resolve TIC7: reissued the ticket", "update_status", "TIC7, closed, reissued the ticket"),
+    ("please close TIC7 with resolution refund sent", "update_status", "TIC7, closed, refund sent"),
+    ("mark TIC7 as pending", "update_status", "TIC7, pending"),
+    ("set TIC7 status to resolved", "update_status", "TIC7, resolved"),
+    ("reopen TIC2", "update_status", "TIC2, pending"),
+])
+def test_ticket_routes(text, intent, tool_input):
+    route = router.route_message(text)
+    assert (route["intent"], route["input"]) == (intent, tool_input)
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "check TIC1 and then close it",
+    "compare TIC1 and TIC2",
+    "escalate TIC5 to the station manager",
+    "TIC5 was about a refund for a train that got cancelled last week, what should I tell the customer now",
+    "create a ticket for my refund problem",
+    "search the web for today's train strike news",
+])
+def test_agent_routes(text):
+    assert router.route_message(text)["intent"] == "agent"
+
+
+def test_router_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(router, "ROUTER_ENABLED", False)
+    assert router.route_message("TIC12")["intent"] == "agent"
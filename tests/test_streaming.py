@@ -0,0 +1,70 @@
+import json
+import pytest
+
+streaming = pytest.importorskip("streaming")
+
+
+def feed_all(tokens) -> str:
+    extractor = streaming.FinalAnswerExtractor()
+    return "".join(extractor.feed(t) for t in tokens)
+
+
+def blob(answer: str, action: str = "Final Answer") -> str:
+    return "```json\n" + json.dumps({"action": action, "action_input": answer}, ensure_ascii=False, indent=4) + "\n```"
+
+
+def char_tokens(text: str) -> list[str]:
+    return list(text)
+
+
+@pytest.mark.parametrize("answer", [
+    "Refunds take 5-7 working days.",
+    'Say "cancel" to the bot',
+    "Line one\nLine two\tTabbed",
+    "Path C:\\tickets\\TIC1",
+    "Slash / and back \\ slash",
+])
+@pytest.mark.parametrize("split", [char_tokens, lambda text: [text[i:i + 3] for i in range(0, len(text), 3)],
+                                   lambda text: [text]], ids=["chars", "threes", "whole"])
+def test_answer_text_is_decoded_whatever_the_token_boundaries(answer, split):
+    assert feed_all(split(blob(answer))) == answer
+
+
+def test_unicode_escapes_and_surrogate_pairs():
+    text = json.dumps({"action": "Final Answer", "action_input": "Café ✓ 🚆 done"})  # ensure_ascii escapes
+    assert "\\ud83d\\ude86" in text
+    assert feed_all(char_tokens(text)) == "Café ✓ 🚆 done"
+    assert feed_all([text[:text.index("ud83d") + 2], text[text.index("ud83d") + 2:]]) == "Café ✓ 🚆 done"
+
+
+def test_lone_surrogates_are_replaced():
+    assert feed_all(['{"action": "Final Answer", "action_input": "a\\ud83d b"}']) == "a\ufffd b"
+    assert feed_all(['{"action": "Final Answer", "action_input": "a\\ude86"}']) == "a\ufffd"
+
+
+def test_key_split_across_tokens():
+    tokens = ['{"act', 'ion": "Final ', 'Answer", "action', '_in', 'put"', ':', ' "', 'Hel', 'lo"}']
+    assert feed_all(tokens) == "Hello"
+
+
+def test_whitespace_and_newlines_between_keys_and_values():
+    assert feed_all(['{\n  "action" :\n "Final Answer",\n  "action_input" :\n  "Hi"\n}']) == "Hi"
+
+
+def test_tool_blobs_are_ignored():
+    assert feed_all(char_tokens(blob("TIC123", action="GoogleSheetsLookup"))) == ""
+
+
+def test_text_after_the_closing_quote_is_ignored():
+    assert feed_all(['{"action": "Final Answer", "action_input": "Done"}', ' trailing "text"']) == "Done"
+
+
+def test_non_string_action_input_emits_nothing():
+    assert feed_all(['{"action": "Final Answer", "action_input": {"text": "x"}}']) == ""
+
+
+def test_reset_between_llm_calls():
+    extractor = streaming.FinalAnswerExtractor()
+    assert extractor.feed(blob("TIC1", action="GoogleSheetsLookup")) == ""
+    extractor.reset()
+    assert extractor.feed(blob("It is closed.")) == "It is closed."
@@ -0,0 +1,123 @@
+import threading
+import pytest
+from ticket_store import TicketRepository, MemoryBackend, TICKET_COLUMNS
+
+STATUS = TICKET_COLUMNS.index("ticket_status")
+
+
+def ticket(tid: str, status: str = "pending") -> dict:
+    return {"ticket_id": tid, "ticket_content": f"problem {tid}", "ticket_category": "Refund",
+            "ticket_timestamp": "2025-01-01 10:00:00", "ticket_by": "a@b.com", "ticket_status": status}
+
+
+@pytest.fixture(params=[False, True], ids=["direct", "batched"])
+def repo(request):
+    repo = TicketRepository(MemoryBackend(latency=0.02), batch_writes=request.param, flush_interval=0.05)
+    yield repo
+    repo.close()
+
+
+def test_save_update_and_query(repo):
+    assert repo.save(ticket("TIC1")) is True
+    assert repo.save(ticket("TIC2")) is True
+    assert repo.save(ticket("TIC1")) is False
+    assert repo.update_status("TIC1", "closed") is True
+    assert repo.update_status("TIC9", "closed") is False
+    assert repo.get("TIC1")["ticket_closed_at"]
+    rows, total = repo.query(status="pending")
+    assert total == 1 and rows[0]["ticket_id"] == "TIC2"
+
+    repo.flush()
+    repo.sync()
+    assert [r["ticket_id"] for r in repo.all()] == ["TIC1", "TIC2"]
+    assert repo.get("TIC1")["ticket_status"] == "closed"
+
+
+def test_reopen_clears_closed_at(repo):
+    repo.save(ticket("TIC1"))
+    repo.update_status("TIC1", "resolved")
+    repo.update_status("TIC1", "pending")
+    assert repo.get("TIC1")["ticket_closed_at"] == ""
+
+
+def test_first_use_reads_sheet_once():
+    backend = MemoryBackend([list(TICKET_COLUMNS)] + [list(ticket(f"TIC{i}").values()) for i in range(3)], latency=0.05)
+    repo = TicketRepository(backend)
+    threads = [threading.Thread(target=repo.all) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert backend.calls == 1
+    assert len(repo.all()) == 3
+
+
+def test_writes_during_sync_are_kept(repo):
+    """save + update_status racing a sync: no ticket is lost locally or written twice to the sheet."""
+    repo.sync()
+    failures = []
+
+    def worker(n: int) -> None:
+        for i in range(5):
+            tid = f"TIC{n}{i}"
+            repo.save(ticket(tid))
+            if not repo.update_status(tid, "closed"):
+                failures.append(tid)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    done = threading.Event()
+
+    def syncer() -> None:
+        while not done.is_set():
+            repo.sync()
+
+    syncers = [threading.Thread(target=syncer) for _ in range(2)]
+    for t in workers + syncers:
+        t.start()
+    for t in workers:
+        t.join()
+    done.set()
+    for t in syncers:
+        t.join()
+    repo.flush()
+
+    assert failures == []
+    sheet = repo.backend.rows[1:]
+    ids = [row[0] for row in sheet]
+    assert len(ids) == len(set(ids)) == 20
+    assert all(row[STATUS] == "closed" for row in sheet)
+    assert len(repo.all()) == 20
+    repo.sync()
+    assert all(r["ticket_status"] == "closed" for r in repo.all())
+
+
+class _SaveDuringRead(MemoryBackend):
+    """Backend whose next read_all saves a ticket from another thread while the sheet is being read."""
+
+    def __init__(self):
+        super().__init__()
+        self.repo = None
+
+    def read_all(self):
+        values = super().read_all()
+        if self.repo is not None:
+            repo, self.repo = self.repo, None
+            t = threading.Thread(target=repo.save, args=(ticket("TIC7"),))
+            t.start()
+            t.join()
+        return values
+
+
+@pytest.mark.parametrize("batch_writes", [False, True], ids=["direct", "batched"])
+def test_ticket_saved_during_read_survives_rebuild(batch_writes):
+    backend = _SaveDuringRead()
+    repo = TicketRepository(backend, batch_writes=batch_writes, flush_interval=60)
+    repo.sync()
+    backend.repo = repo
+    repo.sync()
+    assert repo.exists("TIC7")
+    assert repo.update_status("TIC7", "closed") is True
+    repo.flush()
+    assert [row[0] for row in backend.rows[1:]] == ["TIC7"]
+    assert backend.rows[1][STATUS] == "closed"
+    repo.close()
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+from tool_runner import ToolRunner, normalize_input
+
+
+def test_normalize_input():
+    assert normalize_input("  TIC12?  ") == normalize_input("tic12") == "tic12"
+    assert normalize_input({"b": 1, "a": 2}) == '{"a": 2, "b": 1}'
+
+
+def test_run_many_is_concurrent_and_cached():
+    runner = ToolRunner()
+    calls = []
+
+    def slow(x):
+        calls.append(x)
+        time.sleep(0.2)
+        return f"answer {x}"
+
+    runner.register("Slow", slow, ttl=60)
+    start = time.perf_counter()
+    assert runner.run_many([("Slow", "a"), ("Slow", "b"), ("Slow", "c")]) == ["answer a", "answer b", "answer c"]
+    assert time.perf_counter() - start < 0.5
+    assert runner.run("Slow", "A?") == "answer a"
+    assert sorted(calls) == ["a", "b", "c"]
+    assert runner.stats()["Slow"]["hits"] == 1
+    runner.close()
+
+
+def test_errors_are_not_cached():
+    runner = ToolRunner()
+    results = iter(["⚠️ sheet unavailable", "found"])
+    runner.register("Lookup", lambda x: next(results), ttl=60)
+    assert runner.run("Lookup", "TIC1").startswith("⚠️")
+    assert runner.run("Lookup", "TIC1") == "found"
+    runner.close()
+
+
+def test_sync_timeout_fills_cache_later():
+    runner = ToolRunner()
+    runner.register("Slow", lambda x: time.sleep(0.2) or "late", ttl=60, timeout=0.05)
+    assert "did not answer" in runner.run("Slow", "q")
+    time.sleep(0.3)
+    assert runner.run("Slow", "q") == "late"
+    assert runner.stats()["Slow"]["timeouts"] == 1
+    runner.close()
+
+
+def test_sync_calls_are_coalesced():
+    runner = ToolRunner()
+    calls = []
+    runner.register("Slow", lambda x: calls.append(x) or time.sleep(0.2) or "done", ttl=60)
+    threads = [threading.Thread(target=runner.run, args=("Slow", "q")) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == ["q"]
+    runner.close()
+
+
+def test_async_timeout_keeps_running_and_coalesces():
+    runner = ToolRunner()
+    calls = []
+
+    async def slow(x):
+        calls.append(x)
+        await asyncio.sleep(0.2)
+        return "late"
+
+    runner.register("Slow", lambda x: "sync", coroutine=slow, ttl=60, timeout=0.05)
+
+    async def main():
+        first = await asyncio.gather(*(runner.arun("Slow", "q") for _ in range(3)))
+        await asyncio.sleep(0.3)
+        return first, await runner.arun("Slow", "q")
+
+    first, again = asyncio.run(main())
+    assert all("did not answer" in r for r in first)
+    assert again == "late"
+    assert calls == ["q"]
+    assert runner.stats()["Slow"]["coalesced"] == 2
+    runner.close()
+
+
+def test_async_errors_are_reported_not_cached():
+    runner = ToolRunner()
+    attempts = []
+
+    async def flaky(x):
+        attempts.append(x)
+        if len(attempts) == 1:
+            raise RuntimeError("boom")
+        return "ok"
+
+    runner.register("Flaky", lambda x: "sync", coroutine=flaky, ttl=60)
+    assert asyncio.run(runner.arun("Flaky", "q")) == "⚠️ Flaky failed: boom"
+    assert asyncio.run(runner.arun("Flaky", "q")) == "ok"
+    assert asyncio.run(runner.arun("Flaky", "q")) == "ok"
+    assert len(attempts) == 2
+    runner.close()
+
+
+def test_spans_inside_tools_nest_under_the_caller():
+    import tracing
+    runner = ToolRunner()
+    seen = {}
+
+    def tool(x):
+        with tracing.span("rag") as s:
+            seen[x] = s.parent_id
+        return x
+
+    runner.register("Rag", tool)
+    with tracing.span("turn") as turn:
+        runner.run_many([("Rag", "a"), ("Rag", "b")])
+    assert seen == {"a": turn.span_id, "b": turn.span_id}
+    runner.close()
@@ -0,0 +1,45 @@
+import socket
+import urllib.request
+import tracing
+
+
+def span(name, **attrs):
+    s = tracing.Span(name, **attrs)
+    s.duration = 0.005
+    return s
+
+
+def test_coalesced_calls_are_not_cache_misses():
+    tracer = tracing.Tracer(path="")
+    for cache in ("hit", "miss", "coalesced", "coalesced"):
+        tracer.export(span("tool.Search", cache=cache))
+    stats = tracer.stage_stats()["tool.Search"]
+    assert (stats["cache_hits"], stats["cache_misses"], stats["cache_coalesced"]) == (1, 1, 2)
+    assert stats["cache_hit_rate"] == 0.5
+    text = tracer.prometheus_text()
+    assert 'ticket_assistant_cache_total{stage="tool.Search",result="miss"} 1' in text
+    assert 'ticket_assistant_cache_total{stage="tool.Search",result="coalesced"} 2' in text
+
+
+def test_summarize_keeps_coalesced_out_of_hit_rate():
+    spans = [{"name": "tool.Search", "status": "ok", "duration_ms": 5, "cache": c}
+             for c in ("hit", "miss", "coalesced")]
+    row = tracing.summarize(spans)[0]
+    assert (row["Cache hit rate"], row["Coalesced"]) == (0.5, 1)
+
+
+def test_metrics_server_binds_localhost_by_default(monkeypatch):
+    monkeypatch.setattr(tracing, "_server", None)
+    tracing.start_metrics_server(port=0)  # off
+    assert tracing._server is None
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    tracing.start_metrics_server(port=port)
+    try:
+        assert tracing._server.server_address[0] == "127.0.0.1"
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as r:
+            assert b"ticket_assistant_stage_seconds" in r.read()
+    finally:
+        tracing._server.shutdown()
+        tracing._server.server_close()
@@ -0,0 +1,108 @@
+import pytest
+from ticket_store import MemoryBackend
+from write_queue import WriteBehindQueue
+
+
+class FlakyBackend(MemoryBackend):
+    def __init__(self, failures: int):
+        super().__init__([["ticket_id", "ticket_status"]])
+        self.failures = failures
+
+    def append_rows(self, rows):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("sheet unavailable")
+        return super().append_rows(rows)
+
+
+def make_queue(backend, appended=None):
+    on_appended = (lambda ids, row: appended.append((ids, row))) if appended is not None else None
+    return WriteBehindQueue(backend, max_pending=1000, max_delay=60, on_appended=on_appended)
+
+
+def test_writes_to_one_ticket_are_coalesced():
+    backend = MemoryBackend([["ticket_id", "ticket_status"], ["TIC1", "pending"]])
+    appended = []
+    queue = make_queue(backend, appended)
+    queue.put_row("TIC2", None, ["TIC2", "pending"])
+    queue.put_cell("TIC2", None, 2, "closed")
+    queue.put_cell("TIC1", 2, 2, "closed")
+    queue.put_cell("TIC1", 2, 2, "resolved")
+    assert queue.pending() == 2
+    queue.flush()
+    assert backend.rows[1:] == [["TIC1", "resolved"], ["TIC2", "closed"]]
+    assert appended == [(["TIC2"], 3)]
+    assert queue.writes_coalesced == 2
+    assert queue.pending() == 0
+    queue.close()
+
+
+def test_update_after_append_uses_the_appended_row():
+    backend = MemoryBackend([["ticket_id", "ticket_status"]])
+    queue = make_queue(backend)
+    queue.put_row("TIC1", None, ["TIC1", "pending"])
+    queue.flush()
+    queue.put_cell("TIC1", None, 2, "closed")  # caller has not learned the row number yet
+    queue.flush()
+    assert backend.rows[1:] == [["TIC1", "closed"]]
+    queue.close()
+
+
+def test_failed_flush_is_retried_without_losing_newer_writes():
+    backend = FlakyBackend(failures=1)
+    queue = make_queue(backend)
+    queue.put_row("TIC1", None, ["TIC1", "pending"])
+    with pytest.raises(ConnectionError):
+        queue.flush()
+    assert queue.pending_ids() == {"TIC1"}
+    queue.put_cell("TIC1", None, 2, "closed")
+    queue.flush()
+    assert backend.rows[1:] == [["TIC1", "closed"]]
+    queue.close()
+
+
+def test_background_flush_after_max_pending():
+    backend = MemoryBackend([["ticket_id", "ticket_status"]])
+    queue = WriteBehindQueue(backend, max_pending=2, max_delay=60)
+    queue.put_row("TIC1", None, ["TIC1", "pending"])
+    queue.put_row("TIC2", None, ["TIC2", "pending"])
+    queue.close()  # joins the background thread, which has flushed both
+    assert [r[0] for r in backend.rows[1:]] == ["TIC1", "TIC2"]
+    assert backend.calls == 1
+
+
+class NoRowBackend(MemoryBackend):
+    """A backend whose appends don't report where the rows went."""
+
+    def append_rows(self, rows):
+        super().append_rows(rows)
+        return None
+
+
+def test_update_after_unreported_append_is_not_appended_again():
+    backend = NoRowBackend([["ticket_id", "ticket_status"], ["TIC0", "pending"]])
+    appended = []
+    queue = make_queue(backend, appended)
+    queue.put_row("TIC1", None, ["TIC1", "pending"])
+    queue.flush()
+    assert appended == [(["TIC1"], None)]
+    queue.put_cell("TIC1", None, 2, "closed")
+    queue.flush()
+    queue.put_cell("TIC1", None, 2, "resolved")  # row number now known without another read
+    queue.flush()
+    assert backend.rows[1:] == [["TIC0", "pending"], ["TIC1", "resolved"]]
+    queue.close()
+
+
+def test_repository_with_unreported_appends_keeps_one_row():
+    from ticket_store import TicketRepository
+    backend = NoRowBackend()
+    repo = TicketRepository(backend, batch_writes=True, flush_interval=60)
+    repo.save({"ticket_id": "TIC1", "ticket_content": "refund", "ticket_status": "pending"})
+    repo.flush()
+    assert repo.update_status("TIC1", "closed") is True
+    repo.save({"ticket_id": "TIC1", "ticket_content": "refund please", "ticket_status": "closed"})
+    repo.flush()
+    assert [row[0] for row in backend.rows[1:]] == ["TIC1"]
+    assert repo.get("TIC1")["ticket_content"] == "refund please"
+    repo.close()
@@ -0,0 +1,97 @@
+import threading
+import faiss
+import numpy as np
+
+
+class TicketVectorIndex:
+    """
+    Cosine-similarity index over tickets, keyed by ticket_id and updated one ticket at a time.
+    Each entry remembers the text it was embedded from, so re-adding an unchanged
+    ticket costs nothing and only new or edited tickets hit the embedding model.
+    """
+
+    def __init__(self, embed_documents, embed_query):
+        self.embed_documents = embed_documents  # list[str] -> list[vector]
+        self.embed_query = embed_query          # str -> vector
+        self._index = None                      # faiss.IndexIDMap2 over inner product, created on first add
+        self._ids: dict[str, int] = {}          # ticket_id -> faiss id
+        self._entries: dict[int, tuple[str, str, dict]] = {}  # faiss id -> (ticket_id, text, payload)
+        self._next_id = 0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        v = np.asarray(vectors, dtype=np.float32)
+        if v.ndim == 1:
+            v = v[None, :]
+        return v / np.maximum(np.linalg.norm(v, axis=1, keepdims=True), 1e-12)
+
+    def upsert_many(self, items: list[tuple[str, str, dict]]) -> int:
+        """Add or replace (ticket_id, text, payload) entries. Returns how many texts were embedded."""
+        todo = []
+        with self._lock:
+            for ticket_id, text, payload in items:
+                fid = self._ids.get(ticket_id)
+                if fid is not None and self._entries[fid][1] == text:
+                    self._entries[fid] = (ticket_id, text, payload)
+                else:
+                    todo.append((ticket_id, text, payload))
+        if not todo:
+            return 0
+        # The model runs outside the lock so searches are not blocked by it
+        vectors = self._normalize(self.embed_documents([text for _, text, _ in todo]))
+        with self._lock:
+            if self._index is None:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vectors.shape[1]))
+            for ticket_id, _, _ in todo:
+                self.remove(ticket_id)
+            ids = np.arange(self._next_id, self._next_id + len(todo), dtype=np.int64)
+            self._next_id += len(todo)
+            self._index.add_with_ids(vectors, ids)
+            for fid, entry in zip(ids.tolist(), todo):
+                self._ids[entry[0]] = fid
+                self._entries[fid] = entry
+        return len(todo)
+
+    def upsert(self, ticket_id: str, text: str, payload: dict) -> None:
+        self.upsert_many([(ticket_id, text, payload)])
+
+    def remove(self, ticket_id: str) -> bool:
+        with self._lock:
+            fid = self._ids.pop(ticket_id, None)
+            if fid is None:
+                return False
+            del self._entries[fid]
+            self._index.remove_ids(np.asarray([fid], dtype=np.int64))
+            return True
+
+    def retain(self, ticket_ids: set[str]) -> int:
+        """Drop every ticket not in `ticket_ids`. Returns how many were dropped."""
+        with self._lock:
+            stale = [tid for tid in self._ids if tid not in ticket_ids]
+            for tid in stale:
+                self.remove(tid)
+            return len(stale)
+
+    def search(self, text: str, k: int = 3, min_score: float = 0.0) -> list[tuple[str, float, dict]]:
+        """Most similar tickets as (ticket_id, cosine similarity, payload), best first."""
+        with self._lock:
+            if not self._ids:
+                return []
+        vector = self._normalize(self.embed_query(text))
+        with self._lock:
+            if not self._ids:
+                return []
+            scores, ids = self._index.search(vector, min(k, len(self._ids)))
+            hits = []
+            for score, fid in zip(scores[0].tolist(), ids[0].tolist()):
+                entry = self._entries.get(fid)
+                if entry is not None and score >= min_score:
+                    hits.append((entry[0], score, entry[2]))
+            return hits
+
+    def __contains__(self, ticket_id: str) -> bool:
+        return ticket_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
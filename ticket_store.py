@@ -0,0 +1,550 @@
+import csv
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from write_queue import WriteBehindQueue
+from tracing import span
+
+# Column order of the ticket sheet (row 1 is the header).
+# ticket_resolution, ticket_duplicate_of and ticket_closed_at are optional: older sheets
+# lack them and get the header cell the first time a value is written.
+TICKET_COLUMNS = [
+    "ticket_id", "ticket_content", "ticket_category", "ticket_timestamp", "ticket_by",
+    "ticket_status", "ticket_resolution", "ticket_duplicate_of", "ticket_closed_at"
+]
+CLOSED_STATUSES = {"closed", "resolved"}
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+SORTABLE_COLUMNS = ("row_number", "ticket_id", "ticket_timestamp", "ticket_status", "ticket_category", "ticket_by")
+
+
+def col_letter(n: int) -> str:
+    """1 -> A, 27 -> AA"""
+    letters = ""
+    while n:
+        n, rem = divmod(n - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+# -----------------------------
+# Backends
+# -----------------------------
+class SheetBackend:
+    """Google Sheets worksheet via gspread. Row numbers are 1-based sheet rows (row 1 is the header)."""
+
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+
+    def read_all(self) -> list[list[str]]:
+        return self.worksheet.get_all_values()
+
+    def write_row(self, row_number: int, values: list) -> None:
+        rng = f"A{row_number}:{col_letter(len(values))}{row_number}"
+        self.worksheet.update(rng, [values])
+
+    @staticmethod
+    def _first_row(result) -> int | None:
+        # e.g. {"updates": {"updatedRange": "Sheet1!A12:F14"}}
+        rng = (result or {}).get("updates", {}).get("updatedRange", "")
+        match = re.search(r"![A-Z]+(\d+)", rng)
+        return int(match.group(1)) if match else None
+
+    def append_row(self, values: list) -> int | None:
+        return self._first_row(self.worksheet.append_row(values))
+
+    def update_cell(self, row_number: int, col_number: int, value) -> None:
+        self.worksheet.update_cell(row_number, col_number, value)
+
+    def batch_write(self, updates: list[tuple[int, dict[int, object]]]) -> None:
+        """One values.batchUpdate call for many rows; each contiguous run of columns becomes one range."""
+        data = []
+        for row_number, values in updates:
+            cols = sorted(values)
+            start = prev = cols[0]
+            for c in cols[1:] + [None]:
+                if c is not None and c == prev + 1:
+                    prev = c
+                    continue
+                data.append({
+                    "range": f"{col_letter(start)}{row_number}:{col_letter(prev)}{row_number}",
+                    "values": [[values[i] for i in range(start, prev + 1)]]
+                })
+                start = prev = c
+        self.worksheet.batch_update(data)
+
+    def append_rows(self, rows: list[list]) -> int | None:
+        return self._first_row(self.worksheet.append_rows(rows))
+
+
+class MemoryBackend:
+    """
+    In-memory sheet for benchmarks. `latency` seconds are slept on every call,
+    like a Sheets API round trip.
+    """
+
+    def __init__(self, rows: list[list] | None = None, latency: float = 0.0):
+        self.rows = [[str(v) for v in r] for r in (rows or [list(TICKET_COLUMNS)])]
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _call(self) -> None:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def read_all(self) -> list[list[str]]:
+        self._call()
+        with self._lock:
+            return [list(r) for r in self.rows]
+
+    def write_row(self, row_number: int, values: list) -> None:
+        self.batch_write([(row_number, {i: v for i, v in enumerate(values, start=1)})])
+
+    def append_row(self, values: list) -> int:
+        return self.append_rows([values])
+
+    def update_cell(self, row_number: int, col_number: int, value) -> None:
+        self.batch_write([(row_number, {col_number: value})])
+
+    def batch_write(self, updates: list[tuple[int, dict[int, object]]]) -> None:
+        self._call()
+        with self._lock:
+            for row_number, values in updates:
+                while len(self.rows) < row_number:
+                    self.rows.append([])
+                row = self.rows[row_number - 1]
+                for col_number, value in values.items():
+                    while len(row) < col_number:
+                        row.append("")
+                    row[col_number - 1] = str(value)
+
+    def append_rows(self, rows: list[list]) -> int:
+        self._call()
+        with self._lock:
+            first_row = len(self.rows) + 1
+            self.rows.extend([str(v) for v in r] for r in rows)
+            return first_row
+
+
+class CsvBackend:
+    """Local CSV file standing in for the sheet in tests and benchmarks."""
+
+    def __init__(self, path: Path | str, header: list[str] = TICKET_COLUMNS):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        if not self.path.exists():
+            self._write([list(header)])
+
+    def _read(self) -> list[list[str]]:
+        with open(self.path, newline="", encoding="utf-8") as f:
+            return [row for row in csv.reader(f)]
+
+    def _write(self, rows: list[list]) -> None:
+        with open(self.path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(rows)
+
+    def read_all(self) -> list[list[str]]:
+        with self._lock:
+            return self._read()
+
+    def write_row(self, row_number: int, values: list) -> None:
+        with self._lock:
+            rows = self._read()
+            while len(rows) < row_number:
+                rows.append([])
+            rows[row_number - 1] = [str(v) for v in values]
+            self._write(rows)
+
+    def append_row(self, values: list) -> int:
+        with self._lock:
+            with open(self.path, "a", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerow(values)
+            return len(self._read())
+
+    def update_cell(self, row_number: int, col_number: int, value) -> None:
+        self.batch_write([(row_number, {col_number: value})])
+
+    def batch_write(self, updates: list[tuple[int, dict[int, object]]]) -> None:
+        with self._lock:
+            rows = self._read()
+            for row_number, values in updates:
+                while len(rows) < row_number:
+                    rows.append([])
+                row = rows[row_number - 1]
+                for col_number, value in values.items():
+                    while len(row) < col_number:
+                        row.append("")
+                    row[col_number - 1] = str(value)
+            self._write(rows)
+
+    def append_rows(self, rows: list[list]) -> int:
+        with self._lock:
+            first_row = len(self._read()) + 1
+            with open(self.path, "a", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows(rows)
+            return first_row
+
+
+# -----------------------------
+# Repository
+# -----------------------------
+_PENDING_ROW = 0  # row number of a ticket queued for append but not yet written
+
+
+class TicketRepository:
+    """
+    Local SQLite copy of the ticket sheet with an in-process ticket_id -> sheet row index.
+    Reads never touch the backend between syncs; saves and status changes write only
+    the affected row (or cell) to the backend and keep the local copy in step.
+    With batch_writes=True, backend writes go through a WriteBehindQueue and are
+    flushed every `batch_size` tickets or `flush_interval` seconds.
+
+    Listeners added with `add_listener` see every change: `rebuild(rows)` after each
+    sync and `apply(old_row, new_row)` after each save or field update (old_row is
+    None for a new ticket). They are called under the repository lock, so keep them cheap.
+    """
+
+    def __init__(self, backend, db_path: str = ":memory:", sync_interval: float = 300,
+                 batch_writes: bool = False, batch_size: int = 50, flush_interval: float = 2.0):
+        self.backend = backend
+        self.sync_interval = sync_interval
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        cols = ", ".join(f"{c} TEXT" for c in TICKET_COLUMNS[1:])
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS tickets (ticket_id TEXT PRIMARY KEY, {cols}, row_number INTEGER)")
+        existing = {r["name"] for r in self._conn.execute("PRAGMA table_info(tickets)")}
+        for c in TICKET_COLUMNS[1:]:
+            if c not in existing:  # local copy written by an older version
+                self._conn.execute(f"ALTER TABLE tickets ADD COLUMN {c} TEXT")
+        # Indexes behind query(): filters and sorts never scan the table
+        for c in ("ticket_status", "ticket_category"):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{c} ON tickets ({c} COLLATE NOCASE, row_number)")
+        for c in ("ticket_timestamp", "ticket_by", "row_number"):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{c} ON tickets ({c})")
+        # Full-text index over content/author, kept in step by hand (rowid = tickets.rowid)
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS tickets_fts USING fts5(ticket_content, ticket_by, tokenize='unicode61')"
+            )
+            self._fts = True
+        except sqlite3.OperationalError:
+            print("[WARN] SQLite has no FTS5; ticket search falls back to LIKE scans")
+            self._fts = False
+        self._rows: dict[str, int] = {}
+        self._header: list[str] = list(TICKET_COLUMNS)
+        self._next_row = 2
+        self._synced_at = 0.0
+        self._sync_lock = threading.Lock()
+        self._version = 0
+        self._write_seq = 0
+        self._written: dict[str, int] = {}  # ticket_id -> _write_seq of its last local write
+        self._listeners = []
+        self.queue = None
+        if batch_writes:
+            self.queue = WriteBehindQueue(backend, max_pending=batch_size, max_delay=flush_interval,
+                                          on_appended=self._on_appended)
+
+    # -- sync --
+    def sync(self) -> None:
+        """Pull the whole sheet once and rebuild the local copy and row index."""
+        with self._sync_lock:
+            self._sync()
+
+    def _sync(self) -> None:
+        with self._lock:
+            mark = self._write_seq  # local writes after this point may be missing from the read
+        if self.queue:
+            self.queue.flush()  # queued writes must land before the sheet is re-read
+        with span("sheet.read_all") as trace:
+            values = self.backend.read_all()
+            trace.set(rows=max(0, len(values) - 1))
+        with self._lock:
+            self._header = [h.strip().lower() for h in values[0]] if values else list(TICKET_COLUMNS)
+            # Tickets saved or changed while the sheet was being read keep their local values,
+            # as do tickets whose queued writes have not reached the sheet yet
+            recent = {tid for tid, seq in self._written.items() if seq > mark}
+            if self.queue:
+                recent |= self.queue.pending_ids()
+                recent.update(r["ticket_id"] for r in self._conn.execute(
+                    "SELECT ticket_id FROM tickets WHERE row_number = ?", (_PENDING_ROW,)))
+            kept = {}
+            for tid in recent:
+                row = self._conn.execute("SELECT * FROM tickets WHERE ticket_id = ?", (tid,)).fetchone()
+                if row is not None:
+                    kept[tid] = [row[c] for c in TICKET_COLUMNS] + [row["row_number"]]
+            rows: dict[str, int] = {}
+            records = []
+            for i, raw in enumerate(values[1:], start=2):
+                rec = self._to_record(raw)
+                tid = rec["ticket_id"]
+                if not tid or tid in rows:  # keep the first occurrence, like the sheet scan did
+                    continue
+                record = kept.pop(tid, None) or [rec[c] for c in TICKET_COLUMNS] + [i]
+                record[-1] = record[-1] or i  # a queued append that has reached the sheet
+                rows[tid] = record[-1]
+                records.append(record)
+            for tid, record in kept.items():
+                rows[tid] = record[-1]
+                records.append(record)
+            with self._conn:
+                self._conn.execute("DELETE FROM tickets")
+                self._conn.executemany(
+                    f"INSERT INTO tickets ({', '.join(TICKET_COLUMNS)}, row_number) "
+                    f"VALUES ({', '.join('?' * (len(TICKET_COLUMNS) + 1))})",
+                    records
+                )
+                if self._fts:
+                    self._conn.execute("DELETE FROM tickets_fts")
+                    self._conn.execute(
+                        "INSERT INTO tickets_fts (rowid, ticket_content, ticket_by) "
+                        "SELECT rowid, ticket_content, ticket_by FROM tickets"
+                    )
+            self._rows = rows
+            self._next_row = max([len(values) + 1] + [r + 1 for r in rows.values()])
+            self._written = {tid: seq for tid, seq in self._written.items() if seq > mark}
+            self._synced_at = time.monotonic()
+            self._version += 1
+            if self._listeners:
+                records.sort(key=lambda r: (r[-1] == _PENDING_ROW, r[-1]))
+                current = [dict(zip(TICKET_COLUMNS, r)) for r in records]
+                for listener in self._listeners:
+                    listener.rebuild(current)
+
+    def _stale(self) -> bool:
+        return not self._synced_at or time.monotonic() - self._synced_at > self.sync_interval
+
+    def _ensure_synced(self) -> None:
+        if self._stale():
+            with self._sync_lock:
+                if self._stale():  # another caller may have synced while this one waited
+                    self._sync()
+
+    def _touch(self, ticket_id: str) -> None:
+        """Note a local write, so a sync that read the sheet before it does not undo it."""
+        self._write_seq += 1
+        self._written[ticket_id] = self._write_seq
+        self._version += 1
+
+    @property
+    def version(self) -> int:
+        """Changes on every sync and local write, so readers can skip rebuilding views of unchanged data."""
+        self._ensure_synced()
+        return self._version
+
+    def _to_record(self, raw: list) -> dict:
+        rec = dict(zip(self._header, raw))
+        return {c: str(rec.get(c, "")) for c in TICKET_COLUMNS}
+
+    def _col(self, name: str) -> int:
+        if name not in self._header:
+            # Optional column the sheet does not have yet: add its header cell next to the others
+            self._header.append(name)
+            self.backend.update_cell(1, len(self._header), name)
+        return self._header.index(name) + 1
+
+    def _row_values(self, record: dict) -> list:
+        """A record as a sheet row in header order; empty optional columns the sheet lacks are left out."""
+        for c in TICKET_COLUMNS:
+            if c not in self._header and record.get(c):
+                self._col(c)
+        width = max(self._header.index(c) + 1 for c in TICKET_COLUMNS if c in self._header)
+        return [record.get(h, "") if h in TICKET_COLUMNS else "" for h in self._header[:width]]
+
+    def add_listener(self, listener) -> None:
+        """Register a listener (see class docstring); it is rebuilt from the current rows right away."""
+        self._ensure_synced()
+        with self._lock:
+            self._listeners.append(listener)
+            listener.rebuild(self._all())
+
+    def _notify(self, old: dict | None, new: dict | None) -> None:
+        for listener in self._listeners:
+            listener.apply(old, new)
+
+    # -- reads --
+    def _local(self, ticket_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM tickets WHERE ticket_id = ?", (ticket_id,)).fetchone()
+        if row is None:
+            return None
+        return {c: row[c] for c in TICKET_COLUMNS}
+
+    def get(self, ticket_id: str) -> dict | None:
+        self._ensure_synced()
+        return self._local(ticket_id)
+
+    def exists(self, ticket_id: str) -> bool:
+        self._ensure_synced()
+        return ticket_id in self._rows
+
+    def all(self) -> list[dict]:
+        self._ensure_synced()
+        return self._all()
+
+    def _all(self) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM tickets ORDER BY row_number").fetchall()
+        return [{c: r[c] for c in TICKET_COLUMNS} for r in rows]
+
+    def query(self, status: str | list[str] | None = None, category: str | list[str] | None = None,
+              search: str | None = None, sort_by: str = "row_number", descending: bool = False,
+              limit: int = 50, offset: int = 0) -> tuple[list[dict], int]:
+        """
+        One page of tickets plus the total number matching the filters.
+        status/category match case-insensitively (one value or a list); search matches
+        words (or word prefixes) in ticket_content / ticket_by through the full-text index.
+        """
+        if sort_by not in SORTABLE_COLUMNS:
+            raise ValueError(f"Cannot sort tickets by: {sort_by}")
+        self._ensure_synced()
+        where, params = [], []
+        for column, value in (("ticket_status", status), ("ticket_category", category)):
+            values = [value] if isinstance(value, str) else list(value or [])
+            if values:
+                where.append(f"{column} COLLATE NOCASE IN ({', '.join('?' * len(values))})")
+                params += values
+        words = re.findall(r"\w+", search or "")
+        if words and self._fts:
+            where.append("rowid IN (SELECT rowid FROM tickets_fts WHERE tickets_fts MATCH ?)")
+            params.append(" ".join(f'"{w}"*' for w in words))
+        elif words:
+            for w in words:
+                where.append("(ticket_content LIKE ? OR ticket_by LIKE ?)")
+                params += [f"%{w}%", f"%{w}%"]
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        order = "DESC" if descending else "ASC"
+        # Rows still queued for append (row_number 0) sort after the rows already in the sheet
+        order_by = f"(row_number = 0) {order}, row_number {order}" if sort_by == "row_number" else f"{sort_by} {order}, row_number"
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM tickets {clause}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT * FROM tickets {clause} ORDER BY {order_by} LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return [{c: r[c] for c in TICKET_COLUMNS} for r in rows], total
+
+    # -- writes --
+    def _index_text(self, ticket_id: str) -> None:
+        if not self._fts:
+            return
+        row = self._conn.execute(
+            "SELECT rowid, ticket_content, ticket_by FROM tickets WHERE ticket_id = ?", (ticket_id,)
+        ).fetchone()
+        self._conn.execute("DELETE FROM tickets_fts WHERE rowid = ?", (row["rowid"],))
+        self._conn.execute(
+            "INSERT INTO tickets_fts (rowid, ticket_content, ticket_by) VALUES (?, ?, ?)",
+            (row["rowid"], row["ticket_content"], row["ticket_by"])
+        )
+
+    def _store_local(self, record: dict, row_number: int) -> None:
+        old = self._local(record["ticket_id"]) if self._listeners else None
+        updates = ", ".join(f"{c} = excluded.{c}" for c in TICKET_COLUMNS[1:] + ["row_number"])
+        with self._conn:
+            # Upsert rather than REPLACE so the rowid (and with it the search index entry) stays put
+            self._conn.execute(
+                f"INSERT INTO tickets ({', '.join(TICKET_COLUMNS)}, row_number) "
+                f"VALUES ({', '.join('?' * (len(TICKET_COLUMNS) + 1))}) "
+                f"ON CONFLICT(ticket_id) DO UPDATE SET {updates}",
+                [str(record.get(c, "")) for c in TICKET_COLUMNS] + [row_number]
+            )
+            self._index_text(record["ticket_id"])
+        self._rows[record["ticket_id"]] = row_number
+        self._touch(record["ticket_id"])
+        if self._listeners:
+            self._notify(old, {c: str(record.get(c, "")) for c in TICKET_COLUMNS})
+
+    def save(self, record: dict) -> bool:
+        """Insert or overwrite a ticket row. Returns True if it was new."""
+        self._ensure_synced()
+        with self._lock:
+            values = self._row_values(record)
+            row_number = self._rows.get(record["ticket_id"])
+            if self.queue:
+                self.queue.put_row(record["ticket_id"], row_number or None, values)
+                self._store_local(record, row_number if row_number is not None else _PENDING_ROW)
+                return row_number is None
+            if row_number is not None:
+                self.backend.write_row(row_number, values)
+                self._store_local(record, row_number)
+                return False
+            row_number = self.backend.append_row(values) or self._next_row
+            self._next_row = max(self._next_row, row_number + 1)
+            self._store_local(record, row_number)
+            return True
+
+    def update_field(self, ticket_id: str, column: str, value) -> bool:
+        """Set one column on one ticket. Returns False if the ticket does not exist."""
+        if column not in TICKET_COLUMNS[1:]:
+            raise ValueError(f"Unknown ticket column: {column}")
+        self._ensure_synced()
+        return self._update_field(ticket_id, column, value)
+
+    def _update_field(self, ticket_id: str, column: str, value) -> bool:
+        # Callers holding the lock use this directly: a sync must not start under the lock
+        with self._lock:
+            row_number = self._rows.get(ticket_id)
+            if row_number is None:
+                return False
+            if self.queue:
+                self.queue.put_cell(ticket_id, row_number or None, self._col(column), value)
+            else:
+                self.backend.update_cell(row_number, self._col(column), value)
+            old = self._local(ticket_id) if self._listeners else None
+            with self._conn:
+                self._conn.execute(f"UPDATE tickets SET {column} = ? WHERE ticket_id = ?", (str(value), ticket_id))
+                if column in ("ticket_content", "ticket_by"):
+                    self._index_text(ticket_id)
+            self._touch(ticket_id)
+            if self._listeners:
+                self._notify(old, dict(old, **{column: str(value)}))
+            return True
+
+    def update_status(self, ticket_id: str, status: str) -> bool:
+        """
+        Set ticket_status on one ticket. Returns False if the ticket does not exist.
+        Closing a ticket stamps ticket_closed_at (resolution time); reopening clears it.
+        """
+        self._ensure_synced()
+        with self._lock:
+            current = self._local(ticket_id)
+            if current is None:
+                return False
+            was_closed = current["ticket_status"].strip().lower() in CLOSED_STATUSES
+            closing = status.strip().lower() in CLOSED_STATUSES
+            if closing and not was_closed:
+                self._update_field(ticket_id, "ticket_closed_at", datetime.now().strftime(TIMESTAMP_FORMAT))
+            elif not closing and current["ticket_closed_at"]:
+                self._update_field(ticket_id, "ticket_closed_at", "")
+            return self._update_field(ticket_id, "ticket_status", status)
+
+    def bulk_update_status(self, ticket_ids: list[str], status: str) -> list[str]:
+        """Set the same status on many tickets in one batch. Returns the ids that were not found."""
+        missing = [tid for tid in ticket_ids if not self.update_status(tid, status)]
+        self.flush()
+        return missing
+
+    # -- write-behind --
+    def _on_appended(self, ticket_ids: list[str], first_row: int | None) -> None:
+        with self._lock:
+            if first_row is None:
+                self._synced_at = 0.0  # backend did not say where the rows went; re-read on next use
+                return
+            with self._conn:
+                for offset, tid in enumerate(ticket_ids):
+                    self._rows[tid] = first_row + offset
+                    self._conn.execute("UPDATE tickets SET row_number = ? WHERE ticket_id = ?", (first_row + offset, tid))
+            self._next_row = max(self._next_row, first_row + len(ticket_ids))
+
+    def flush(self) -> None:
+        """Write every queued change to the backend now."""
+        if self.queue:
+            self.queue.flush()
+
+    def close(self) -> None:
+        if self.queue:
+            self.queue.close()
@@ -0,0 +1,248 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from collections import deque
+from contextvars import copy_context
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from functools import partial
+from cache import TTLCache
+from tracing import record
+
+TOOL_WORKERS = 16          # 🔹 Threads shared by every synchronous tool call in the process
+TOOL_CACHE_SIZE = 2048
+LATENCY_WINDOW = 500       # 🔹 Recent calls per tool kept for the p50/p95 numbers
+
+_MISSING = object()
+
+
+def normalize_input(tool_input) -> str:
+    """Cache key for a tool input: case, extra whitespace and trailing punctuation don't matter."""
+    if isinstance(tool_input, dict):
+        return json.dumps(tool_input, sort_keys=True, default=str)
+    return re.sub(r"\s+", " ", str(tool_input)).strip().strip("?!. ").lower()
+
+
+def _is_error(result) -> bool:
+    # The ticket tools report failures as text instead of raising
+    return isinstance(result, str) and result.startswith(("⚠️", "❌"))
+
+
+@dataclass
+class ToolSpec:
+    name: str
+    func: object
+    coroutine: object = None
+    ttl: float = 0                 # seconds a result is reused; 0 never caches (writes, live data)
+    timeout: float | None = None   # seconds before the caller gives up; None waits (writes)
+    calls: int = 0
+    hits: int = 0
+    coalesced: int = 0
+    timeouts: int = 0
+    errors: int = 0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+
+class ToolRunner:
+    """
+    Runs agent tools with a per-tool deadline, a per-tool result cache and latency stats.
+
+    - A call that misses its deadline returns a short "answer without it" message instead
+      of holding up the turn; the work keeps going in the background (in the thread pool,
+      or as a task on the caller's event loop for async tools) and, if it succeeds, its
+      result is cached for the next identical call.
+    - Results are cached by (tool, normalised input) for the tool's `ttl`. Identical calls
+      already in flight share one execution, whether they come from the sync or async path.
+    - `run_many` / `arun_many` start independent calls together, so a turn waits for the
+      slowest of them instead of their sum.
+    """
+
+    def __init__(self, workers: int = TOOL_WORKERS, cache_size: int = TOOL_CACHE_SIZE):
+        self._tools: dict[str, ToolSpec] = {}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tool")
+        self._inflight: dict = {}
+        self._tasks: set = set()  # background async tool calls, referenced until they finish
+        self._lock = threading.RLock()
+        self.cache = TTLCache(maxsize=cache_size, ttl=0)
+
+    def register(self, name: str, func, coroutine=None, ttl: float = 0, timeout: float | None = None) -> None:
+        self._tools[name] = ToolSpec(name, func, coroutine, ttl, timeout)
+
+    def caller(self, name: str):
+        """Synchronous entry point for a registered tool, e.g. as a LangChain Tool's func."""
+        return partial(self.run, name)
+
+    def acaller(self, name: str):
+        return partial(self.arun, name)
+
+    # -- sync --
+    def run(self, name: str, tool_input):
+        return self.run_many([(name, tool_input)])[0]
+
+    def run_many(self, calls: list[tuple[str, object]]) -> list:
+        """Run independent tool calls concurrently; results come back in the order of `calls`."""
+        started = [self._start(self._tools[name], tool_input) for name, tool_input in calls]
+        results = []
+        for spec, value, future, start, cache in started:
+            if future is None:
+                self._record(spec, start, cache)
+                results.append(value)
+                continue
+            remaining = None if spec.timeout is None else max(0.0, start + spec.timeout - time.perf_counter())
+            status = "ok"
+            try:
+                value = future.result(timeout=remaining)
+            except FutureTimeout:
+                value, status = self._timed_out(spec), "timeout"
+            except Exception as e:
+                value, status = self._failed(spec, e), "error"
+            self._record(spec, start, cache, status)
+            results.append(value)
+        return results
+
+    def _start(self, spec: ToolSpec, tool_input):
+        """(spec, cached value, future, start time, cache outcome); future is None on a cache hit."""
+        start = time.perf_counter()
+        key = (spec.name, normalize_input(tool_input)) if spec.ttl else None
+        with self._lock:
+            spec.calls += 1
+            if key is None:
+                return spec, None, self._submit(spec.func, tool_input), start, None
+            value = self.cache.get(key, _MISSING)
+            if value is not _MISSING:
+                spec.hits += 1
+                return spec, value, None, start, "hit"
+            future = self._inflight.get(key)
+            if future is not None:
+                spec.coalesced += 1
+                return spec, None, future, start, "coalesced"
+            future = self._inflight[key] = self._submit(self._call, spec, key, tool_input)
+            future.add_done_callback(lambda _, key=key: self._forget(key))
+            return spec, None, future, start, "miss"
+
+    def _submit(self, fn, *args):
+        # Pool threads don't inherit contextvars: run in the caller's context so spans
+        # opened inside the tool (rag, categorize, ...) nest under the caller's span
+        return self._pool.submit(copy_context().run, fn, *args)
+
+    def _call(self, spec: ToolSpec, key, tool_input):
+        result = spec.func(tool_input)
+        if not _is_error(result):
+            self.cache.set(key, result, ttl=spec.ttl)
+        return result
+
+    def _forget(self, key) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    # -- async --
+    async def arun(self, name: str, tool_input):
+        spec = self._tools[name]
+        if spec.coroutine is None:
+            # Shares the thread pool, the cache and in-flight calls with the sync path
+            spec, value, future, start, cache = self._start(spec, tool_input)
+            if future is None:
+                self._record(spec, start, cache)
+                return value
+            status = "ok"
+            try:
+                value = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), spec.timeout)
+            except asyncio.TimeoutError:
+                value, status = self._timed_out(spec), "timeout"
+            except Exception as e:
+                value, status = self._failed(spec, e), "error"
+            self._record(spec, start, cache, status)
+            return value
+
+        start = time.perf_counter()
+        key = (spec.name, normalize_input(tool_input)) if spec.ttl else None
+        cache = "miss" if key else None
+        with self._lock:
+            spec.calls += 1
+            value = self.cache.get(key, _MISSING) if key else _MISSING
+            if value is not _MISSING:
+                spec.hits += 1
+            elif key and key in self._inflight:
+                spec.coalesced += 1
+                future, cache = self._inflight[key], "coalesced"
+            else:
+                # A plain Future, so sync callers and other event loops can wait on it too
+                future = Future()
+                if key:
+                    self._inflight[key] = future
+                    future.add_done_callback(lambda _, key=key: self._forget(key))
+                task = asyncio.ensure_future(self._acall(spec, key, tool_input, future))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        if value is not _MISSING:
+            self._record(spec, start, "hit")
+            return value
+        status = "ok"
+        try:
+            # Shielded: a timeout stops waiting, not the call, which still fills the cache
+            value = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), spec.timeout)
+        except asyncio.TimeoutError:
+            value, status = self._timed_out(spec), "timeout"
+        except Exception as e:
+            value, status = self._failed(spec, e), "error"
+        self._record(spec, start, cache, status)
+        return value
+
+    async def _acall(self, spec: ToolSpec, key, tool_input, future: Future) -> None:
+        try:
+            result = await spec.coroutine(tool_input)
+        except asyncio.CancelledError:
+            future.cancel()  # event loop shutting down
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            return
+        if key and not _is_error(result):
+            self.cache.set(key, result, ttl=spec.ttl)
+        future.set_result(result)
+
+    async def arun_many(self, calls: list[tuple[str, object]]) -> list:
+        return list(await asyncio.gather(*(self.arun(name, tool_input) for name, tool_input in calls)))
+
+    # -- outcomes and stats --
+    def _timed_out(self, spec: ToolSpec) -> str:
+        with self._lock:
+            spec.timeouts += 1
+        print(f"[WARN] {spec.name} did not answer within {spec.timeout:g}s")
+        return f"⚠️ {spec.name} did not answer within {spec.timeout:g}s; answer without it."
+
+    def _failed(self, spec: ToolSpec, e: Exception) -> str:
+        with self._lock:
+            spec.errors += 1
+        print(f"[WARN] {spec.name} failed: {e}")
+        return f"⚠️ {spec.name} failed: {e}"
+
+    def _record(self, spec: ToolSpec, start: float, cache: str | None = None, status: str = "ok") -> None:
+        seconds = time.perf_counter() - start
+        with self._lock:
+            spec.latencies.append(seconds)
+        attrs = {"cache": cache} if cache else {}
+        record(f"tool.{spec.name}", seconds, status=status, **attrs)
+
+    def stats(self) -> dict:
+        """Per tool: calls, cache hit rate, timeouts, errors and recent latency percentiles (ms)."""
+        out = {}
+        with self._lock:
+            for name, spec in self._tools.items():
+                ordered = sorted(spec.latencies)
+                out[name] = {
+                    "calls": spec.calls,
+                    "hits": spec.hits,
+                    "coalesced": spec.coalesced,
+                    "hit_rate": spec.hits / spec.calls if spec.calls else 0.0,
+                    "timeouts": spec.timeouts,
+                    "errors": spec.errors,
+                    "p50_ms": round(ordered[int(0.5 * (len(ordered) - 1))] * 1000, 1) if ordered else None,
+                    "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 1) if ordered else None,
+                }
+        return out
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
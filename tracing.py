@@ -0,0 +1,354 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar, Context, copy_context
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+except ImportError:  # the dashboard only reads the trace file
+    BaseCallbackHandler = object
+
+# -----------------------------
+# Config (from .env)
+# -----------------------------
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")              # 🔹 One JSON span per line; "" turns the file off
+TRACE_MAX_BYTES = 20 * 1024 * 1024                                 # 🔹 The file is rotated to <name>.1 beyond this
+TRACE_METRICS_PORT = int(os.getenv("TRACE_METRICS_PORT", "0"))     # 🔹 > 0 serves Prometheus text on /metrics
+TRACE_METRICS_HOST = os.getenv("TRACE_METRICS_HOST", "127.0.0.1")  # 🔹 Local only; set 0.0.0.0 to let a remote scraper in
+TRACE_WINDOW = 1000                                                # 🔹 Recent spans per stage kept for p50/p95
+
+
+class Span:
+    """One timed stage of a turn. `attrs` carries tokens, cache hit/miss, counts and the like."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "started_at", "_t0", "duration", "status", "attrs")
+
+    def __init__(self, name: str, parent: "Span | None" = None, **attrs):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.duration = None
+        self.status = "ok"
+        self.attrs = dict(attrs)
+
+    def set(self, **attrs) -> "Span":
+        self.attrs.update(attrs)
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name, "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "start": round(self.started_at, 6), "duration_ms": round((self.duration or 0) * 1000, 3),
+            "status": self.status, **self.attrs,
+        }
+
+
+class Tracer:
+    """
+    Collects finished spans: appends each to TRACE_FILE, and keeps per-stage counts,
+    errors, token totals, cache hits/misses and recent durations for the p50/p95
+    numbers and the Prometheus endpoint.
+    """
+
+    def __init__(self, path: str = TRACE_FILE, window: int = TRACE_WINDOW, max_bytes: int = TRACE_MAX_BYTES):
+        self.path = path
+        self.window = window
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._file = None
+        self._durations: dict[str, deque] = {}
+        self._totals: dict[str, dict] = {}
+
+    def export(self, span: Span) -> None:
+        record = span.to_dict()
+        with self._lock:
+            durations = self._durations.setdefault(span.name, deque(maxlen=self.window))
+            durations.append(span.duration)
+            totals = self._totals.setdefault(span.name, {
+                "count": 0, "errors": 0, "seconds": 0.0,
+                "input_tokens": 0, "output_tokens": 0, "cache_hits": 0, "cache_misses": 0,
+                "cache_coalesced": 0,
+            })
+            totals["count"] += 1
+            totals["seconds"] += span.duration
+            totals["errors"] += span.status != "ok"
+            totals["input_tokens"] += span.attrs.get("input_tokens") or 0
+            totals["output_tokens"] += span.attrs.get("output_tokens") or 0
+            if "cache" in span.attrs:
+                totals[_CACHE_TOTALS.get(span.attrs["cache"], "cache_misses")] += 1
+            if self.path:
+                self._write(json.dumps(record, default=str))
+
+    def _write(self, line: str) -> None:
+        try:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+            self._file.write(line + "\n")
+            if self._file.tell() > self.max_bytes:
+                self._file.close()
+                os.replace(self.path, self.path + ".1")
+                self._file = None
+        except OSError as e:
+            print(f"[WARN] Could not write trace span: {e}")
+            self.path = ""  # don't retry on every span
+
+    def stage_stats(self) -> dict:
+        """Per stage: count, errors, tokens, cache hit rate and recent p50/p95 in ms.
+
+        Coalesced calls (joined an identical call already in flight) are neither hits nor misses
+        and are left out of the hit rate.
+        """
+        with self._lock:
+            return {
+                name: {**totals, **percentiles(self._durations[name]),
+                       "cache_hit_rate": (totals["cache_hits"] / (totals["cache_hits"] + totals["cache_misses"])
+                                          if totals["cache_hits"] + totals["cache_misses"] else None)}
+                for name, totals in self._totals.items()
+            }
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# TYPE ticket_assistant_stage_seconds summary",
+            "# TYPE ticket_assistant_stage_errors_total counter",
+            "# TYPE ticket_assistant_tokens_total counter",
+            "# TYPE ticket_assistant_cache_total counter",
+        ]
+        for name, s in sorted(self.stage_stats().items()):
+            label = f'stage="{name}"'
+            for q, key in (("0.5", "p50_ms"), ("0.95", "p95_ms")):
+                if s[key] is not None:
+                    lines.append(f'ticket_assistant_stage_seconds{{{label},quantile="{q}"}} {s[key] / 1000:.6f}')
+            lines.append(f"ticket_assistant_stage_seconds_count{{{label}}} {s['count']}")
+            lines.append(f"ticket_assistant_stage_seconds_sum{{{label}}} {s['seconds']:.6f}")
+            lines.append(f"ticket_assistant_stage_errors_total{{{label}}} {s['errors']}")
+            for kind in ("input", "output"):
+                if s[f"{kind}_tokens"]:
+                    lines.append(f'ticket_assistant_tokens_total{{{label},kind="{kind}"}} {s[f"{kind}_tokens"]}')
+            for result, key in _CACHE_TOTALS.items():
+                if s[key]:
+                    lines.append(f'ticket_assistant_cache_total{{{label},result="{result}"}} {s[key]}')
+        return "\n".join(lines) + "\n"
+
+
+_CACHE_TOTALS = {"hit": "cache_hits", "miss": "cache_misses", "coalesced": "cache_coalesced"}
+
+
+def percentiles(durations) -> dict:
+    ordered = sorted(d for d in durations if d is not None)
+    if not ordered:
+        return {"p50_ms": None, "p95_ms": None}
+    return {
+        "p50_ms": round(ordered[int(0.5 * (len(ordered) - 1))] * 1000, 1),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 1),
+    }
+
+
+tracer = Tracer()
+_current: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+# -----------------------------
+# Recording spans
+# -----------------------------
+def current_span() -> Span | None:
+    return _current.get()
+
+
+def start_span(name: str, parent: Span | None = None, **attrs) -> Span:
+    """A span that is finished explicitly, for work that outlives one `with` block (e.g. a generator)."""
+    return Span(name, parent if parent is not None else _current.get(), **attrs)
+
+
+def finish(span: Span, error: BaseException | None = None) -> None:
+    span.duration = time.perf_counter() - span._t0
+    if error is not None:
+        span.status = "error"
+        span.attrs["error"] = str(error)[:200]
+    tracer.export(span)
+
+
+@contextmanager
+def span(name: str, parent: Span | None = None, **attrs):
+    """Time the block as one stage, nested under `parent` or the span current in this context."""
+    s = start_span(name, parent, **attrs)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        finish(s, e)
+        raise
+    else:
+        finish(s)
+    finally:
+        _current.reset(token)
+
+
+def context_for(parent: Span) -> Context:
+    """A context in which `parent` is current, for work handed to another thread: `ctx.run(fn, ...)`."""
+    ctx = copy_context()
+    ctx.run(_current.set, parent)
+    return ctx
+
+
+def record(name: str, seconds: float, parent: Span | None = None, **attrs) -> None:
+    """A stage that was timed elsewhere (e.g. by the tool runner)."""
+    s = start_span(name, parent, **attrs)
+    s.started_at -= seconds
+    s.duration = seconds
+    if attrs.get("status"):
+        s.status = s.attrs.pop("status")
+    tracer.export(s)
+
+
+def stage_stats() -> dict:
+    return tracer.stage_stats()
+
+
+class TraceCallbackHandler(BaseCallbackHandler):
+    """
+    Turns LangChain callbacks into spans under `parent`: one per LLM call (with token
+    counts), retriever call (with the number of documents) and agent step.
+    LangChain may call it from worker threads, so the parent is fixed at creation.
+    """
+
+    def __init__(self, parent: Span | None = None):
+        self.parent = parent if parent is not None else _current.get()
+        self._open: dict = {}
+        self.iterations = 0
+
+    def _start(self, run_id, name: str, **attrs) -> None:
+        self._open[run_id] = Span(name, self.parent, **attrs)
+
+    def _end(self, run_id, error: BaseException | None = None, **attrs) -> None:
+        s = self._open.pop(run_id, None)
+        if s is not None:
+            s.attrs.update(attrs)
+            finish(s, error)
+
+    def on_llm_start(self, serialized, prompts, *, run_id=None, **kwargs):
+        self._start(run_id, f"llm.{_model_name(serialized, kwargs)}")
+
+    def on_chat_model_start(self, serialized, messages, *, run_id=None, **kwargs):
+        self._start(run_id, f"llm.{_model_name(serialized, kwargs)}")
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        self._end(run_id, **_token_usage(response))
+
+    def on_llm_error(self, error, *, run_id=None, **kwargs):
+        self._end(run_id, error)
+
+    def on_retriever_start(self, serialized, query, *, run_id=None, **kwargs):
+        self._start(run_id, "retrieval")
+
+    def on_retriever_end(self, documents, *, run_id=None, **kwargs):
+        self._end(run_id, documents=len(documents))
+
+    def on_retriever_error(self, error, *, run_id=None, **kwargs):
+        self._end(run_id, error)
+
+    def on_agent_action(self, action, **kwargs):
+        self.iterations += 1
+
+
+def _model_name(serialized, kwargs) -> str:
+    params = kwargs.get("invocation_params") or {}
+    return params.get("model") or params.get("model_name") or (serialized or {}).get("name") or "unknown"
+
+
+def _token_usage(response) -> dict:
+    """Input/output tokens from an LLMResult; providers report them in different places."""
+    usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+    if usage:
+        return {"input_tokens": usage.get("prompt_tokens"), "output_tokens": usage.get("completion_tokens")}
+    for generations in getattr(response, "generations", []) or []:
+        for g in generations:
+            meta = getattr(getattr(g, "message", None), "usage_metadata", None)
+            if meta:
+                return {"input_tokens": meta.get("input_tokens"), "output_tokens": meta.get("output_tokens")}
+    return {}
+
+
+# -----------------------------
+# Prometheus endpoint
+# -----------------------------
+_server = None
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = tracer.prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port: int = TRACE_METRICS_PORT, host: str = TRACE_METRICS_HOST) -> None:
+    """Serve /metrics on `host`:`port` from a daemon thread. Safe to call more than once."""
+    global _server
+    if _server is not None or port <= 0:
+        return
+    try:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"[WARN] Metrics endpoint not started on {host}:{port}: {e}")
+        return
+    threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+
+
+# -----------------------------
+# Reading the trace file (dashboard)
+# -----------------------------
+def read_spans(path: str = TRACE_FILE, max_bytes: int = 4 * 1024 * 1024) -> list[dict]:
+    """The most recent spans in the trace file (its last `max_bytes`)."""
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - max_bytes))
+        lines = f.read().splitlines()
+    if size > max_bytes:
+        lines = lines[1:]  # probably cut in the middle
+    spans = []
+    for line in lines:
+        try:
+            spans.append(json.loads(line))
+        except ValueError:
+            continue
+    return spans
+
+
+def summarize(spans: list[dict]) -> list[dict]:
+    """One row per stage: count, errors, p50/p95 ms, tokens and cache hit rate, slowest p95 first."""
+    by_stage: dict[str, list[dict]] = {}
+    for s in spans:
+        by_stage.setdefault(s["name"], []).append(s)
+    rows = []
+    for name, items in by_stage.items():
+        cached = [s["cache"] for s in items if s.get("cache") in ("hit", "miss")]
+        rows.append({
+            "Stage": name,
+            "Count": len(items),
+            "Errors": sum(s.get("status") != "ok" for s in items),
+            **percentiles([s["duration_ms"] / 1000 for s in items[-TRACE_WINDOW:]]),
+            "Tokens": sum((s.get("input_tokens") or 0) + (s.get("output_tokens") or 0) for s in items),
+            "Cache hit rate": sum(c == "hit" for c in cached) / len(cached) if cached else None,
+            "Coalesced": sum(s.get("cache") == "coalesced" for s in items),
+        })
+    return sorted(rows, key=lambda r: r["p95_ms"] or 0, reverse=True)
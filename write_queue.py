@@ -0,0 +1,211 @@
+import threading
+import time
+from collections import OrderedDict
+from tracing import span
+
+
+class _Pending:
+    __slots__ = ("row_number", "values", "append", "locate")
+
+    def __init__(self, row_number: int | None, append: bool, locate: bool = False):
+        self.row_number = row_number
+        self.values: dict[int, object] = {}  # 1-based column -> value
+        self.append = append
+        self.locate = locate  # already appended, but the backend did not say where: find the row first
+
+
+class WriteBehindQueue:
+    """
+    Coalesces ticket writes and flushes them to the backend in batches.
+
+    Writes are keyed by ticket_id: a save followed by two status changes on the
+    same ticket becomes one row write holding the final values, so the order of
+    operations on one ticket is always preserved. New tickets are sent with a
+    single append_rows call per flush. A flush happens when `max_pending` tickets
+    are waiting, when the oldest write is `max_delay` seconds old, or on flush().
+    """
+
+    def __init__(self, backend, max_pending: int = 50, max_delay: float = 2.0,
+                 on_appended=None, retry_delay: float = 5.0):
+        self.backend = backend
+        self.max_pending = max_pending
+        self.max_delay = max_delay
+        self.retry_delay = retry_delay
+        self.on_appended = on_appended  # called with (ticket_ids, first_row_number) after an append
+        self._pending: OrderedDict[str, _Pending] = OrderedDict()
+        self._inflight: set[str] = set()  # tickets being appended by the current flush
+        self._appended_rows: OrderedDict[str, int] = OrderedDict()  # recent ticket_id -> appended row
+        self._unplaced: set[str] = set()  # appended tickets whose row the backend did not report
+        self._oldest = None
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self.flushes = 0
+        self.writes_coalesced = 0
+        self._thread = threading.Thread(target=self._run, name="ticket-write-behind", daemon=True)
+        self._thread.start()
+
+    # -- enqueue --
+    def _entry(self, ticket_id: str, row_number: int | None) -> _Pending:
+        if row_number is None:
+            # The row may be in the middle of being appended; wait for its row number
+            # instead of appending the same ticket twice.
+            while ticket_id in self._inflight:
+                self._cond.wait()
+            row_number = self._appended_rows.get(ticket_id)
+        else:
+            self._unplaced.discard(ticket_id)
+        entry = self._pending.get(ticket_id)
+        if entry is None:
+            # A ticket appended without a reported row is updated in place, never appended again
+            unplaced = row_number is None and ticket_id in self._unplaced
+            entry = _Pending(row_number, append=row_number is None and not unplaced, locate=unplaced)
+            self._pending[ticket_id] = entry
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+        else:
+            self.writes_coalesced += 1
+            if entry.row_number is None and row_number is not None:
+                entry.row_number, entry.append, entry.locate = row_number, False, False
+        return entry
+
+    def put_row(self, ticket_id: str, row_number: int | None, values: list) -> None:
+        """Write a whole row. row_number=None appends a new row."""
+        with self._cond:
+            entry = self._entry(ticket_id, row_number)
+            entry.values.update({i: v for i, v in enumerate(values, start=1)})
+            self._cond.notify()
+
+    def put_cell(self, ticket_id: str, row_number: int | None, col_number: int, value) -> None:
+        """Write one cell. For a ticket still waiting to be appended the value is merged into that row."""
+        with self._cond:
+            entry = self._entry(ticket_id, row_number)
+            entry.values[col_number] = value
+            self._cond.notify()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def pending_ids(self) -> set[str]:
+        """Tickets with writes not yet confirmed by the backend (queued or being appended)."""
+        with self._cond:
+            return set(self._pending) | self._inflight
+
+    # -- flush --
+    def flush(self) -> None:
+        """Synchronously write everything queued so far."""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending = self._pending, OrderedDict()
+                self._oldest = None
+                self._inflight = {tid for tid, e in batch.items() if e.append}
+            if not batch:
+                return
+            appended = None
+            try:
+                with span("sheet.write", tickets=len(batch)):
+                    appended = self._write(batch)
+            except Exception:
+                self._requeue(batch)
+                raise
+            finally:
+                with self._cond:
+                    self._inflight = set()
+                    self._cond.notify_all()
+            self.flushes += 1
+            # Outside the condition so the callback may take its own locks
+            if appended and self.on_appended:
+                self.on_appended(*appended)
+
+    def _locate(self, batch: "OrderedDict[str, _Pending]") -> None:
+        """Find the sheet rows of appended tickets whose row the backend did not report (one read)."""
+        wanted = {tid for tid, e in batch.items() if e.locate}
+        if not wanted:
+            return
+        found = {}
+        for i, raw in enumerate(self.backend.read_all()[1:], start=2):
+            if raw and raw[0] in wanted and raw[0] not in found:  # ticket_id is the first column
+                found[raw[0]] = i
+        with self._cond:
+            for tid, row_number in found.items():
+                batch[tid].row_number, batch[tid].locate = row_number, False
+                self._appended_rows[tid] = row_number
+                self._unplaced.discard(tid)
+
+    def _write(self, batch: "OrderedDict[str, _Pending]") -> tuple[list[str], int | None] | None:
+        self._locate(batch)
+        missing = OrderedDict((tid, e) for tid, e in batch.items() if e.locate)
+        if missing:
+            # Not in the sheet yet: keep the writes for the next flush rather than append a second row
+            print(f"[WARN] Rows for {', '.join(missing)} not found in the sheet yet; retrying on the next flush")
+            self._requeue(missing)
+        updates = [(e.row_number, e.values) for e in batch.values() if not e.append and not e.locate]
+        appends = [(tid, e.values) for tid, e in batch.items() if e.append]
+        if updates:
+            self.backend.batch_write(updates)
+        if appends:
+            rows = []
+            for _, values in appends:
+                width = max(values) if values else 0
+                rows.append([values.get(i, "") for i in range(1, width + 1)])
+            first_row = self.backend.append_rows(rows)
+            ids = [tid for tid, _ in appends]
+            with self._cond:
+                for offset, tid in enumerate(ids):
+                    batch[tid].append = False  # sent; a retry of this batch must not append it again
+                    if first_row is not None:
+                        self._appended_rows[tid] = first_row + offset
+                    else:
+                        self._unplaced.add(tid)
+                while len(self._appended_rows) > 1024:
+                    self._appended_rows.popitem(last=False)
+            return ids, first_row
+        return None
+
+    def _requeue(self, batch: "OrderedDict[str, _Pending]") -> None:
+        # Failed writes are older than anything queued meanwhile: newer values win per cell
+        with self._cond:
+            for tid, old in reversed(batch.items()):
+                if old.append is False and old.row_number is None and not old.locate:
+                    continue  # already appended in this batch
+                new = self._pending.get(tid)
+                if new is not None:
+                    old.values.update(new.values)
+                    if new.row_number is not None:
+                        old.row_number, old.append, old.locate = new.row_number, False, False
+                self._pending[tid] = old
+                self._pending.move_to_end(tid, last=False)
+            if self._pending and self._oldest is None:
+                self._oldest = time.monotonic()
+
+    def _due(self) -> bool:
+        if not self._pending:
+            return False
+        if len(self._pending) >= self.max_pending:
+            return True
+        return time.monotonic() - self._oldest >= self.max_delay
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and not self._due():
+                    timeout = None
+                    if self._pending:
+                        timeout = max(0.0, self.max_delay - (time.monotonic() - self._oldest))
+                    self._cond.wait(timeout)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[WARN] Ticket batch write failed, retrying in {self.retry_delay}s: {e}")
+                time.sleep(self.retry_delay)
+
+    def close(self) -> None:
+        """Stop the background thread and flush what is left."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=self.max_delay + 1)
+        self.flush()